@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+"""
+Apply the agent's actions (see ACTIONS in sim_env.py) to the Triton deployment.
+
+Actions are not applied one by one. Each submitted action moves a desired allocation
+(CPU, memory, server batch size, model instances), and a background thread applies the
+difference to the cluster only once no action changed it for `debounce_s` (or the oldest
+pending change has waited `max_delay_s`), so flapping actions cancel out and a burst of
+actions becomes one change. Changes use the least disruptive mechanism that works:
+
+  cpu / memory            in-place resize of the running pods (pods/resize), no restart
+  batch size / instances  Triton model-control load with a config override (one model
+                          reload); the ConfigMap is updated too, so restarts keep it
+  fallback                patch the ConfigMap and the Deployment's pod template, i.e. a
+                          rolling restart; used once resize is rejected or Triton reports
+                          that explicit model control is disabled
+
+A model load Triton rejects for any other reason (e.g. a batched config for a model with a
+fixed batch dimension) drops that change instead, and batch actions are ignored unless the
+deployed model's batch dimension is dynamic.
+
+Disruptive mechanisms are rate limited (MIN_INTERVAL_S); a change that has to wait stays
+pending and keeps coalescing. Every applied change is recorded with how long it was
+queued, how long the API calls took and when it took effect (pods report the new
+resources, the model is ready with the new config, or the rollout finished).
+
+The Kubernetes API is reached through `kubectl proxy` by default, or with the pod's
+service account when running in-cluster. scripts/fake_k8s_api.py serves a fake cluster
+and Triton control plane to try it locally.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import numpy as np
+import requests
+
+from sim_env import ACTIONS, BATCH_SIZES, CPU_RANGE, MEMORY_RANGE, INSTANCE_RANGE
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from autotune_sweep import render_model_config, model_batch_dynamic
+
+# Desired allocation fields and the actions moving them: field -> (up action, down action, step)
+FIELDS = {
+    'cpu_cores': ('cpu_up', 'cpu_down', 0.5),
+    'memory_mb': ('memory_up', 'memory_down', 512.0),
+    'batch_size': ('batch_up', 'batch_down', None),
+    'instances': ('instances_up', 'instances_down', 1),
+}
+RESOURCE_FIELDS = ('cpu_cores', 'memory_mb')
+MODEL_FIELDS = ('batch_size', 'instances')
+
+METHODS = ('resize', 'reload', 'rollout')
+
+# Minimum seconds between two changes applied with each mechanism
+MIN_INTERVAL_S = {'resize': 0.0, 'reload': 60.0, 'rollout': 300.0}
+
+# How long to wait for a change to take effect before recording it as failed
+EFFECT_TIMEOUT_S = {'resize': 60.0, 'reload': 120.0, 'rollout': 600.0}
+
+SERVICE_ACCOUNT_DIR = '/var/run/secrets/kubernetes.io/serviceaccount'
+
+def parse_cpu(quantity):
+    """Kubernetes CPU quantity ('1500m', '2') in cores."""
+    quantity = str(quantity)
+    return float(quantity[:-1]) / 1000.0 if quantity.endswith('m') else float(quantity)
+
+def parse_memory_mb(quantity):
+    """Kubernetes memory quantity ('4Gi', '512Mi', bytes) in MiB."""
+    quantity = str(quantity)
+    units = {'Ki': 1 / 1024, 'Mi': 1, 'Gi': 1024, 'Ti': 1024 ** 2,
+             'k': 1e3 / 2 ** 20, 'M': 1e6 / 2 ** 20, 'G': 1e9 / 2 ** 20, 'T': 1e12 / 2 ** 20}
+    for suffix in ('Ki', 'Mi', 'Gi', 'Ti', 'k', 'M', 'G', 'T'):
+        if quantity.endswith(suffix):
+            return float(quantity[:-len(suffix)]) * units[suffix]
+    return float(quantity) / 2 ** 20
+
+def resources_patch(container, cpu_cores, memory_mb):
+    """Container patch setting CPU and memory requests equal to limits."""
+    values = {'cpu': f"{int(round(cpu_cores * 1000))}m", 'memory': f"{int(round(memory_mb))}Mi"}
+    return {'name': container, 'resources': {'requests': dict(values), 'limits': dict(values)}}
+
+def model_config_json(model_name, instances, batch_size, queue_delay_us):
+    """The config render_model_config writes, as the JSON override Triton's load API takes."""
+    if batch_size > 1:
+        input_dims, output_dims, max_batch_size = [3, 224, 224], [1000], int(batch_size)
+    else:
+        input_dims, output_dims, max_batch_size = [1, 3, 224, 224], [-1, 1000], 0
+    config = {
+        'name': model_name,
+        'platform': 'onnxruntime_onnx',
+        'max_batch_size': max_batch_size,
+        'input': [{'name': 'pixel_values', 'data_type': 'TYPE_FP32', 'dims': input_dims}],
+        'output': [{'name': 'logits', 'data_type': 'TYPE_FP32', 'dims': output_dims}],
+        'instance_group': [{'kind': 'KIND_GPU', 'count': int(instances)}],
+    }
+    if max_batch_size > 0:
+        config['dynamic_batching'] = {'max_queue_delay_microseconds': int(queue_delay_us)}
+    return config
+
+class ChangeRejected(Exception):
+    """The API refused the change itself; retrying it or falling back would not help."""
+
+class KubeApi:
+    """Minimal Kubernetes REST client: GET and strategic merge PATCH of JSON resources."""
+
+    def __init__(self, server=None, timeout=10.0):
+        self.session = requests.Session()
+        self.timeout = timeout
+        if server is None and os.environ.get('KUBERNETES_SERVICE_HOST'):
+            host, port = os.environ['KUBERNETES_SERVICE_HOST'], os.environ.get('KUBERNETES_SERVICE_PORT', '443')
+            server = f"https://{host}:{port}"
+            with open(os.path.join(SERVICE_ACCOUNT_DIR, 'token'), 'r') as f:
+                self.session.headers['Authorization'] = f"Bearer {f.read().strip()}"
+            self.session.verify = os.path.join(SERVICE_ACCOUNT_DIR, 'ca.crt')
+        self.server = (server or 'http://127.0.0.1:8001').rstrip('/')
+
+    def get(self, path, **params):
+        response = self.session.get(self.server + path, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def patch(self, path, body):
+        """Strategic merge patch; returns the response so callers can handle rejections."""
+        return self.session.patch(self.server + path, data=json.dumps(body), timeout=self.timeout,
+                                  headers={'Content-Type': 'application/strategic-merge-patch+json'})
+
+class ActionExecutor:
+    """
+    Debounce, coalesce and apply allocation changes to the Triton deployment.
+
+    `submit()` is cheap and thread-safe; call `start()` once and `stop()` at the end.
+    `records` holds one entry per applied change, `summary()` aggregates them.
+    """
+
+    def __init__(self, kube, triton_url, namespace='workloads', deployment='mobilenetv4-triton-deployment',
+                 configmap='mobilenetv4-config-pbtxt-cm', container='triton-inference-server',
+                 model_name='mobilenetv4', debounce_s=10.0, max_delay_s=60.0, queue_delay_us=500,
+                 min_interval_s=None, tick_s=0.5, batch_dynamic=True):
+        self.kube = kube
+        self.triton_url = triton_url.rstrip('/')
+        self.namespace = namespace
+        self.deployment = deployment
+        self.configmap = configmap
+        self.container = container
+        self.model_name = model_name
+        self.debounce_s = debounce_s
+        self.max_delay_s = max_delay_s
+        self.queue_delay_us = queue_delay_us
+        self.min_interval_s = dict(MIN_INTERVAL_S, **(min_interval_s or {}))
+        self.tick_s = tick_s
+        # Batched configs only load for a model with a dynamic batch dimension
+        self.batch_dynamic = batch_dynamic
+        self.session = requests.Session()
+
+        self.applied = None
+        self.desired = None
+        self.resize_supported = True
+        self.model_control_supported = True
+        self.records = []
+        self.submitted = 0
+        self.last_applied_at = {method: -float('inf') for method in METHODS}
+        self._pending_since = None
+        self._pending_actions = 0
+        self._last_change = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # Kubernetes paths
+    @property
+    def _deployment_path(self):
+        return f"/apis/apps/v1/namespaces/{self.namespace}/deployments/{self.deployment}"
+
+    @property
+    def _configmap_path(self):
+        return f"/api/v1/namespaces/{self.namespace}/configmaps/{self.configmap}"
+
+    @property
+    def _pods_path(self):
+        return f"/api/v1/namespaces/{self.namespace}/pods"
+
+    def read_allocation(self):
+        """Current allocation from the Deployment template and the model ConfigMap."""
+        deployment = self.kube.get(self._deployment_path)
+        container = next(c for c in deployment['spec']['template']['spec']['containers']
+                         if c['name'] == self.container)
+        requests_ = container.get('resources', {}).get('requests', {})
+        config = self.kube.get(self._configmap_path)['data'].get('config.pbtxt', '')
+        batch, instances = 0, 1
+        for line in config.splitlines():
+            line = line.split('#', 1)[0]
+            if line.strip().startswith('max_batch_size:'):
+                batch = int(line.split(':', 1)[1])
+            if 'count:' in line:
+                instances = int(line.split('count:', 1)[1].split()[0].rstrip('},'))
+        return {
+            'cpu_cores': parse_cpu(requests_['cpu']) if 'cpu' in requests_ else CPU_RANGE[1],
+            'memory_mb': parse_memory_mb(requests_['memory']) if 'memory' in requests_ else MEMORY_RANGE[1],
+            'batch_size': max(batch, 1),
+            'instances': instances,
+        }
+
+    def submit(self, action):
+        """Move the desired allocation by one action (index or name in ACTIONS)."""
+        name = ACTIONS[action] if not isinstance(action, str) else action
+        if name not in ACTIONS:
+            raise ValueError(f"Unknown action: {name}")
+        with self._lock:
+            self.submitted += 1
+            if name == 'noop':
+                return dict(self.desired)
+            desired = dict(self.desired)
+            for field, (up, down, step) in FIELDS.items():
+                if name not in (up, down) or (field == 'batch_size' and not self.batch_dynamic):
+                    continue
+                sign = 1 if name == up else -1
+                if field == 'batch_size':
+                    index = int(np.searchsorted(BATCH_SIZES, desired[field])) + sign
+                    desired[field] = int(BATCH_SIZES[min(max(index, 0), len(BATCH_SIZES) - 1)])
+                else:
+                    low, high = {'cpu_cores': CPU_RANGE, 'memory_mb': MEMORY_RANGE,
+                                 'instances': INSTANCE_RANGE}[field]
+                    desired[field] = min(max(desired[field] + sign * step, low), high)
+            if desired != self.desired:
+                now = time.monotonic()
+                self.desired = desired
+                self._last_change = now
+                if self._pending_since is None:
+                    self._pending_since = now
+                self._pending_actions += 1
+            return dict(self.desired)
+
+    def pending(self):
+        """Fields whose desired value differs from what is applied."""
+        with self._lock:
+            return {f: (self.applied[f], self.desired[f]) for f in FIELDS if self.desired[f] != self.applied[f]}
+
+    def _due(self, now):
+        if not self.pending():
+            with self._lock:
+                self._pending_since = None
+                self._pending_actions = 0
+            return False
+        return now - self._last_change >= self.debounce_s or now - self._pending_since >= self.max_delay_s
+
+    def _plan(self, changes):
+        """Which mechanism each pending field group would use, or a single rollout."""
+        plan = {}
+        if any(f in changes for f in RESOURCE_FIELDS):
+            plan['resources'] = 'resize' if self.resize_supported else 'rollout'
+        if any(f in changes for f in MODEL_FIELDS):
+            plan['model'] = 'reload' if self.model_control_supported else 'rollout'
+        # A restart applies everything, so never combine one with another mechanism
+        if 'rollout' in plan.values():
+            plan = {group: 'rollout' for group in plan}
+        return plan
+
+    def tick(self):
+        """Apply the pending change if it is due and its mechanism is not rate limited."""
+        now = time.monotonic()
+        if not self._due(now):
+            return None
+        changes = self.pending()
+        for group, method in self._plan(changes).items():
+            if now - self.last_applied_at[method] < self.min_interval_s[method]:
+                continue
+            fields = RESOURCE_FIELDS + MODEL_FIELDS if method == 'rollout' else (
+                RESOURCE_FIELDS if group == 'resources' else MODEL_FIELDS)
+            record = self._apply(method, {f: v for f, v in changes.items() if f in fields})
+            if method == 'rollout':
+                return record
+        return None
+
+    def _apply(self, method, changes):
+        with self._lock:
+            target = dict(self.applied, **{f: new for f, (_, new) in changes.items()})
+            record = {'method': method, 'changes': {f: list(v) for f, v in changes.items()},
+                      'actions': self._pending_actions, 'queued_s': time.monotonic() - self._pending_since}
+        started = time.monotonic()
+        fallback, dropped = None, False
+        try:
+            fallback = getattr(self, f"_apply_{method}")(target)
+            record['api_s'] = time.monotonic() - started
+            if fallback is not None:
+                # The mechanism is not available here; the change stays pending for the fallback
+                record.update(ok=False, error=fallback)
+            else:
+                record['ok'] = self._wait_effect(method, target)
+                # E.g. a resize the node cannot fit: give it up rather than retrying it forever
+                dropped = not record['ok'] and method != 'rollout'
+                if not record['ok']:
+                    record['error'] = f"no effect after {EFFECT_TIMEOUT_S[method]:.0f}s"
+        except ChangeRejected as e:
+            record.update(api_s=time.monotonic() - started, ok=False, error=str(e))
+            dropped = True
+        except requests.RequestException as e:
+            # Transient API errors leave the change pending to be retried
+            record.update(api_s=time.monotonic() - started, ok=False, error=str(e))
+        record['actuation_s'] = time.monotonic() - started
+        record['total_s'] = record['queued_s'] + record['actuation_s']
+        if record['ok'] or method == 'rollout':
+            self.last_applied_at[method] = started
+        with self._lock:
+            if record['ok']:
+                for field in changes:
+                    self.applied[field] = target[field]
+            elif dropped:
+                for field in changes:
+                    self.desired[field] = self.applied[field]
+            if not self._has_pending():
+                self._pending_since, self._pending_actions = None, 0
+        self.records.append(record)
+        print(f"[executor] {method} {record['changes']}: {'ok' if record['ok'] else record['error']} "
+              f"(queued {record['queued_s']:.1f}s, actuation {record['actuation_s']:.1f}s)")
+        return record
+
+    def _has_pending(self):
+        return any(self.desired[f] != self.applied[f] for f in FIELDS)
+
+    def _pods(self):
+        selector = self.kube.get(self._deployment_path)['spec']['selector']['matchLabels']
+        pods = self.kube.get(self._pods_path, labelSelector=','.join(f"{k}={v}" for k, v in selector.items()))
+        return [p for p in pods['items'] if not p['metadata'].get('deletionTimestamp')]
+
+    def _apply_resize(self, target):
+        patch = {'spec': {'containers': [resources_patch(self.container, target['cpu_cores'], target['memory_mb'])]}}
+        for pod in self._pods():
+            path = f"{self._pods_path}/{pod['metadata']['name']}"
+            response = self.kube.patch(f"{path}/resize", patch)
+            if response.status_code in (404, 405):
+                # Before Kubernetes 1.33 resizes patch the pod itself (InPlacePodVerticalScaling gate)
+                response = self.kube.patch(path, patch)
+            if response.status_code in (400, 404, 405, 422):
+                self.resize_supported = False
+                return f"in-place resize rejected ({response.status_code}), falling back to rollouts"
+            response.raise_for_status()
+        return None
+
+    def _model_config_text(self, target):
+        return render_model_config(self.model_name, target['instances'],
+                                   target['batch_size'] if target['batch_size'] > 1 else 0,
+                                   self.queue_delay_us if target['batch_size'] > 1 else None)
+
+    def _apply_reload(self, target):
+        config = model_config_json(self.model_name, target['instances'], target['batch_size'], self.queue_delay_us)
+        response = self.session.post(f"{self.triton_url}/v2/repository/models/{self.model_name}/load",
+                                     json={'parameters': {'config': json.dumps(config)}},
+                                     timeout=EFFECT_TIMEOUT_S['reload'])
+        if response.status_code != 200:
+            try:
+                error = response.json().get('error', '')
+            except ValueError:
+                error = response.text
+            if 'explicit model load / unload is not allowed' in error:
+                self.model_control_supported = False
+                return f"model control disabled ({response.status_code}), falling back to rollouts"
+            if 400 <= response.status_code < 500:
+                raise ChangeRejected(f"model load rejected ({response.status_code}): {error}")
+            response.raise_for_status()
+        self.kube.patch(self._configmap_path, {'data': {'config.pbtxt': self._model_config_text(target)}}
+                        ).raise_for_status()
+        return None
+
+    def _apply_rollout(self, target):
+        self.kube.patch(self._configmap_path, {'data': {'config.pbtxt': self._model_config_text(target)}}
+                        ).raise_for_status()
+        # Like `kubectl rollout restart`: the annotation changes the template even if nothing else does
+        restarted = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        patch = {'spec': {'template': {
+            'metadata': {'annotations': {'kubectl.kubernetes.io/restartedAt': restarted}},
+            'spec': {'containers': [resources_patch(self.container, target['cpu_cores'], target['memory_mb'])]},
+        }}}
+        self.kube.patch(self._deployment_path, patch).raise_for_status()
+        return None
+
+    def _model_ready(self, target=None):
+        try:
+            if self.session.get(f"{self.triton_url}/v2/models/{self.model_name}/ready", timeout=5).status_code != 200:
+                return False
+            if target is None:
+                return True
+            config = self.session.get(f"{self.triton_url}/v2/models/{self.model_name}/config", timeout=5).json()
+        except (requests.RequestException, ValueError):
+            return False
+        batch = target['batch_size'] if target['batch_size'] > 1 else 0
+        count = sum(group.get('count', 1) for group in config.get('instance_group', [{}]))
+        return config.get('max_batch_size', 0) == batch and count == target['instances']
+
+    def _effective(self, method, target):
+        if method == 'reload':
+            return self._model_ready(target)
+        if method == 'rollout':
+            deployment = self.kube.get(self._deployment_path)
+            status, replicas = deployment.get('status', {}), deployment['spec'].get('replicas', 1)
+            rolled = (status.get('observedGeneration', 0) >= deployment['metadata'].get('generation', 0)
+                      and status.get('updatedReplicas', 0) == replicas
+                      and status.get('availableReplicas', 0) == replicas)
+            return rolled and self._model_ready(target)
+        for pod in self._pods():
+            status = next((c for c in pod['status'].get('containerStatuses', []) if c['name'] == self.container), {})
+            actual = status.get('resources', {}).get('requests', {})
+            if ('cpu' not in actual or abs(parse_cpu(actual['cpu']) - target['cpu_cores']) > 1e-3
+                    or abs(parse_memory_mb(actual.get('memory', 0)) - target['memory_mb']) > 0.5):
+                return False
+        return True
+
+    def _wait_effect(self, method, target):
+        deadline = time.monotonic() + EFFECT_TIMEOUT_S[method]
+        while time.monotonic() < deadline and not self._stop.is_set():
+            try:
+                if self._effective(method, target):
+                    return True
+            except requests.RequestException:
+                pass
+            time.sleep(0.25)
+        return False
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except requests.RequestException as e:
+                print(f"[executor] Kubernetes API error: {e}")
+            self._stop.wait(self.tick_s)
+
+    def start(self):
+        """Read the current allocation and start applying changes in a daemon thread."""
+        if self.applied is None:
+            self.applied = self.read_allocation()
+            self.desired = dict(self.applied)
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='action-executor', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the applying thread (a change in progress is abandoned)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def summary(self):
+        """Action and change counts plus actuation latency per mechanism."""
+        by_method = {}
+        for method in METHODS:
+            records = [r for r in self.records if r['method'] == method]
+            if not records:
+                continue
+            ok = [r for r in records if r['ok']]
+            actuation = [r['actuation_s'] for r in ok]
+            by_method[method] = {
+                'changes': len(records),
+                'failed': len(records) - len(ok),
+                'p50_actuation_s': float(np.percentile(actuation, 50)) if ok else None,
+                'max_actuation_s': float(np.max(actuation)) if ok else None,
+                'mean_queued_s': float(np.mean([r['queued_s'] for r in records])),
+            }
+        return {
+            'actions_submitted': self.submitted,
+            'changes_applied': sum(1 for r in self.records if r['ok']),
+            'applied': self.applied,
+            'pending': self.pending() if self.applied is not None else {},
+            'resize_supported': self.resize_supported,
+            'model_control_supported': self.model_control_supported,
+            'batch_dynamic': self.batch_dynamic,
+            'by_method': by_method,
+        }
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Apply a sequence of agent actions to the Triton deployment')
+    parser.add_argument('--actions', type=str, required=True,
+                        help=f"Comma-separated actions to submit, from: {', '.join(ACTIONS)}")
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='Seconds between submitted actions')
+    parser.add_argument('--api-server', type=str, default=None,
+                        help='Kubernetes API URL (default: in-cluster service account, else kubectl proxy on :8001)')
+    parser.add_argument('--triton-url', type=str, default='http://localhost:8000',
+                        help='Triton HTTP URL for model control and readiness')
+    parser.add_argument('--namespace', type=str, default='workloads',
+                        help='Kubernetes namespace of the Triton deployment')
+    parser.add_argument('--deployment', type=str, default='mobilenetv4-triton-deployment',
+                        help='Triton deployment name')
+    parser.add_argument('--configmap', type=str, default='mobilenetv4-config-pbtxt-cm',
+                        help='ConfigMap holding config.pbtxt')
+    parser.add_argument('--model-name', type=str, default='mobilenetv4',
+                        help='Model name in Triton')
+    parser.add_argument('--model-file', type=str, default='../models/mobilenetv4/1/model.onnx',
+                        help='Deployed ONNX model; batch actions are ignored unless its batch dimension is dynamic')
+    parser.add_argument('--debounce', type=float, default=10.0,
+                        help='Apply a change once no action moved it for this many seconds')
+    parser.add_argument('--max-delay', type=float, default=60.0,
+                        help='Apply a change at the latest this many seconds after it started')
+    parser.add_argument('--min-reload-interval', type=float, default=MIN_INTERVAL_S['reload'],
+                        help='Minimum seconds between model reloads')
+    parser.add_argument('--min-rollout-interval', type=float, default=MIN_INTERVAL_S['rollout'],
+                        help='Minimum seconds between rolling restarts')
+    parser.add_argument('--settle-timeout', type=float, default=900.0,
+                        help='How long to wait for pending changes after the last action')
+    parser.add_argument('--output-file', type=str, default='actuation_results.json',
+                        help='Path to save the actuation records')
+    return parser.parse_args()
+
+def main():
+    """Main function."""
+    args = parse_args()
+    actions = [a.strip() for a in args.actions.split(',') if a.strip()]
+    unknown = [a for a in actions if a not in ACTIONS]
+    if unknown:
+        print(f"Error: unknown actions {unknown}; choose from {ACTIONS}")
+        sys.exit(2)
+
+    batch_dynamic = model_batch_dynamic(args.model_file)
+    if not batch_dynamic:
+        print(f"{args.model_file} has a fixed batch dimension (or could not be read): ignoring batch actions")
+    executor = ActionExecutor(KubeApi(args.api_server), args.triton_url, args.namespace, args.deployment,
+                              args.configmap, model_name=args.model_name, debounce_s=args.debounce,
+                              max_delay_s=args.max_delay,
+                              min_interval_s={'reload': args.min_reload_interval,
+                                              'rollout': args.min_rollout_interval},
+                              batch_dynamic=batch_dynamic)
+    executor.start()
+    print(f"Current allocation: {executor.applied}")
+    try:
+        for action in actions:
+            print(f"Submit {action}: desired {executor.submit(action)}")
+            time.sleep(args.interval)
+        deadline = time.monotonic() + args.settle_timeout
+        while executor.pending() and time.monotonic() < deadline:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        print("Interrupted")
+    finally:
+        executor.stop()
+
+    results = {'actions': actions, 'summary': executor.summary(), 'records': executor.records}
+    print(json.dumps(results['summary'], indent=2))
+    os.makedirs(os.path.dirname(os.path.abspath(args.output_file)), exist_ok=True)
+    with open(args.output_file, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {args.output_file}")
+
+if __name__ == "__main__":
+    main()
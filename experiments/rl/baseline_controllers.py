@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Reference scheduling controllers for comparing the agent against (plan.md, phase 3).
+
+Every controller acts on a batch of simulator observations at once, like the agent:
+`act(obs)` returns one action index (sim_env.ACTIONS) per environment, and
+`reset(num_envs)` / `reset_envs(mask)` clear per-environment state at episode
+boundaries. Observations are decoded back to natural units with `observed`, so the
+controllers only use what a controller in the cluster could measure as well.
+
+  static     hold an allocation (by default the baseline: 2 cores, 4 GB, batch 1, 1 instance)
+  threshold  HPA-style scaling on CPU utilization, with a scale-down stabilization window
+  pid        PID loop on P95 latency against a target below the SLO
+  queue      scaling on the request backlog, preferring larger batches to drain it
+
+Controllers are built from specs such as `pid` or `pid:target_ms=70,kp=1.5` with
+`make_controller`, which also accepts a ppo.py checkpoint path to run the trained agent.
+"""
+
+import os
+import numpy as np
+
+from sim_env import ACTIONS, BATCH_SIZES, CPU_RANGE, MEMORY_RANGE, INSTANCE_RANGE
+
+A = {name: i for i, name in enumerate(ACTIONS)}
+
+# Scaling applied to each observation column by VecInferenceEnv._simulate
+OBS_SCALES = {
+    'cpu_cores': CPU_RANGE[1],
+    'memory_mb': MEMORY_RANGE[1],
+    'batch_idx': len(BATCH_SIZES) - 1,
+    'instances': INSTANCE_RANGE[1],
+    'load_rps': 200.0,
+    'p95_latency_ms': None,  # fraction of 10x the SLO
+    'throughput_rps': 200.0,
+    'queue_length': 1000.0,
+    'gpu_utilization': 1.0,
+    'cpu_utilization': 1.0,
+    'memory_utilization': 1.0,
+}
+
+def observed(obs, slo_ms=100.0):
+    """Observation batch [N, OBS_DIM] as a dict of per-environment values in natural units."""
+    obs = np.asarray(obs, dtype=np.float64)
+    state = {}
+    for column, (name, scale) in enumerate(OBS_SCALES.items()):
+        state[name] = obs[:, column] * (10.0 * slo_ms if scale is None else scale)
+    state['batch_idx'] = np.rint(state['batch_idx']).astype(np.int64)
+    state['instances'] = np.rint(state['instances']).astype(np.int64)
+    return state
+
+class Controller:
+    """Base class: per-environment cooldowns and mapping scale decisions to actions."""
+
+    def __init__(self, slo_ms=100.0, cooldown=0, gpu_first='instances'):
+        self.slo_ms = float(slo_ms)
+        self.cooldown = int(cooldown)
+        self.gpu_first = gpu_first
+        self.wait = np.zeros(0, dtype=np.int64)
+
+    def reset(self, num_envs):
+        """Clear the state of every environment."""
+        self.wait = np.zeros(num_envs, dtype=np.int64)
+
+    def reset_envs(self, mask):
+        """Clear the state of the environments selected by a boolean mask (episode ended)."""
+        self.wait[mask] = 0
+
+    def act(self, obs):
+        """One action index per environment for an observation batch."""
+        s = observed(obs, self.slo_ms)
+        if len(self.wait) != len(obs):
+            self.reset(len(obs))
+        direction = np.where(self.wait > 0, 0, self.decide(s))
+        actions = self.scale(direction, s)
+        self.wait = np.where(actions != A['noop'], self.cooldown, np.maximum(self.wait - 1, 0))
+        return actions
+
+    def decide(self, s):
+        """Per-environment scaling direction: +1 up, -1 down, 0 hold."""
+        raise NotImplementedError
+
+    def scale(self, direction, s):
+        """
+        Turn scaling directions into actions on the bottleneck resource.
+
+        Up: memory first when near its limit (more instances or batches would not fit),
+        then CPU when request handling keeps it busy, otherwise GPU-side capacity (instances
+        or batch size, in `gpu_first` order). Larger batches only add batching delay without a
+        backlog, so batch size is only raised while requests are queued. Down: instances, then CPU and memory, each only
+        if utilization after the release stays below the level that would scale it back up.
+        """
+        instances_max = s['instances'] >= INSTANCE_RANGE[1]
+        batch_max = (s['batch_idx'] >= len(BATCH_SIZES) - 1) | (s['queue_length'] < 1.0)
+        if self.gpu_first == 'batch':
+            gpu_up = np.where(~batch_max, A['batch_up'], np.where(~instances_max, A['instances_up'], A['noop']))
+        else:
+            gpu_up = np.where(~instances_max, A['instances_up'], np.where(~batch_max, A['batch_up'], A['noop']))
+        up = np.select(
+            [(s['memory_utilization'] > 0.85) & (s['memory_mb'] < MEMORY_RANGE[1]),
+             (s['cpu_utilization'] > 0.5) & (s['cpu_cores'] < CPU_RANGE[1])],
+            [A['memory_up'], A['cpu_up']], gpu_up)
+        down = np.select(
+            [s['instances'] > INSTANCE_RANGE[0],
+             (s['cpu_cores'] > CPU_RANGE[0])
+             & (s['cpu_utilization'] * s['cpu_cores'] / np.maximum(s['cpu_cores'] - 0.5, 1e-9) < 0.6),
+             (s['memory_mb'] > MEMORY_RANGE[0])
+             & (s['memory_utilization'] * s['memory_mb'] / np.maximum(s['memory_mb'] - 512.0, 1e-9) < 0.7)],
+            [A['instances_down'], A['cpu_down'], A['memory_down']], A['noop'])
+        return np.where(direction > 0, up, np.where(direction < 0, down, A['noop'])).astype(np.int64)
+
+class StaticController(Controller):
+    """Move to a fixed allocation one step at a time, then hold it."""
+
+    def __init__(self, cpu=2.0, memory=4096.0, batch=1, instances=1, **kwargs):
+        super().__init__(**kwargs)
+        if int(batch) not in BATCH_SIZES:
+            raise ValueError(f"batch must be one of {BATCH_SIZES.tolist()}")
+        self.target = {'cpu_cores': float(np.clip(cpu, *CPU_RANGE)),
+                       'memory_mb': float(np.clip(memory, *MEMORY_RANGE)),
+                       'batch_idx': int(np.flatnonzero(BATCH_SIZES == int(batch))[0]),
+                       'instances': int(np.clip(instances, *INSTANCE_RANGE))}
+
+    def act(self, obs):
+        s = observed(obs, self.slo_ms)
+        t = self.target
+        # Resources are adjusted in order; each entry is (difference, up action, down action, step)
+        moves = [(t['memory_mb'] - s['memory_mb'], 'memory_up', 'memory_down', 512.0),
+                 (t['cpu_cores'] - s['cpu_cores'], 'cpu_up', 'cpu_down', 0.5),
+                 (t['instances'] - s['instances'], 'instances_up', 'instances_down', 1),
+                 (t['batch_idx'] - s['batch_idx'], 'batch_up', 'batch_down', 1)]
+        actions = np.full(len(obs), A['noop'], dtype=np.int64)
+        pending = np.ones(len(obs), dtype=bool)
+        for diff, up, down, step in moves:
+            # Move only while at least half a step away, so rounding never oscillates
+            move = pending & (np.abs(diff) >= step / 2)
+            actions[move] = np.where(diff[move] > 0, A[up], A[down])
+            pending &= ~move
+        return actions
+
+    def decide(self, s):
+        return np.zeros(len(s['cpu_cores']), dtype=np.int64)
+
+class ThresholdController(Controller):
+    """
+    HPA-style scaling on CPU utilization.
+
+    Scales up as soon as utilization exceeds the target by more than the tolerance (or the
+    SLO is violated), and down only after utilization stayed below it for a stabilization
+    window, which is what keeps the Kubernetes HPA from flapping.
+    """
+
+    def __init__(self, target=0.6, tolerance=0.1, stabilization=12, **kwargs):
+        kwargs.setdefault('cooldown', 1)
+        super().__init__(**kwargs)
+        self.target = float(target)
+        self.tolerance = float(tolerance)
+        self.stabilization = int(stabilization)
+        self.low_steps = np.zeros(0, dtype=np.int64)
+
+    def reset(self, num_envs):
+        super().reset(num_envs)
+        self.low_steps = np.zeros(num_envs, dtype=np.int64)
+
+    def reset_envs(self, mask):
+        super().reset_envs(mask)
+        self.low_steps[mask] = 0
+
+    def decide(self, s):
+        ratio = s['cpu_utilization'] / self.target
+        high = (ratio > 1.0 + self.tolerance) | (s['p95_latency_ms'] > self.slo_ms)
+        low = (ratio < 1.0 - self.tolerance) & ~high
+        self.low_steps = np.where(low, self.low_steps + 1, 0)
+        down = self.low_steps >= self.stabilization
+        self.low_steps[down] = 0
+        return high.astype(np.int64) - down
+
+class PIDController(Controller):
+    """
+    PID loop on P95 latency.
+
+    The error is the relative distance of P95 from a target below the SLO; the control
+    signal picks the scaling direction once it leaves a deadband. The integral term is
+    clamped (anti-windup) since the actuator moves one step per interval at most.
+    """
+
+    def __init__(self, target_ms=90.0, kp=1.0, ki=0.1, kd=0.5, deadband=0.15, windup=5.0, **kwargs):
+        kwargs.setdefault('cooldown', 2)
+        super().__init__(**kwargs)
+        self.target_ms = float(target_ms)
+        self.kp, self.ki, self.kd = float(kp), float(ki), float(kd)
+        self.deadband = float(deadband)
+        self.windup = float(windup)
+        self.integral = np.zeros(0)
+        self.previous = np.zeros(0)
+
+    def reset(self, num_envs):
+        super().reset(num_envs)
+        self.integral = np.zeros(num_envs)
+        self.previous = np.full(num_envs, np.nan)
+
+    def reset_envs(self, mask):
+        super().reset_envs(mask)
+        self.integral[mask] = 0.0
+        self.previous[mask] = np.nan
+
+    def decide(self, s):
+        error = (s['p95_latency_ms'] - self.target_ms) / self.target_ms
+        self.integral = np.clip(self.integral + error, -self.windup, self.windup)
+        derivative = np.where(np.isnan(self.previous), 0.0, error - self.previous)
+        self.previous = error
+        u = self.kp * error + self.ki * self.integral + self.kd * derivative
+        return (u > self.deadband).astype(np.int64) - (u < -self.deadband)
+
+class QueueController(Controller):
+    """
+    Scaling on the request backlog.
+
+    Scales up while the queue holds more than `high_s` seconds of work at the current
+    throughput, preferring a larger batch (more GPU throughput per instance), and down
+    after the queue stayed empty with low CPU utilization for `idle_steps` intervals.
+    """
+
+    def __init__(self, high_s=0.5, idle_steps=6, **kwargs):
+        kwargs.setdefault('cooldown', 1)
+        kwargs.setdefault('gpu_first', 'batch')
+        super().__init__(**kwargs)
+        self.high_s = float(high_s)
+        self.idle_steps = int(idle_steps)
+        self.idle = np.zeros(0, dtype=np.int64)
+
+    def reset(self, num_envs):
+        super().reset(num_envs)
+        self.idle = np.zeros(num_envs, dtype=np.int64)
+
+    def reset_envs(self, mask):
+        super().reset_envs(mask)
+        self.idle[mask] = 0
+
+    def decide(self, s):
+        backlog_s = s['queue_length'] / np.maximum(s['throughput_rps'], 1.0)
+        up = backlog_s > self.high_s
+        self.idle = np.where((s['queue_length'] < 1.0) & (s['cpu_utilization'] < 0.5), self.idle + 1, 0)
+        down = self.idle >= self.idle_steps
+        self.idle[down] = 0
+        return up.astype(np.int64) - (down & ~up)
+
+class AgentController:
+    """A trained ActorCritic checkpoint (ppo.py), greedy by default."""
+
+    def __init__(self, path, greedy=True):
+        from ppo import load_policy
+        self.model = load_policy(path)
+        self.greedy = greedy
+
+    def reset(self, num_envs):
+        pass
+
+    def reset_envs(self, mask):
+        pass
+
+    def act(self, obs):
+        actions, _, _ = self.model.act(np.asarray(obs, dtype=np.float32), deterministic=self.greedy)
+        return actions.astype(np.int64)
+
+CONTROLLERS = {
+    'static': StaticController,
+    'threshold': ThresholdController,
+    'pid': PIDController,
+    'queue': QueueController,
+}
+
+def make_controller(spec, slo_ms=100.0):
+    """Controller from 'name' or 'name:key=value,...' (CONTROLLERS), or a checkpoint path."""
+    name, _, params = spec.partition(':')
+    if name in CONTROLLERS:
+        kwargs = {}
+        for item in filter(None, params.split(',')):
+            key, _, value = item.partition('=')
+            if not value:
+                raise ValueError(f"Bad controller parameter {item!r} in {spec!r}, expected key=value")
+            kwargs[key.strip()] = value if key.strip() == 'gpu_first' else float(value)
+        return CONTROLLERS[name](slo_ms=slo_ms, **kwargs)
+    if os.path.exists(spec):
+        return AgentController(spec)
+    raise ValueError(f"Unknown controller {spec!r}: use one of {', '.join(CONTROLLERS)} or a checkpoint path")
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Benchmark scheduling controllers against the simulator across seeds and load patterns.
+
+Every (controller, load pattern, seed) combination is one job: a VecInferenceEnv with
+`--episodes` environments runs one full episode under the controller. Jobs run in a pool
+of worker processes. All controllers see the same load for a given pattern and seed,
+because the simulator's random draws do not depend on the actions. This gives common
+random numbers, so differences between controllers are measured on paired episodes.
+
+Per episode the harness records the return, the SLO violation rate (fraction of
+intervals with P95 over the SLO or failed requests), resource efficiency (the reward
+term, 1 - normalized allocation), throughput per allocated core, mean P95 latency and
+the number of actuations. Means come with bootstrap 95% CIs over episodes, per load
+pattern and over all patterns, plus the paired return difference against
+`--reference`.
+"""
+
+import os
+import json
+import time
+import argparse
+import multiprocessing
+import numpy as np
+
+from sim_env import VecInferenceEnv, LOAD_PATTERNS, REWARD_WEIGHTS, REWARD_COMPONENTS, REWARD_SIGNS
+from baseline_controllers import CONTROLLERS, make_controller
+
+METRICS = ('return', 'slo_violation_rate', 'resource_efficiency', 'throughput_per_core',
+           'p95_latency_ms', 'actions')
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark scheduling controllers in the simulator')
+    parser.add_argument('--controllers', type=str, nargs='+', default=list(CONTROLLERS),
+                        help="Controllers: names (static, threshold, pid, queue), optionally with "
+                             "parameters as 'pid:target_ms=70,kp=1.5', or ppo.py checkpoint paths")
+    parser.add_argument('--load-patterns', type=str, nargs='+', default=LOAD_PATTERNS,
+                        choices=LOAD_PATTERNS, help='Load patterns to run')
+    parser.add_argument('--seeds', type=int, default=8,
+                        help='Seeds per controller and load pattern')
+    parser.add_argument('--episodes', type=int, default=32,
+                        help='Simulated environments (one episode each) per seed')
+    parser.add_argument('--episode-steps', type=int, default=120,
+                        help='Control intervals per episode')
+    parser.add_argument('--slo-ms', type=float, default=100.0,
+                        help='P95 latency SLO')
+    parser.add_argument('--weights', type=str, default=','.join(str(w) for w in REWARD_WEIGHTS),
+                        help='Reward weights w1,w2,w3,w4')
+    parser.add_argument('--reference', type=str, default=None,
+                        help='Controller the others are compared against (default: the first)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='Worker processes')
+    parser.add_argument('--bootstrap', type=int, default=1000,
+                        help='Bootstrap resamples for the confidence intervals')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='First seed')
+    parser.add_argument('--output-file', type=str, default='controller_benchmark.json',
+                        help='Path to save the results')
+    return parser.parse_args()
+
+def run_job(job):
+    """Run one episode per environment for a (controller, load pattern, seed); per-episode metrics."""
+    spec, pattern, seed, episodes, episode_steps, slo_ms, weights = job
+    controller = make_controller(spec, slo_ms)
+    env = VecInferenceEnv(num_envs=episodes, load_pattern=pattern, episode_steps=episode_steps,
+                          slo_ms=slo_ms, reward_weights=weights, seed=seed)
+    signed = REWARD_SIGNS * np.asarray(weights)
+    totals = {name: np.zeros(episodes) for name in ('return', 'qos', 'efficiency', 'served', 'cores', 'p95', 'actions')}
+    obs = env.reset(seed=seed)
+    controller.reset(episodes)
+    for _ in range(episode_steps):
+        actions = controller.act(obs)
+        obs, _, dones, info = env.step(actions)
+        components = info['reward_components']
+        totals['return'] += components @ signed
+        totals['qos'] += components[:, REWARD_COMPONENTS.index('qos_violation')]
+        totals['efficiency'] += components[:, REWARD_COMPONENTS.index('resource_efficiency')]
+        totals['served'] += info['throughput_rps']
+        totals['cores'] += info['cpu_cores']
+        totals['p95'] += info['p95_latency_ms']
+        totals['actions'] += actions != 0
+        if dones.any():
+            controller.reset_envs(dones)
+    metrics = {
+        'return': totals['return'],
+        'slo_violation_rate': totals['qos'] / episode_steps,
+        'resource_efficiency': totals['efficiency'] / episode_steps,
+        'throughput_per_core': totals['served'] / totals['cores'],
+        'p95_latency_ms': totals['p95'] / episode_steps,
+        'actions': totals['actions'],
+    }
+    return spec, pattern, seed, {k: v.tolist() for k, v in metrics.items()}
+
+def bootstrap_means(values, rng, count):
+    """Mean of each column of [episodes, k] values with percentile 95% CIs over resampled episodes."""
+    n = len(values)
+    # Multinomial resample counts, so all resamples are one matrix product
+    counts = rng.multinomial(n, np.full(n, 1.0 / n), size=count)
+    resampled = counts @ values / n
+    low, high = np.percentile(resampled, [2.5, 97.5], axis=0)
+    return values.mean(axis=0), low, high
+
+def summarize(episodes, reference, rng, count):
+    """Metric means and CIs per controller, plus the paired return difference to the reference."""
+    summary = {}
+    for spec, per_seed in episodes.items():
+        seeds = sorted(per_seed)
+        values = np.column_stack([np.concatenate([per_seed[s][m] for s in seeds]) for m in METRICS])
+        ref = np.concatenate([episodes[reference][s]['return'] for s in seeds])
+        values = np.column_stack([values, values[:, 0] - ref])
+        mean, low, high = bootstrap_means(values, rng, count)
+        summary[spec] = {name: {'mean': float(mean[i]), 'ci95': [float(low[i]), float(high[i])]}
+                         for i, name in enumerate(METRICS + ('return_vs_reference',))}
+        summary[spec]['episodes'] = len(values)
+    return summary
+
+def print_table(title, summary, reference):
+    print(f"\n{title} (95% CI; return difference paired against {reference}):")
+    print(f"{'controller':<28}{'return':>22}{'vs reference':>22}{'SLO viol.':>18}{'efficiency':>18}"
+          f"{'rps/core':>10}{'P95 ms':>9}{'actions':>9}")
+    for spec, s in sorted(summary.items(), key=lambda item: -item[1]['return']['mean']):
+        def ci(name, fmt):
+            m = s[name]
+            return f"{m['mean']:{fmt}} [{m['ci95'][0]:{fmt}},{m['ci95'][1]:{fmt}}]"
+        label = spec if len(spec) <= 27 else '...' + spec[-24:]
+        print(f"{label:<28}{ci('return', '.1f'):>22}{ci('return_vs_reference', '.1f'):>22}"
+              f"{ci('slo_violation_rate', '.2f'):>18}{ci('resource_efficiency', '.2f'):>18}"
+              f"{s['throughput_per_core']['mean']:>10.1f}{s['p95_latency_ms']['mean']:>9.1f}{s['actions']['mean']:>9.1f}")
+
+def main():
+    """Main function."""
+    args = parse_args()
+    weights = [float(w) for w in args.weights.split(',')]
+    if len(weights) != len(REWARD_COMPONENTS):
+        raise ValueError(f"--weights needs {len(REWARD_COMPONENTS)} values (w1-w4)")
+    reference = args.reference or args.controllers[0]
+    if reference not in args.controllers:
+        args.controllers.append(reference)
+    for spec in args.controllers:
+        make_controller(spec, args.slo_ms)  # fail on bad specs before starting workers
+
+    seeds = range(args.seed, args.seed + args.seeds)
+    jobs = [(spec, pattern, seed, args.episodes, args.episode_steps, args.slo_ms, weights)
+            for spec in args.controllers for pattern in args.load_patterns for seed in seeds]
+    print(f"Running {len(jobs)} jobs ({len(args.controllers)} controllers x {len(args.load_patterns)} "
+          f"load patterns x {args.seeds} seeds, {args.episodes} episodes each) on {args.workers} workers...")
+
+    start_time = time.time()
+    # episodes[pattern][spec][seed] -> per-episode metrics
+    episodes = {pattern: {spec: {} for spec in args.controllers} for pattern in args.load_patterns}
+    with multiprocessing.Pool(args.workers) as pool:
+        for done, (spec, pattern, seed, metrics) in enumerate(pool.imap_unordered(run_job, jobs), 1):
+            episodes[pattern][spec][seed] = metrics
+            if done % max(1, len(jobs) // 10) == 0 or done == len(jobs):
+                print(f"  {done}/{len(jobs)} jobs done ({time.time() - start_time:.1f}s)")
+    elapsed = time.time() - start_time
+    total_steps = len(jobs) * args.episodes * args.episode_steps
+    print(f"Simulated {total_steps} control intervals in {elapsed:.1f}s "
+          f"({total_steps * 5.0 / 3600:.0f} hours of cluster time at 5 s per interval)")
+
+    rng = np.random.default_rng(args.seed)
+    results = {'args': vars(args), 'reference': reference, 'elapsed_time': elapsed, 'load_patterns': {}}
+    for pattern in args.load_patterns:
+        results['load_patterns'][pattern] = summarize(episodes[pattern], reference, rng, args.bootstrap)
+        print_table(f"{pattern} load", results['load_patterns'][pattern], reference)
+    # All patterns pooled: episodes of a seed are keyed by (pattern, seed) so pairing is kept
+    pooled = {spec: {(pattern, seed): episodes[pattern][spec][seed]
+                     for pattern in args.load_patterns for seed in seeds} for spec in args.controllers}
+    results['overall'] = summarize(pooled, reference, rng, args.bootstrap)
+    print_table('All load patterns', results['overall'], reference)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output_file)), exist_ok=True)
+    with open(args.output_file, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {args.output_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Incremental windowed features for the scheduling agent's state vector.
+
+Live metrics (Triton scrapes, client latencies) arrive as noisy samples at irregular
+times. Each signal keeps only what its features need: an EWMA with a half-life in
+seconds, and per window length a fixed-capacity ring of the last samples with running
+sums, giving the sliding mean, standard deviation and least-squares slope (rate of
+change per second) in O(1) per sample. Quantile features add a log-scale histogram of
+the same window (8 buckets per octave, so estimates are within ~5%), updated in O(1)
+and read with one cumulative sum over its fixed number of buckets.
+
+FeaturePipeline.vector() writes the features into a preallocated float32 array in the
+column order of its layout, so building the state of one control step costs a few
+microseconds however long the loop has run. Features of signals that have no samples yet
+read 0.
+"""
+
+import math
+import time
+import argparse
+import numpy as np
+
+# State vector layout: (column name, signal, feature, parameter, scale)
+# Features: 'last'; 'ewma' (parameter: half-life s); 'mean', 'std', 'slope' (per second)
+# and 'pNN' quantiles (parameter: window s). Values are divided by scale so columns are
+# roughly in [0, 1] like the simulator's observations (see sim_env.py).
+DEFAULT_LAYOUT = [
+    ('cpu_cores', 'cpu_cores', 'last', None, 4.0),
+    ('memory_mb', 'memory_mb', 'last', None, 8192.0),
+    ('batch_size', 'batch_size', 'last', None, 32.0),
+    ('instances', 'instances', 'last', None, 4.0),
+    ('rps_ewma', 'rps', 'ewma', 5.0, 200.0),
+    ('rps_mean_30s', 'rps', 'mean', 30.0, 200.0),
+    ('rps_std_30s', 'rps', 'std', 30.0, 200.0),
+    ('rps_slope_30s', 'rps', 'slope', 30.0, 10.0),
+    ('throughput_ewma', 'throughput_rps', 'ewma', 5.0, 200.0),
+    ('throughput_mean_30s', 'throughput_rps', 'mean', 30.0, 200.0),
+    ('latency_ewma', 'latency_ms', 'ewma', 5.0, 1000.0),
+    ('latency_p50_30s', 'latency_ms', 'p50', 30.0, 1000.0),
+    ('latency_p95_30s', 'latency_ms', 'p95', 30.0, 1000.0),
+    ('latency_slope_30s', 'latency_ms', 'slope', 30.0, 100.0),
+    ('queue_ms_ewma', 'queue_ms', 'ewma', 5.0, 1000.0),
+    ('gpu_utilization_ewma', 'gpu_utilization', 'ewma', 5.0, 1.0),
+]
+
+# Windows hold at most this many samples per second; faster samples push out old ones early
+MAX_RATE_HZ = 20.0
+
+# Quantile histogram: 8 buckets per power of two from 2^-10 to 2^30
+BUCKETS_PER_OCTAVE = 8
+MIN_OCTAVE = -10
+NUM_BUCKETS = 40 * BUCKETS_PER_OCTAVE + 1
+
+def triton_signals(state):
+    """Map TritonMetricsScraper.state() (over the last scrape interval) onto pipeline signals."""
+    success, failure = state.get('success_rate', np.nan), state.get('failure_rate', np.nan)
+    return {
+        'rps': success + (0.0 if np.isnan(failure) else failure),
+        'throughput_rps': success,
+        'latency_ms': state.get('avg_request_ms', np.nan),
+        'queue_ms': state.get('avg_queue_ms', np.nan),
+        'gpu_utilization': state.get('gpu_utilization', np.nan),
+    }
+
+class Ewma:
+    """Exponentially weighted moving average whose weights decay with elapsed time."""
+
+    __slots__ = ('halflife_s', 'value', 't')
+
+    def __init__(self, halflife_s):
+        self.halflife_s = halflife_s
+        self.value = None
+        self.t = None
+
+    def update(self, t, x):
+        if self.value is None:
+            self.value = x
+        else:
+            # Irregularly spaced samples weigh in by how much time passed since the last one
+            alpha = 1.0 - 2.0 ** (-max(t - self.t, 0.0) / self.halflife_s)
+            self.value += alpha * (x - self.value)
+        self.t = t
+
+class SlidingWindow:
+    """
+    Samples of the last `window_s` seconds with running sums for mean, variance and slope.
+
+    Sums are kept relative to the first sample (value and time) to limit cancellation,
+    and recomputed exactly from the ring once per `capacity` updates so rounding errors
+    cannot build up.
+    """
+
+    def __init__(self, window_s, capacity, quantiles=False):
+        self.window_s = window_s
+        self.capacity = capacity
+        self.times = [0.0] * capacity
+        self.values = [0.0] * capacity
+        self.head = 0
+        self.size = 0
+        self.t0 = None
+        self.x0 = 0.0
+        self.s_x = self.s_xx = self.s_t = self.s_tt = self.s_tx = 0.0
+        self.updates = 0
+        self.buckets = np.zeros(NUM_BUCKETS, dtype=np.int64) if quantiles else None
+
+    @staticmethod
+    def bucket(x):
+        if x <= 0:
+            return 0
+        index = int((math.log2(x) - MIN_OCTAVE) * BUCKETS_PER_OCTAVE)
+        return min(max(index, 0), NUM_BUCKETS - 1)
+
+    def _add(self, t, x, sign):
+        dt, dx = t - self.t0, x - self.x0
+        self.s_x += sign * dx
+        self.s_xx += sign * dx * dx
+        self.s_t += sign * dt
+        self.s_tt += sign * dt * dt
+        self.s_tx += sign * dt * dx
+        if self.buckets is not None:
+            self.buckets[self.bucket(x)] += sign
+
+    def _evict(self):
+        self._add(self.times[self.head], self.values[self.head], -1)
+        self.head = (self.head + 1) % self.capacity
+        self.size -= 1
+
+    def update(self, t, x):
+        if self.t0 is None:
+            self.t0, self.x0 = t, x
+        while self.size and (self.times[self.head] < t - self.window_s or self.size == self.capacity):
+            self._evict()
+        tail = (self.head + self.size) % self.capacity
+        self.times[tail] = t
+        self.values[tail] = x
+        self.size += 1
+        self._add(t, x, 1)
+        self.updates += 1
+        if self.updates % self.capacity == 0:
+            self._resum()
+
+    def _resum(self):
+        self.s_x = self.s_xx = self.s_t = self.s_tt = self.s_tx = 0.0
+        for i in range(self.size):
+            j = (self.head + i) % self.capacity
+            dt, dx = self.times[j] - self.t0, self.values[j] - self.x0
+            self.s_x += dx
+            self.s_xx += dx * dx
+            self.s_t += dt
+            self.s_tt += dt * dt
+            self.s_tx += dt * dx
+
+    def mean(self):
+        return self.x0 + self.s_x / self.size if self.size else None
+
+    def std(self):
+        if not self.size:
+            return None
+        variance = (self.s_xx - self.s_x * self.s_x / self.size) / self.size
+        return math.sqrt(max(variance, 0.0))
+
+    def slope(self):
+        """Least-squares rate of change per second over the window."""
+        n = self.size
+        denominator = n * self.s_tt - self.s_t * self.s_t
+        if n < 2 or denominator <= 1e-12:
+            return 0.0 if n else None
+        return (n * self.s_tx - self.s_t * self.s_x) / denominator
+
+    def quantile(self, q):
+        """Approximate quantile (geometric midpoint of its bucket; 0 for the lowest bucket)."""
+        if not self.size:
+            return None
+        index = int(np.searchsorted(np.cumsum(self.buckets), q * self.size))
+        if index == 0:
+            return 0.0
+        return 2.0 ** ((index + 0.5) / BUCKETS_PER_OCTAVE + MIN_OCTAVE)
+
+class FeaturePipeline:
+    """
+    Streaming features of named signals, read out as a fixed-layout float32 vector.
+
+    Feed samples with `update(t, {signal: value, ...})`; unknown signals and NaN values
+    are ignored, so a partial scrape only updates what it has. Windows of the same signal
+    and length are shared between features.
+    """
+
+    def __init__(self, layout=DEFAULT_LAYOUT, max_rate_hz=MAX_RATE_HZ):
+        self.layout = list(layout)
+        self.names = [column[0] for column in self.layout]
+        self.last = {}
+        self.ewmas = {}
+        self.windows = {}
+        self._readers = []
+        quantile_windows = {(c[1], c[3]) for c in self.layout if c[2].startswith('p')}
+        for name, signal, feature, param, scale in self.layout:
+            if feature == 'last':
+                reader = (lambda s: lambda: self.last.get(s))(signal)
+            elif feature == 'ewma':
+                ewma = self.ewmas.setdefault((signal, param), Ewma(param))
+                reader = (lambda e: lambda: e.value)(ewma)
+            elif feature in ('mean', 'std', 'slope') or feature.startswith('p'):
+                quantile = feature.startswith('p')
+                window = self.windows.get((signal, param))
+                if window is None:
+                    capacity = max(2, int(math.ceil(param * max_rate_hz)))
+                    window = self.windows[(signal, param)] = SlidingWindow(
+                        param, capacity, (signal, param) in quantile_windows)
+                if quantile:
+                    q = float(feature[1:]) / 100.0
+                    if not 0.0 < q < 1.0:
+                        raise ValueError(f"Bad quantile feature {feature!r} in column {name}")
+                    reader = (lambda w, q: lambda: w.quantile(q))(window, q)
+                else:
+                    reader = getattr(window, feature)
+            else:
+                raise ValueError(f"Unknown feature {feature!r} in column {name}")
+            self._readers.append((reader, 1.0 / scale if scale else 1.0))
+        self._by_signal = {}
+        for (signal, _), ewma in self.ewmas.items():
+            self._by_signal.setdefault(signal, []).append(ewma)
+        for (signal, _), window in self.windows.items():
+            self._by_signal.setdefault(signal, []).append(window)
+        self._vector = np.zeros(len(self.layout), dtype=np.float32)
+
+    def update(self, t, values):
+        """Add one sample per signal at time `t` (seconds, any monotonic clock)."""
+        for signal, x in values.items():
+            if x is None or x != x:
+                continue
+            x = float(x)
+            self.last[signal] = x
+            for stat in self._by_signal.get(signal, ()):
+                stat.update(t, x)
+
+    def vector(self, out=None):
+        """The current features in layout order (a reused array unless `out` is given)."""
+        out = self._vector if out is None else out
+        for i, (reader, scale) in enumerate(self._readers):
+            value = reader()
+            out[i] = value * scale if value is not None else 0.0
+        return out
+
+    def as_dict(self):
+        """Unscaled feature values by column name, for logging."""
+        return {name: reader() for name, (reader, _) in zip(self.names, self._readers)}
+
+def _reference_vector(layout, times, history):
+    """The same features recomputed from the full history, for the benchmark."""
+    out = []
+    for _, signal, feature, param, scale in layout:
+        t, x = times, history[signal]
+        if feature == 'last':
+            value = x[-1]
+        elif feature == 'ewma':
+            value = x[0]
+            for i in range(1, len(x)):
+                value += (1.0 - 2.0 ** (-(t[i] - t[i - 1]) / param)) * (x[i] - value)
+        else:
+            keep = t >= t[-1] - param
+            tw, xw = t[keep], x[keep]
+            if feature == 'mean':
+                value = xw.mean()
+            elif feature == 'std':
+                value = xw.std()
+            elif feature == 'slope':
+                value = np.polyfit(tw, xw, 1)[0] if len(xw) > 1 else 0.0
+            else:
+                value = np.percentile(xw, float(feature[1:]))
+        out.append(value / scale)
+    return np.array(out, dtype=np.float32)
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark the streaming state features')
+    parser.add_argument('--steps', type=int, default=3600,
+                        help='Number of one-second metric samples to feed')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Random seed of the synthetic metrics')
+    return parser.parse_args()
+
+def main():
+    """Main function."""
+    args = parse_args()
+    rng = np.random.default_rng(args.seed)
+    steps = args.steps
+    times = np.arange(steps, dtype=float) + rng.uniform(0.0, 0.05, steps)
+    rps = 40.0 + 30.0 * np.sin(times / 300.0) + rng.normal(0.0, 5.0, steps)
+    history = {
+        'cpu_cores': np.full(steps, 2.0), 'memory_mb': np.full(steps, 4096.0),
+        'batch_size': np.full(steps, 4.0), 'instances': np.full(steps, 1.0),
+        'rps': rps, 'throughput_rps': rps * 0.98,
+        'latency_ms': rng.lognormal(np.log(70.0 + rps), 0.3),
+        'queue_ms': rng.exponential(5.0, steps), 'gpu_utilization': np.clip(rps / 100.0, 0, 1),
+    }
+    samples = [{name: float(values[i]) for name, values in history.items()} for i in range(steps)]
+
+    pipeline = FeaturePipeline()
+    update_ns, vector_ns = [], []
+    for i in range(steps):
+        start = time.perf_counter_ns()
+        pipeline.update(times[i], samples[i])
+        middle = time.perf_counter_ns()
+        pipeline.vector()
+        update_ns.append(middle - start)
+        vector_ns.append(time.perf_counter_ns() - middle)
+
+    start = time.perf_counter_ns()
+    reference = _reference_vector(pipeline.layout, times, history)
+    reference_us = (time.perf_counter_ns() - start) / 1000
+
+    vector = pipeline.vector()
+    print(f"{steps} steps, {len(pipeline.names)} features")
+    print(f"update: median {np.median(update_ns) / 1000:.1f} us, P99 {np.percentile(update_ns, 99) / 1000:.1f} us")
+    print(f"vector: median {np.median(vector_ns) / 1000:.1f} us, P99 {np.percentile(vector_ns, 99) / 1000:.1f} us")
+    print(f"recomputing from the full history: {reference_us:.0f} us")
+    for name, value, expected in zip(pipeline.names, vector, reference):
+        print(f"  {name:<22} {value:>10.4f} {expected:>10.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Offline evaluation of scheduling policies from logged transitions.
+
+A transition log is an `.npz` file with one row per control step:
+  obs                [N, OBS_DIM] float32   state before the action
+  action             [N] int64              action taken (index in sim_env.ACTIONS)
+  behavior_prob      [N] float64            probability the logging policy gave that action
+  reward_components  [N, 4] float32         unweighted reward terms (REWARD_COMPONENTS)
+  next_obs           [N, OBS_DIM] float32   state after the action
+  done               [N] bool               the episode ended after this step
+  episode, step      [N] int64              episode id and step within it
+plus a JSON `meta` entry. `--collect` writes one from the simulator with any behavior
+policy mixed with epsilon-uniform exploration, so every action keeps some probability;
+live runs can write the same format with TransitionLog. Logs of deterministic
+controllers without exploration only support evaluating policies that agree with them.
+
+Estimates use the whole log at once: episodes are laid out as padded [episodes, steps]
+arrays, target policy probabilities are computed in one batch, and rewards for any
+number of w1-w4 weightings (plan.md) are one matrix product of the logged components.
+Estimators: IS and weighted IS over trajectories, per-decision IS (PDIS, WPDIS), the
+direct method (DM) with a linear fitted-Q evaluation model, and doubly robust (DR and
+weighted WDR). Confidence intervals come from resampling episodes, computed as one
+matrix product of bootstrap counts with per-episode terms.
+"""
+
+import os
+import sys
+import json
+import argparse
+import numpy as np
+
+from sim_env import VecInferenceEnv, NUM_ACTIONS, ACTIONS, LOAD_PATTERNS, REWARD_WEIGHTS, REWARD_COMPONENTS, REWARD_SIGNS
+
+ESTIMATORS = ('behavior', 'IS', 'WIS', 'PDIS', 'WPDIS', 'DM', 'DR', 'WDR')
+
+LOG_FIELDS = ('obs', 'action', 'behavior_prob', 'reward_components', 'next_obs', 'done', 'episode', 'step')
+
+class TransitionLog:
+    """Accumulates transitions, one or a batch of environments at a time."""
+
+    def __init__(self, **meta):
+        self.meta = dict(meta)
+        self._parts = {name: [] for name in LOG_FIELDS}
+
+    def add(self, obs, action, behavior_prob, reward_components, next_obs, done, episode, step):
+        """Append a batch of transitions (arrays with a leading batch dimension)."""
+        values = dict(obs=obs, action=action, behavior_prob=behavior_prob, reward_components=reward_components,
+                      next_obs=next_obs, done=done, episode=episode, step=step)
+        for name, value in values.items():
+            self._parts[name].append(np.atleast_1d(np.asarray(value)))
+
+    def arrays(self):
+        return {name: np.concatenate(parts) for name, parts in self._parts.items() if parts}
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'wb') as f:
+            np.savez(f, meta=np.array(json.dumps(self.meta, default=str)), **self.arrays())
+
+def load_transitions(paths):
+    """Read and concatenate transition logs, keeping episode ids distinct across files."""
+    merged, metas, offset = {name: [] for name in LOG_FIELDS}, [], 0
+    for path in paths:
+        with np.load(path) as data:
+            metas.append(json.loads(str(data['meta'])) if 'meta' in data else {})
+            for name in LOG_FIELDS:
+                merged[name].append(data[name] + offset if name == 'episode' else data[name])
+        offset = int(merged['episode'][-1].max()) + 1 if len(merged['episode'][-1]) else offset
+    return {name: np.concatenate(parts) for name, parts in merged.items()}, metas
+
+class EpisodeBatch:
+    """A transition log laid out as padded [episodes, steps] arrays with a validity mask."""
+
+    def __init__(self, log):
+        episodes, episode_index = np.unique(log['episode'], return_inverse=True)
+        first = np.full(len(episodes), np.iinfo(np.int64).max)
+        np.minimum.at(first, episode_index, log['step'])
+        steps = log['step'] - first[episode_index]
+        num_episodes, horizon = len(episodes), int(steps.max()) + 1
+        self.shape = (num_episodes, horizon)
+        self.index = (episode_index, steps)
+
+        def pad(values, fill=0.0):
+            out = np.full(self.shape + values.shape[1:], fill, dtype=values.dtype)
+            out[self.index] = values
+            return out
+
+        self.mask = pad(np.ones(len(episode_index), dtype=bool), False)
+        self.obs = pad(log['obs'].astype(np.float32))
+        self.next_obs = pad(log['next_obs'].astype(np.float32))
+        self.action = pad(log['action'].astype(np.int64))
+        self.behavior_prob = pad(log['behavior_prob'].astype(np.float64), 1.0)
+        self.components = pad(log['reward_components'].astype(np.float64))
+        self.done = pad(log['done'].astype(bool), True)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def flat(self, padded):
+        """The logged rows of a padded array, in the order of self.index."""
+        return padded[self.index]
+
+def signed_weights(weight_sets):
+    """[K, 4] matrix turning reward components into rewards for each weighting."""
+    return np.asarray(weight_sets, dtype=np.float64).reshape(-1, len(REWARD_COMPONENTS)) * REWARD_SIGNS
+
+def fitted_q(batch, target_next_probs, gamma, iterations=None, ridge=1e-3):
+    """
+    Linear fitted-Q evaluation of the target policy, per reward component.
+
+    Q(s, a) is linear in [s, s^2, 1] with separate weights per action. As the model is
+    linear in the rewards, fitting each component separately gives the Q of any weighting
+    as the same combination of the component Qs. Targets are clipped to the discounted
+    range the logged components allow, which keeps the fit from diverging on states the
+    target policy reaches but the log does not cover. Returns a function obs -> [n, A, 4].
+    """
+    def features(obs):
+        return np.concatenate([obs, obs * obs, np.ones((len(obs), 1), dtype=obs.dtype)], axis=1).astype(np.float64)
+
+    obs, next_obs = features(batch.flat(batch.obs)), features(batch.flat(batch.next_obs))
+    actions = batch.flat(batch.action)
+    rewards = batch.flat(batch.components)
+    not_done = 1.0 - batch.flat(batch.done)
+    n, dim = obs.shape
+    channels = rewards.shape[1]
+    horizon = batch.shape[1]
+    total_discount = (1.0 - gamma ** horizon) / (1.0 - gamma) if gamma < 1.0 else float(horizon)
+    low, high = rewards.min(axis=0), rewards.max(axis=0)
+    q_low = np.minimum(low, low * total_discount)
+    q_high = np.maximum(high, high * total_discount)
+    # Ridge solution operator per action, computed once
+    solvers = []
+    for a in range(NUM_ACTIONS):
+        rows = np.flatnonzero(actions == a)
+        x = obs[rows]
+        solvers.append((rows, np.linalg.solve(x.T @ x + ridge * len(x) * np.eye(dim), x.T) if len(rows) else None))
+
+    # weights[:, a * channels + c] maps features to Q of action a, component c
+    weights = np.zeros((dim, NUM_ACTIONS * channels))
+    for _ in range(iterations or horizon):
+        next_q = (next_obs @ weights).reshape(n, NUM_ACTIONS, channels)
+        next_v = (target_next_probs[:, :, None] * next_q).sum(axis=1)
+        targets = np.clip(rewards + gamma * not_done[:, None] * next_v, q_low, q_high)
+        for a, (rows, solver) in enumerate(solvers):
+            if solver is not None:
+                weights[:, a * channels:(a + 1) * channels] = solver @ targets[rows]
+    return lambda o: np.clip((features(o) @ weights).reshape(len(o), NUM_ACTIONS, channels), q_low, q_high)
+
+def _json_floats(values):
+    return [float(v) if np.isfinite(v) else None for v in values]
+
+def evaluate(batch, target_probs, target_next_probs, weight_sets, gamma=0.99, bootstrap=200, seed=0,
+             fqe_iterations=None):
+    """
+    Estimate the value of one target policy under each weighting.
+
+    `target_probs` / `target_next_probs` are the policy's action probabilities at the
+    logged states and next states ([N, A], in log order). Returns {estimator: {'value':
+    [K], 'ci95': [K, 2]}} plus importance weight diagnostics.
+    """
+    mask = batch.mask
+    num_episodes, horizon = batch.shape
+    w_signed = signed_weights(weight_sets)
+    rewards = np.einsum('etc,kc->etk', batch.components, w_signed) * mask[..., None]
+
+    pi = np.ones(batch.shape + (NUM_ACTIONS,)) / NUM_ACTIONS
+    pi[batch.index] = target_probs
+    pi_taken = np.take_along_axis(pi, batch.action[..., None], axis=2)[..., 0]
+    rho = np.where(mask, pi_taken / np.maximum(batch.behavior_prob, 1e-12), 1.0)
+    w = np.cumprod(rho, axis=1)
+    w_prev = np.concatenate([np.ones((num_episodes, 1)), w[:, :-1]], axis=1)
+    discount = gamma ** np.arange(horizon)
+
+    q_model = fitted_q(batch, target_next_probs, gamma, fqe_iterations)
+    q_all = np.zeros(batch.shape + (NUM_ACTIONS, len(REWARD_COMPONENTS)))
+    q_all[batch.index] = q_model(batch.flat(batch.obs))
+    q_all = np.einsum('etac,kc->etak', q_all, w_signed)
+    q_taken = np.take_along_axis(q_all, batch.action[..., None, None], axis=2)[:, :, 0]
+    v = np.einsum('eta,etak->etk', pi, q_all) * mask[..., None]
+    q_taken *= mask[..., None]
+
+    d = discount[None, :, None]
+    final_w = w[np.arange(num_episodes), mask.sum(axis=1) - 1]
+    returns = (d * rewards).sum(axis=1)
+    terms = {
+        'returns': returns,
+        'is': final_w[:, None] * returns,
+        'pdis': (d * w[..., None] * rewards).sum(axis=1),
+        'dm': v[:, 0],
+        'dr': (d * (w[..., None] * (rewards - q_taken) + w_prev[..., None] * v)).sum(axis=1),
+    }
+    per_step = {
+        'wr': d * w[..., None] * rewards,
+        'w_residual': d * w[..., None] * (rewards - q_taken),
+        'w_prev_v': d * w_prev[..., None] * v,
+    }
+
+    def estimates(counts):
+        """Estimators for episode multiplicities `counts` [B, E]."""
+        n = counts.sum(axis=1)[:, None]
+        mean = {name: counts @ value / n for name, value in terms.items()}
+        step_sum = {name: np.einsum('be,etk->btk', counts, value) for name, value in per_step.items()}
+        # Steps where no episode keeps any weight carry no information and add nothing
+        w_sum = np.where((counts @ w) > 0, counts @ w, np.inf)[..., None]
+        w_prev_sum = np.where((counts @ w_prev) > 0, counts @ w_prev, np.inf)[..., None]
+        return {
+            'behavior': mean['returns'],
+            'IS': mean['is'],
+            'WIS': (counts @ (final_w[:, None] * returns)) / (counts @ final_w)[:, None],
+            'PDIS': mean['pdis'],
+            'WPDIS': (step_sum['wr'] / w_sum).sum(axis=1),
+            'DM': mean['dm'],
+            'DR': mean['dr'],
+            'WDR': (step_sum['w_residual'] / w_sum + step_sum['w_prev_v'] / w_prev_sum).sum(axis=1),
+        }
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        point = estimates(np.ones((1, num_episodes)))
+        rng = np.random.default_rng(seed)
+        counts = rng.multinomial(num_episodes, np.full(num_episodes, 1.0 / num_episodes), size=bootstrap)
+        resampled = estimates(counts.astype(np.float64))
+    results = {}
+    for name in ESTIMATORS:
+        # Undefined estimates (e.g. WIS when no episode keeps any weight) are reported as None
+        values = resampled[name]
+        defined = np.isfinite(values).any(axis=0)
+        ci = np.full((len(w_signed), 2), np.nan)
+        if defined.any():
+            ci[defined] = np.nanpercentile(values[:, defined], [2.5, 97.5], axis=0).T
+        results[name] = {'value': _json_floats(point[name][0]), 'ci95': [_json_floats(row) for row in ci]}
+    results['diagnostics'] = {
+        'episodes': num_episodes,
+        'effective_sample_size': float(final_w.sum() ** 2 / max((final_w ** 2).sum(), 1e-300)),
+        'max_final_weight': float(final_w.max()),
+        'mean_step_weight': float(rho[mask].mean()),
+    }
+    return results
+
+class FixedPolicy:
+    """Deterministic policy that always takes one action."""
+
+    def __init__(self, action):
+        self.action = ACTIONS.index(action)
+
+    def action_probs(self, obs):
+        probs = np.zeros((len(obs), NUM_ACTIONS))
+        probs[:, self.action] = 1.0
+        return probs
+
+class UniformPolicy:
+    """Every action with the same probability."""
+
+    def action_probs(self, obs):
+        return np.full((len(obs), NUM_ACTIONS), 1.0 / NUM_ACTIONS)
+
+class CheckpointPolicy:
+    """A trained ActorCritic checkpoint (ppo.py); greedy takes its most likely action."""
+
+    def __init__(self, path, greedy=False):
+        from ppo import load_policy
+        self.model = load_policy(path)
+        self.greedy = greedy
+
+    def action_probs(self, obs):
+        probs = self.model.action_probs(np.asarray(obs, dtype=np.float32)).astype(np.float64)
+        if self.greedy:
+            probs = np.eye(NUM_ACTIONS)[probs.argmax(axis=1)]
+        return probs
+
+class EpsilonPolicy:
+    """Mixes a policy with uniform exploration: (1 - eps) * pi + eps / A."""
+
+    def __init__(self, policy, epsilon):
+        self.policy = policy
+        self.epsilon = epsilon
+
+    def action_probs(self, obs):
+        return (1.0 - self.epsilon) * self.policy.action_probs(obs) + self.epsilon / NUM_ACTIONS
+
+def make_policy(spec, greedy=False):
+    """Policy from a name ('uniform', 'noop' or any action name) or a checkpoint path."""
+    if spec == 'uniform':
+        return UniformPolicy()
+    if spec in ACTIONS:
+        return FixedPolicy(spec)
+    if os.path.exists(spec):
+        return CheckpointPolicy(spec, greedy)
+    raise ValueError(f"Unknown policy {spec!r}: use uniform, an action name or a checkpoint path")
+
+def collect(policy, episodes, load_pattern, seed, epsilon=0.1, source=''):
+    """Log one episode per simulated environment with an epsilon-exploring behavior policy."""
+    behavior = EpsilonPolicy(policy, epsilon)
+    env = VecInferenceEnv(num_envs=episodes, load_pattern=load_pattern, seed=seed)
+    rng = np.random.default_rng(seed + 1)
+    log = TransitionLog(source=source, epsilon=epsilon, load_pattern=load_pattern, seed=seed,
+                        episode_steps=env.episode_steps, reward_weights=list(REWARD_WEIGHTS))
+    obs = env.reset(seed=seed)
+    episode_ids = np.arange(episodes)
+    for step in range(env.episode_steps):
+        probs = behavior.action_probs(obs)
+        # Inverse-CDF sampling of one action per environment
+        actions = (rng.random((episodes, 1)) > np.cumsum(probs, axis=1)).sum(axis=1).clip(0, NUM_ACTIONS - 1)
+        next_obs, _, dones, info = env.step(actions)
+        log.add(obs, actions, probs[np.arange(episodes), actions], info['reward_components'],
+                info['terminal_obs'], dones, episode_ids, np.full(episodes, step))
+        obs = next_obs
+    return log
+
+def simulate_value(policy, episodes, load_pattern, seed, weight_sets, gamma):
+    """On-policy Monte Carlo value of a policy in the simulator, per weighting."""
+    env = VecInferenceEnv(num_envs=episodes, load_pattern=load_pattern, seed=seed)
+    rng = np.random.default_rng(seed + 1)
+    w_signed = signed_weights(weight_sets)
+    obs = env.reset(seed=seed)
+    returns = np.zeros((episodes, len(w_signed)))
+    for step in range(env.episode_steps):
+        probs = policy.action_probs(obs)
+        actions = (rng.random((episodes, 1)) > np.cumsum(probs, axis=1)).sum(axis=1).clip(0, NUM_ACTIONS - 1)
+        obs, _, _, info = env.step(actions)
+        returns += gamma ** step * (info['reward_components'] @ w_signed.T)
+    return returns.mean(axis=0).tolist()
+
+def _format(value):
+    return 'n/a' if value is None else f"{value:.2f}"
+
+def parse_weight_sets(value):
+    """'1,0.5,1,2;1,1,1,1' -> [[1, 0.5, 1, 2], [1, 1, 1, 1]]."""
+    sets = [[float(x) for x in part.split(',')] for part in value.split(';') if part.strip()]
+    for weights in sets:
+        if len(weights) != len(REWARD_COMPONENTS):
+            raise ValueError(f"Each weighting needs {len(REWARD_COMPONENTS)} values (w1-w4), got {weights}")
+    return sets
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Estimate policy values offline from logged transitions')
+    parser.add_argument('--logs', type=str, nargs='*', default=[],
+                        help='Transition logs (.npz) to evaluate on')
+    parser.add_argument('--policies', type=str, default='noop,uniform',
+                        help='Comma-separated target policies: uniform, an action name, or checkpoint paths')
+    parser.add_argument('--greedy', action='store_true',
+                        help='Evaluate checkpoint policies greedily instead of sampling')
+    parser.add_argument('--weights', type=str, default=','.join(str(w) for w in REWARD_WEIGHTS),
+                        help="Reward weightings w1,w2,w3,w4, several separated by ';'")
+    parser.add_argument('--gamma', type=float, default=0.99,
+                        help='Discount factor')
+    parser.add_argument('--rank-by', type=str, default='WDR', choices=ESTIMATORS[1:],
+                        help='Estimator used to rank the policies')
+    parser.add_argument('--bootstrap', type=int, default=200,
+                        help='Bootstrap resamples for the confidence intervals')
+    parser.add_argument('--fqe-iterations', type=int, default=None,
+                        help='Fitted-Q iterations (default: the longest episode)')
+    parser.add_argument('--collect', type=str, default=None,
+                        help='Instead of evaluating, write a simulator log of --behavior to this path')
+    parser.add_argument('--behavior', type=str, default='noop',
+                        help='Behavior policy logged by --collect')
+    parser.add_argument('--epsilon', type=float, default=0.2,
+                        help='Uniform exploration mixed into the --collect behavior policy')
+    parser.add_argument('--episodes', type=int, default=256,
+                        help='Episodes logged by --collect (and simulated by --check-sim)')
+    parser.add_argument('--load-pattern', type=str, default='mixed', choices=['mixed'] + LOAD_PATTERNS,
+                        help='Load pattern of the simulator for --collect and --check-sim')
+    parser.add_argument('--check-sim', action='store_true',
+                        help='Also run each policy in the simulator for its true value')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Random seed')
+    parser.add_argument('--output-file', type=str, default='offline_eval.json',
+                        help='Path to save the estimates')
+    return parser.parse_args()
+
+def main():
+    """Main function."""
+    args = parse_args()
+    if args.collect:
+        log = collect(make_policy(args.behavior, args.greedy), args.episodes, args.load_pattern, args.seed,
+                      args.epsilon, source=f"sim:{args.behavior}")
+        log.save(args.collect)
+        print(f"Logged {args.episodes} episodes of {args.behavior} (epsilon {args.epsilon}) to {args.collect}")
+        return
+    if not args.logs:
+        print("Error: give --logs to evaluate, or --collect to write a log")
+        sys.exit(2)
+
+    weight_sets = parse_weight_sets(args.weights)
+    log, metas = load_transitions(args.logs)
+    batch = EpisodeBatch(log)
+    print(f"{len(log['action'])} transitions in {len(batch)} episodes from {len(args.logs)} logs; "
+          f"{len(weight_sets)} weightings")
+
+    report = {'logs': args.logs, 'log_meta': metas, 'weights': weight_sets, 'gamma': args.gamma, 'policies': {}}
+    for spec in [p for p in args.policies.split(',') if p]:
+        policy = make_policy(spec, args.greedy)
+        results = evaluate(batch, policy.action_probs(log['obs']), policy.action_probs(log['next_obs']),
+                           weight_sets, args.gamma, args.bootstrap, args.seed, args.fqe_iterations)
+        if args.check_sim:
+            results['simulated'] = simulate_value(policy, args.episodes, args.load_pattern, args.seed + 1000,
+                                                  weight_sets, args.gamma)
+        report['policies'][spec] = results
+
+    for k, weights in enumerate(weight_sets):
+        print(f"\nWeights {weights} (ranked by {args.rank_by}):")
+        header = ''.join(f"{name:>10}" for name in ESTIMATORS) + ('       sim' if args.check_sim else '') + '     ESS'
+        print(f"{'policy':<28}{header}")
+        ranked = sorted(report['policies'].items(),
+                        key=lambda item: -(item[1][args.rank_by]['value'][k] if item[1][args.rank_by]['value'][k]
+                                           is not None else -np.inf))
+        for spec, results in ranked:
+            row = ''.join(f"{_format(results[name]['value'][k]):>10}" for name in ESTIMATORS)
+            if args.check_sim:
+                row += f"{results['simulated'][k]:>10.2f}"
+            print(f"{os.path.basename(spec)[:27]:<28}{row}{results['diagnostics']['effective_sample_size']:>8.1f}")
+        report.setdefault('ranking', []).append([spec for spec, _ in ranked])
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output_file)), exist_ok=True)
+    with open(args.output_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nEstimates saved to {args.output_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Train the PPO scheduling agent against the vectorized simulator.
+
+Rollouts are collected from a batch of environments at once into preallocated
+[num_steps, num_envs] arrays. GAE is computed for all environments in one backward
+pass, and minibatches are drawn by permuting flat indices into those arrays, so no
+per-transition Python objects are created during training.
+"""
+
+import os
+import json
+import time
+import argparse
+import numpy as np
+import torch
+import torch.nn as nn
+
+from sim_env import VecInferenceEnv, OBS_DIM, NUM_ACTIONS, LOAD_PATTERNS
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Train the PPO scheduling agent in simulation')
+    parser.add_argument('--num-envs', type=int, default=16,
+                        help='Number of simulated environments stepped together')
+    parser.add_argument('--num-steps', type=int, default=128,
+                        help='Rollout length per environment between updates')
+    parser.add_argument('--total-steps', type=int, default=500000,
+                        help='Total environment steps to train for')
+    parser.add_argument('--load-pattern', type=str, default='mixed',
+                        choices=['mixed'] + LOAD_PATTERNS,
+                        help='Load pattern driving the simulator')
+    parser.add_argument('--learning-rate', type=float, default=3e-4,
+                        help='Adam learning rate')
+    parser.add_argument('--gamma', type=float, default=0.99,
+                        help='Discount factor')
+    parser.add_argument('--gae-lambda', type=float, default=0.95,
+                        help='GAE lambda')
+    parser.add_argument('--clip', type=float, default=0.2,
+                        help='PPO clipping range')
+    parser.add_argument('--epochs', type=int, default=4,
+                        help='Optimization epochs per rollout')
+    parser.add_argument('--minibatch-size', type=int, default=512,
+                        help='Minibatch size in transitions')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Random seed')
+    parser.add_argument('--output-dir', type=str, default='results/rl',
+                        help='Directory for checkpoints and the training log')
+    return parser.parse_args()
+
+class RolloutBuffer:
+    """Contiguous [num_steps, num_envs] storage for one PPO rollout."""
+
+    def __init__(self, num_steps, num_envs, obs_dim):
+        self.num_steps = num_steps
+        self.num_envs = num_envs
+        self.obs = np.zeros((num_steps, num_envs, obs_dim), dtype=np.float32)
+        self.actions = np.zeros((num_steps, num_envs), dtype=np.int64)
+        self.logp = np.zeros((num_steps, num_envs), dtype=np.float32)
+        self.rewards = np.zeros((num_steps, num_envs), dtype=np.float32)
+        self.dones = np.zeros((num_steps, num_envs), dtype=np.float32)
+        # V(final observation) of episodes cut off by the time limit after step t, else 0
+        self.truncated_values = np.zeros((num_steps, num_envs), dtype=np.float32)
+        self.values = np.zeros((num_steps, num_envs), dtype=np.float32)
+        self.advantages = np.zeros((num_steps, num_envs), dtype=np.float32)
+        self.returns = np.zeros((num_steps, num_envs), dtype=np.float32)
+        self.step = 0
+
+    def add(self, obs, actions, logp, rewards, dones, values, truncated_values=0.0):
+        """Write one step for every environment; truncated_values bootstraps time-limit ends."""
+        t = self.step
+        self.obs[t] = obs
+        self.actions[t] = actions
+        self.logp[t] = logp
+        self.rewards[t] = rewards
+        self.dones[t] = dones
+        self.values[t] = values
+        self.truncated_values[t] = truncated_values
+        self.step += 1
+
+    def compute_gae(self, last_values, gamma=0.99, lam=0.95):
+        """Generalized advantage estimation over all environments at once."""
+        last_gae = np.zeros(self.num_envs, dtype=np.float32)
+        next_values = last_values
+        for t in reversed(range(self.num_steps)):
+            # dones[t] marks that the episode ended after step t: the next state belongs to a new
+            # episode, so the advantage chain stops there. Episodes cut off by the time limit are
+            # still bootstrapped, from the value of their final observation
+            not_done = 1.0 - self.dones[t]
+            delta = (self.rewards[t] + gamma * (next_values * not_done + self.truncated_values[t])
+                     - self.values[t])
+            last_gae = delta + gamma * lam * not_done * last_gae
+            self.advantages[t] = last_gae
+            next_values = self.values[t]
+        self.returns[:] = self.advantages + self.values
+
+    def minibatches(self, minibatch_size, rng):
+        """Yield flat index arrays covering the rollout in a random order."""
+        n = self.num_steps * self.num_envs
+        order = rng.permutation(n)
+        for start in range(0, n, minibatch_size):
+            yield order[start:start + minibatch_size]
+
+    def flat(self):
+        """Views of the rollout flattened to [num_steps * num_envs, ...]."""
+        n = self.num_steps * self.num_envs
+        return {
+            'obs': self.obs.reshape(n, -1),
+            'actions': self.actions.reshape(n),
+            'logp': self.logp.reshape(n),
+            'advantages': self.advantages.reshape(n),
+            'returns': self.returns.reshape(n),
+            'values': self.values.reshape(n),
+        }
+
+    def reset(self):
+        self.step = 0
+
+class ActorCritic(nn.Module):
+    """Small MLP policy and value network over the simulator state vector."""
+
+    def __init__(self, obs_dim=OBS_DIM, num_actions=NUM_ACTIONS, hidden=64):
+        super().__init__()
+        self.policy = nn.Sequential(
+            nn.Linear(obs_dim, hidden), nn.Tanh(),
+            nn.Linear(hidden, hidden), nn.Tanh(),
+            nn.Linear(hidden, num_actions),
+        )
+        self.value = nn.Sequential(
+            nn.Linear(obs_dim, hidden), nn.Tanh(),
+            nn.Linear(hidden, hidden), nn.Tanh(),
+            nn.Linear(hidden, 1),
+        )
+
+    def distribution(self, obs):
+        return torch.distributions.Categorical(logits=self.policy(obs))
+
+    def forward(self, obs):
+        return self.distribution(obs), self.value(obs).squeeze(-1)
+
+    @torch.no_grad()
+    def act(self, obs, deterministic=False):
+        """Pick actions for a batch of NumPy observations; returns (actions, logp, values)."""
+        dist, values = self(torch.as_tensor(obs))
+        actions = dist.probs.argmax(-1) if deterministic else dist.sample()
+        return actions.numpy(), dist.log_prob(actions).numpy(), values.numpy()
+
+    @torch.no_grad()
+    def values(self, obs):
+        """State values for a batch of NumPy observations."""
+        return self.value(torch.as_tensor(obs, dtype=torch.float32)).squeeze(-1).numpy()
+
+    @torch.no_grad()
+    def action_probs(self, obs):
+        """Action probabilities for a batch of NumPy observations."""
+        return self.distribution(torch.as_tensor(obs, dtype=torch.float32)).probs.numpy()
+
+class PPOTrainer:
+    """Clipped-objective PPO over rollouts from a VecInferenceEnv."""
+
+    def __init__(self, env, num_steps=128, learning_rate=3e-4, gamma=0.99, gae_lambda=0.95,
+                 clip=0.2, epochs=4, minibatch_size=512, value_coef=0.5, entropy_coef=0.01,
+                 max_grad_norm=0.5, seed=0):
+        self.env = env
+        self.gamma = gamma
+        self.gae_lambda = gae_lambda
+        self.clip = clip
+        self.epochs = epochs
+        self.minibatch_size = minibatch_size
+        self.value_coef = value_coef
+        self.entropy_coef = entropy_coef
+        self.max_grad_norm = max_grad_norm
+        self.rng = np.random.default_rng(seed)
+        torch.manual_seed(seed)
+
+        self.model = ActorCritic()
+        self.optimizer = torch.optim.Adam(self.model.parameters(), lr=learning_rate, eps=1e-5)
+        self.buffer = RolloutBuffer(num_steps, env.num_envs, OBS_DIM)
+        self.obs = env.reset(seed=seed)
+
+        # Running episode returns, used for the reward curve
+        self.episode_returns = np.zeros(env.num_envs)
+        self.completed_returns = []
+
+    def collect_rollout(self):
+        """Fill the rollout buffer by stepping every environment num_steps times."""
+        buf = self.buffer
+        buf.reset()
+        for _ in range(buf.num_steps):
+            actions, logp, values = self.model.act(self.obs)
+            next_obs, rewards, dones, info = self.env.step(actions)
+            # VecInferenceEnv episodes only end at the time limit, so every done is a truncation
+            truncated_values = np.zeros(self.env.num_envs, dtype=np.float32)
+            if dones.any():
+                truncated_values[dones] = self.model.values(info['terminal_obs'][dones])
+            buf.add(self.obs, actions, logp, rewards, dones, values, truncated_values)
+            self.episode_returns += rewards
+            if dones.any():
+                self.completed_returns.extend(self.episode_returns[dones].tolist())
+                self.episode_returns[dones] = 0.0
+            self.obs = next_obs
+        _, _, last_values = self.model.act(self.obs)
+        buf.compute_gae(last_values, self.gamma, self.gae_lambda)
+
+    def update(self):
+        """Run PPO epochs over the current rollout; returns mean losses."""
+        data = {k: torch.as_tensor(v) for k, v in self.buffer.flat().items()}
+        stats = np.zeros(4)
+        updates = 0
+        for _ in range(self.epochs):
+            for idx in self.buffer.minibatches(self.minibatch_size, self.rng):
+                idx = torch.as_tensor(idx)
+                adv = data['advantages'][idx]
+                adv = (adv - adv.mean()) / (adv.std() + 1e-8)
+
+                dist, values = self.model(data['obs'][idx])
+                logp = dist.log_prob(data['actions'][idx])
+                ratio = torch.exp(logp - data['logp'][idx])
+                policy_loss = -torch.min(ratio * adv,
+                                         ratio.clamp(1 - self.clip, 1 + self.clip) * adv).mean()
+                value_loss = 0.5 * (data['returns'][idx] - values).pow(2).mean()
+                entropy = dist.entropy().mean()
+                loss = policy_loss + self.value_coef * value_loss - self.entropy_coef * entropy
+
+                self.optimizer.zero_grad()
+                loss.backward()
+                nn.utils.clip_grad_norm_(self.model.parameters(), self.max_grad_norm)
+                self.optimizer.step()
+
+                with torch.no_grad():
+                    approx_kl = (data['logp'][idx] - logp).mean()
+                stats += [policy_loss.item(), value_loss.item(), entropy.item(), approx_kl.item()]
+                updates += 1
+        return dict(zip(['policy_loss', 'value_loss', 'entropy', 'approx_kl'], stats / max(updates, 1)))
+
+    def train(self, total_steps, log_every=10):
+        """Alternate rollouts and updates; returns the training log."""
+        steps_per_iter = self.buffer.num_steps * self.env.num_envs
+        iterations = max(1, total_steps // steps_per_iter)
+        log = []
+        start_time = time.time()
+        for it in range(1, iterations + 1):
+            self.collect_rollout()
+            stats = self.update()
+            recent = self.completed_returns[-50:]
+            entry = {
+                'iteration': it,
+                'env_steps': it * steps_per_iter,
+                'mean_episode_return': float(np.mean(recent)) if recent else None,
+                'mean_step_reward': float(self.buffer.rewards.mean()),
+                'elapsed_time': time.time() - start_time,
+                **{k: float(v) for k, v in stats.items()},
+            }
+            log.append(entry)
+            if it % log_every == 0 or it == iterations:
+                ret = entry['mean_episode_return']
+                print(f"Iteration {it}/{iterations}: "
+                      f"return {ret if ret is None else round(ret, 2)}, "
+                      f"step reward {entry['mean_step_reward']:.3f}, "
+                      f"{entry['env_steps'] / entry['elapsed_time']:.0f} steps/sec")
+        return log
+
+    def save(self, path, extra=None):
+        """Save the model weights with enough metadata to rebuild it."""
+        torch.save({
+            'model_state': self.model.state_dict(),
+            'obs_dim': OBS_DIM,
+            'num_actions': NUM_ACTIONS,
+            **(extra or {}),
+        }, path)
+
+def load_policy(path):
+    """Load an ActorCritic saved by PPOTrainer.save in evaluation mode."""
+    checkpoint = torch.load(path, map_location='cpu')
+    model = ActorCritic(checkpoint['obs_dim'], checkpoint['num_actions'])
+    model.load_state_dict(checkpoint['model_state'])
+    model.eval()
+    return model
+
+def main():
+    """Main function."""
+    args = parse_args()
+
+    env = VecInferenceEnv(num_envs=args.num_envs, load_pattern=args.load_pattern, seed=args.seed)
+    trainer = PPOTrainer(env, num_steps=args.num_steps, learning_rate=args.learning_rate,
+                         gamma=args.gamma, gae_lambda=args.gae_lambda, clip=args.clip,
+                         epochs=args.epochs, minibatch_size=args.minibatch_size, seed=args.seed)
+
+    print(f"Training PPO on {args.num_envs} simulated environments ({args.load_pattern} load) "
+          f"for {args.total_steps} steps...")
+    try:
+        log = trainer.train(args.total_steps)
+    except KeyboardInterrupt:
+        print("Interrupted, saving current policy")
+        log = []
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    checkpoint_path = os.path.join(args.output_dir, 'ppo_policy.pt')
+    trainer.save(checkpoint_path, extra={'args': vars(args)})
+    log_path = os.path.join(args.output_dir, 'training_log.json')
+    with open(log_path, 'w') as f:
+        json.dump({'args': vars(args), 'log': log}, f, indent=2)
+    print(f"Policy saved to {checkpoint_path}")
+    print(f"Training log saved to {log_path}")
+
+if __name__ == "__main__":
+    main()
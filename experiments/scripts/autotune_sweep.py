@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Sweep serving configurations to find the best static baseline for MobileNetV4 on Triton.
+
+For each server configuration (model instance count x dynamic batching setting) and each
+request batch size, client concurrency is increased until the P99 latency SLO is exceeded.
+Every measured point records throughput and P50/P95/P99 latency, and the report lists the
+Pareto frontier of throughput vs. P99 along with the best SLO-compliant configuration.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import subprocess
+import tempfile
+import numpy as np
+
+from inference_client import InferenceClient, ENCODINGS, LB_POLICIES, add_request_args, request_options
+from load_generator import run_closed_loop
+from concurrency_limit import AdaptiveLimiter
+from synthetic_pool import SyntheticInputPool
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Autotune Triton serving configuration')
+    parser.add_argument('--url', type=str, default='http://localhost:8000',
+                        help='Triton server URL(s): comma-separated, or dns://<headless-service>:8000')
+    parser.add_argument('--lb-policy', type=str, default='least_outstanding', choices=LB_POLICIES,
+                        help='How requests are spread over multiple endpoints')
+    parser.add_argument('--model-name', type=str, default='mobilenetv4',
+                        help='Model name in Triton')
+    parser.add_argument('--concurrency-levels', type=str, default='1,2,4,8,16,32,64',
+                        help="Comma-separated client concurrency levels, ascending, or 'auto' to "
+                             "adapt the in-flight limit to the P99 SLO in a single run per batch size")
+    parser.add_argument('--max-concurrency', type=int, default=64,
+                        help="Upper bound on the adaptive limit with --concurrency-levels auto")
+    parser.add_argument('--batch-sizes', type=str, default='1,2,4,8',
+                        help='Comma-separated request batch sizes, ascending')
+    parser.add_argument('--instance-counts', type=str, default='1',
+                        help='Comma-separated model instance counts (needs --apply-server-configs)')
+    parser.add_argument('--dynamic-batching', type=str, default='off',
+                        help="Comma-separated max queue delays in microseconds, or 'off' "
+                             "(needs --apply-server-configs)")
+    parser.add_argument('--server-max-batch-size', type=int, default=16,
+                        help='max_batch_size used when dynamic batching is enabled')
+    parser.add_argument('--slo-p99-ms', type=float, default=100.0,
+                        help='P99 latency SLO in milliseconds')
+    parser.add_argument('--duration', type=float, default=20.0,
+                        help='Measurement time per point in seconds')
+    parser.add_argument('--warmup', type=float, default=3.0,
+                        help='Warmup time per point in seconds (not measured)')
+    parser.add_argument('--num-inputs', type=int, default=8,
+                        help='Number of distinct pre-encoded inputs cycled per batch size')
+    parser.add_argument('--encoding', type=str, default='binary', choices=ENCODINGS,
+                        help='Request wire encoding')
+    parser.add_argument('--apply-server-configs', action='store_true',
+                        help='Rewrite the model ConfigMap and restart Triton for each server config')
+    parser.add_argument('--kubectl', type=str, default='sudo microk8s kubectl',
+                        help='kubectl command used with --apply-server-configs')
+    parser.add_argument('--namespace', type=str, default='workloads',
+                        help='Kubernetes namespace of the Triton deployment')
+    parser.add_argument('--deployment', type=str, default='mobilenetv4-triton-deployment',
+                        help='Triton deployment name')
+    parser.add_argument('--configmap', type=str, default='mobilenetv4-config-pbtxt-cm',
+                        help='ConfigMap holding config.pbtxt')
+    parser.add_argument('--model-file', type=str, default='../models/mobilenetv4/1/model.onnx',
+                        help='Deployed ONNX model; batched server configs are only tried if its '
+                             'batch dimension is dynamic')
+    parser.add_argument('--output-file', type=str, default='autotune_results.json',
+                        help='Path to save the sweep report')
+    add_request_args(parser)
+    return parser.parse_args()
+
+def parse_list(value, cast=int):
+    return [cast(v) for v in value.split(',') if v.strip()]
+
+def render_model_config(model_name, instance_count, max_batch_size, queue_delay_us=None):
+    """Render config.pbtxt in the same layout as mobilenetv4-triton-deployment.yaml."""
+    if max_batch_size > 0:
+        # Batch dimension is implicit when max_batch_size > 0
+        input_dims, output_dims = '[ 3, 224, 224 ]', '[ 1000 ]'
+    else:
+        input_dims, output_dims = '[ 1, 3, 224, 224 ]', '[ -1, 1000 ]'
+    lines = [
+        f'name: "{model_name}"',
+        'platform: "onnxruntime_onnx"',
+        f'max_batch_size: {max_batch_size}',
+        'input [',
+        '  {',
+        '    name: "pixel_values"',
+        '    data_type: TYPE_FP32',
+        f'    dims: {input_dims}',
+        '  }',
+        ']',
+        'output [',
+        '  {',
+        '    name: "logits"',
+        '    data_type: TYPE_FP32',
+        f'    dims: {output_dims}',
+        '  }',
+        ']',
+        f'instance_group [ {{ kind: KIND_GPU, count: {instance_count} }} ]',
+    ]
+    if queue_delay_us is not None:
+        lines.append(f'dynamic_batching {{ max_queue_delay_microseconds: {queue_delay_us} }}')
+    return '\n'.join(lines) + '\n'
+
+def model_batch_dynamic(model_path):
+    """
+    Whether an ONNX model's inputs have a dynamic leading (batch) dimension.
+
+    Configs with max_batch_size > 0 declare [3, 224, 224] inputs, which Triton only loads for
+    such models. An unreadable or missing model counts as fixed-batch.
+    """
+    try:
+        import onnx
+        model = onnx.load(model_path, load_external_data=False)
+    except Exception:
+        return False
+    initializers = {init.name for init in model.graph.initializer}
+    inputs = [i for i in model.graph.input if i.name not in initializers]
+    return bool(inputs) and all(
+        len(i.type.tensor_type.shape.dim) > 0
+        and not i.type.tensor_type.shape.dim[0].HasField('dim_value')
+        for i in inputs)
+
+def read_server_config(args):
+    """Current config.pbtxt from the model ConfigMap, or None if it cannot be read."""
+    result = subprocess.run(
+        f"{args.kubectl} get configmap {args.configmap} -n {args.namespace} "
+        f"-o jsonpath='{{.data.config\\.pbtxt}}'",
+        shell=True, capture_output=True, text=True)
+    return result.stdout if result.returncode == 0 and result.stdout.strip() else None
+
+def apply_server_config(args, client, config_text):
+    """Replace the model ConfigMap, restart Triton and wait until the model is ready."""
+    with tempfile.NamedTemporaryFile('w', suffix='.pbtxt', delete=False) as f:
+        f.write(config_text)
+        config_path = f.name
+    try:
+        kubectl = args.kubectl
+        ns = args.namespace
+        subprocess.run(
+            f"{kubectl} create configmap {args.configmap} --from-file=config.pbtxt={config_path} "
+            f"-n {ns} --dry-run=client -o yaml | {kubectl} apply -f -",
+            shell=True, check=True)
+        subprocess.run(f"{kubectl} rollout restart deployment/{args.deployment} -n {ns}",
+                       shell=True, check=True)
+        subprocess.run(f"{kubectl} rollout status deployment/{args.deployment} -n {ns} --timeout=300s",
+                       shell=True, check=True)
+    finally:
+        os.unlink(config_path)
+
+    deadline = time.time() + 300
+    while time.time() < deadline:
+        if client.is_model_ready():
+            return True
+        time.sleep(2)
+    return False
+
+def server_configs(args):
+    """Expand the server-side sweep axes; None means 'use the running configuration'."""
+    if not args.apply_server_configs:
+        return [None]
+    batch_sizes = parse_list(args.batch_sizes)
+    dynamic = model_batch_dynamic(args.model_file)
+    if not dynamic:
+        print(f"{args.model_file} has a fixed batch dimension (or could not be read): "
+              f"only max_batch_size 0 configs without dynamic batching are applied")
+    configs = []
+    for instances, delay in itertools.product(parse_list(args.instance_counts),
+                                              args.dynamic_batching.split(',')):
+        delay = None if delay.strip() == 'off' else int(delay)
+        if not dynamic:
+            if delay is not None:
+                print(f"Skipping dynamic batching with delay {delay} us: the model needs a dynamic batch dimension")
+                continue
+            configs.append({'instance_count': instances, 'max_batch_size': 0, 'max_queue_delay_us': None})
+            continue
+        max_batch = max(batch_sizes)
+        if delay is not None:
+            max_batch = max(max_batch, args.server_max_batch_size)
+        configs.append({
+            'instance_count': instances,
+            'max_batch_size': max_batch if max_batch > 1 else 0,
+            'max_queue_delay_us': delay,
+        })
+    return configs
+
+def input_shape(model_config, batch_size):
+    """Request shape for a batch size, or None if the model config cannot accept it."""
+    max_batch_size = model_config.get('max_batch_size', 0)
+    if max_batch_size > 0:
+        return [batch_size, 3, 224, 224] if batch_size <= max_batch_size else None
+    dims = model_config.get('input', [{}])[0].get('dims', [1, 3, 224, 224])
+    if int(dims[0]) == -1 or batch_size == int(dims[0]):
+        return [batch_size, 3, 224, 224]
+    return None
+
+def pareto_frontier(points):
+    """Points not dominated in (higher images/sec, lower P99), sorted by P99."""
+    # Fully failed points report 0 img/s and a P99 of 0.0, which nothing can dominate
+    points = [p for p in points if p['successful_count'] > 0]
+    frontier = []
+    for p in points:
+        dominated = any(
+            q['images_per_second'] >= p['images_per_second']
+            and q['p99_latency_ms'] <= p['p99_latency_ms']
+            and (q['images_per_second'] > p['images_per_second']
+                 or q['p99_latency_ms'] < p['p99_latency_ms'])
+            for q in points)
+        if not dominated:
+            frontier.append(p)
+    return sorted(frontier, key=lambda p: p['p99_latency_ms'])
+
+def run_sweep(args):
+    """Walk every sweep axis and return all measured points."""
+    client = InferenceClient(args.url, args.model_name)
+    adaptive = args.concurrency_levels.strip() == 'auto'
+    concurrency_levels = [args.max_concurrency] if adaptive else parse_list(args.concurrency_levels)
+    batch_sizes = parse_list(args.batch_sizes)
+    points = []
+
+    for server in server_configs(args):
+        if server is not None:
+            config_text = render_model_config(args.model_name, server['instance_count'],
+                                              server['max_batch_size'], server['max_queue_delay_us'])
+            print(f"Applying server config: {server}")
+            if not apply_server_config(args, client, config_text):
+                print(f"Error: model did not become ready with {server}, skipping")
+                continue
+        model_config = client.model_config()
+        server_desc = server or {
+            'instance_count': sum(g.get('count', 1) for g in model_config.get('instance_group', [])) or 1,
+            'max_batch_size': model_config.get('max_batch_size', 0),
+            'max_queue_delay_us': model_config.get('dynamic_batching', {}).get(
+                'max_queue_delay_microseconds') if 'dynamic_batching' in model_config else None,
+        }
+
+        for batch_size in batch_sizes:
+            shape = input_shape(model_config, batch_size)
+            if shape is None:
+                print(f"Skipping batch size {batch_size}: not accepted by the model config")
+                continue
+            pool = SyntheticInputPool(args.num_inputs, seed=batch_size, shape=shape,
+                                      distribution='imagenet', encoding=args.encoding)
+
+            slo_met_at_start = True
+            for i, concurrency in enumerate(concurrency_levels):
+                limiter = AdaptiveLimiter(args.slo_p99_ms, max_limit=concurrency,
+                                          latency_percentile=99) if adaptive else None
+                stats = run_closed_loop(args.url, args.model_name, pool.bodies, concurrency,
+                                        args.duration, args.warmup, headers=pool.headers,
+                                        items_per_request=batch_size,
+                                        lb_policy=args.lb_policy, limiter=limiter,
+                                        client_options=request_options(args))
+                point = {
+                    **server_desc,
+                    'batch_size': batch_size,
+                    **{k: v for k, v in stats.items() if not isinstance(v, np.ndarray)},
+                }
+                point['meets_slo'] = bool(stats['successful_count'] > 0
+                                          and point['p99_latency_ms'] <= args.slo_p99_ms)
+                points.append(point)
+                print(f"instances={server_desc['instance_count']} "
+                      f"delay={server_desc['max_queue_delay_us']} batch={batch_size} "
+                      f"concurrency={round(point.get('converged_limit', concurrency), 1):g}: "
+                      f"{point['images_per_second']:.1f} img/s, "
+                      f"P50 {point['p50_latency_ms']:.1f} / P95 {point['p95_latency_ms']:.1f} / "
+                      f"P99 {point['p99_latency_ms']:.1f} ms")
+                if not point['meets_slo']:
+                    # Higher concurrency only adds queueing, so stop this axis
+                    slo_met_at_start = i > 0
+                    break
+            if not slo_met_at_start:
+                # Even the lowest concurrency misses the SLO; larger batches will only be slower
+                print(f"P99 SLO exceeded at minimum concurrency with batch size {batch_size}, "
+                      f"stopping batch size axis")
+                break
+    return points
+
+def main():
+    """Main function."""
+    args = parse_args()
+    start_time = time.time()
+    original_config = None
+    if args.apply_server_configs:
+        original_config = read_server_config(args)
+        if original_config is None:
+            print(f"Error: could not read config.pbtxt from ConfigMap {args.configmap}, "
+                  f"refusing to change server configs without a way to restore it")
+            sys.exit(1)
+    try:
+        points = run_sweep(args)
+    finally:
+        if original_config is not None:
+            print("Restoring the original server config...")
+            if not apply_server_config(args, InferenceClient(args.url, args.model_name), original_config):
+                print("Warning: model did not become ready after restoring the original config")
+    if not points:
+        print("Sweep produced no measurements")
+        sys.exit(1)
+
+    compliant = [p for p in points if p['meets_slo']]
+    best = max(compliant, key=lambda p: p['images_per_second']) if compliant else None
+    report = {
+        'model_name': args.model_name,
+        'url': args.url,
+        'slo_p99_ms': args.slo_p99_ms,
+        'duration_per_point_s': args.duration,
+        'elapsed_time': time.time() - start_time,
+        'best_config': best,
+        'pareto_frontier': pareto_frontier(points),
+        'points': points,
+    }
+
+    if best:
+        print(f"Best SLO-compliant config: instances={best['instance_count']}, "
+              f"delay={best['max_queue_delay_us']}, batch={best['batch_size']}, "
+              f"concurrency={best['concurrency']} -> {best['images_per_second']:.1f} img/s "
+              f"(P99 {best['p99_latency_ms']:.1f} ms)")
+    else:
+        print(f"No configuration met the P99 SLO of {args.slo_p99_ms} ms")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output_file)), exist_ok=True)
+    with open(args.output_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output_file}")
+
+if __name__ == "__main__":
+    main()
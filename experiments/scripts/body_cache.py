@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Build and replay a cache of pre-serialized inference request bodies.
+
+Every input is encoded once into its final wire form (JSON or binary tensor extension,
+with the matching HTTP headers) and appended to a single `bodies.bin` file next to an
+`index.json` holding offsets, lengths and headers. Load tools memory-map the file and
+send zero-copy views of it directly, so no per-request encoding or copying happens
+during a run and the cache never has to fit in memory. (Locust's geventhttpclient does
+not send memoryviews, so the Locust user copies each body into bytes once at startup.)
+
+Reading a cache needs only the standard library, so the Locust images can import
+BodyCache; building one imports the encoders from inference_client (numpy).
+"""
+
+import os
+import sys
+import json
+import mmap
+import hashlib
+import itertools
+import argparse
+
+BODIES_FILE = 'bodies.bin'
+INDEX_FILE = 'index.json'
+
+def parse_args():
+    """Parse command line arguments."""
+    from inference_client import ENCODINGS, INPUT_MODES
+    parser = argparse.ArgumentParser(description='Build a pre-serialized request body cache')
+    parser.add_argument('--source', type=str, default='synthetic', choices=['synthetic', 'dataset'],
+                        help='Where the inputs come from')
+    parser.add_argument('--dataset-path', type=str,
+                        default='/home/guilin/allProjects/ecrl/data/tiny-imagenet/tiny-imagenet-200',
+                        help='Path to Tiny ImageNet dataset (for --source dataset)')
+    parser.add_argument('--num-samples', type=int, default=256,
+                        help='Number of request bodies to cache')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed for synthetic inputs')
+    parser.add_argument('--input-distribution', type=str, default='imagenet',
+                        help='Synthetic input distribution (see synthetic_pool.py)')
+    parser.add_argument('--encoding', type=str, default='binary', choices=ENCODINGS,
+                        help='Request wire encoding')
+    parser.add_argument('--input-mode', type=str, default='fp32', choices=INPUT_MODES,
+                        help='Cache float32/float16 tensors, or uint8 images / JPEG bytes for the preprocessing ensembles')
+    parser.add_argument('--output-dir', type=str, default='body_cache',
+                        help='Directory to write the cache to')
+    parser.add_argument('--force', action='store_true',
+                        help='Rebuild even if an identical cache already exists')
+    return parser.parse_args()
+
+def cache_key(settings):
+    """Stable hash of the settings that determine the cached bytes."""
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+def write_cache(output_dir, items, encoding, settings, input_mode='fp32'):
+    """
+    Encode (key, input_tensor) items into a cache directory.
+
+    Bodies are streamed to disk as they are encoded, so the cache can be larger than memory.
+    """
+    from inference_client import encode_body, INPUT_MODE_TENSORS
+    input_name, datatype, _ = INPUT_MODE_TENSORS[input_mode]
+    if input_mode != 'fp32':
+        encoding = 'binary'
+    os.makedirs(output_dir, exist_ok=True)
+    offsets, lengths, keys, header_ids = [], [], [], []
+    header_sets = []
+    offset = 0
+    with open(os.path.join(output_dir, BODIES_FILE), 'wb') as f:
+        for key, input_data in items:
+            body, headers = encode_body(input_data, encoding, input_name, datatype)
+            if headers not in header_sets:
+                header_sets.append(headers)
+            f.write(body)
+            offsets.append(offset)
+            lengths.append(len(body))
+            keys.append(key)
+            header_ids.append(header_sets.index(headers))
+            offset += len(body)
+
+    index = {
+        'cache_key': cache_key(settings),
+        'settings': settings,
+        'encoding': encoding,
+        'input_mode': input_mode,
+        'count': len(offsets),
+        'total_bytes': offset,
+        'keys': keys,
+        'offsets': offsets,
+        'lengths': lengths,
+        'header_sets': header_sets,
+        'header_ids': header_ids,
+    }
+    with open(os.path.join(output_dir, INDEX_FILE), 'w') as f:
+        json.dump(index, f)
+    return index
+
+class BodyCache:
+    """Read-only view of a body cache, backed by a memory-mapped bodies file."""
+
+    def __init__(self, cache_dir):
+        with open(os.path.join(cache_dir, INDEX_FILE), 'r') as f:
+            index = json.load(f)
+        self.cache_dir = cache_dir
+        self.index = index
+        self.encoding = index['encoding']
+        self.input_mode = index.get('input_mode', 'fp32')
+        self.keys = index['keys']
+        self.offsets = index['offsets']
+        self.lengths = index['lengths']
+        self._headers = [index['header_sets'][i] for i in index['header_ids']]
+        self._file = open(os.path.join(cache_dir, BODIES_FILE), 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self._counter = itertools.count()
+        # Sequence views for the load drivers, like SyntheticInputPool.bodies / .headers
+        self.bodies = _Bodies(self)
+        self.headers = self._headers
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def get(self, i):
+        """Return (body, headers) of entry i; the body is a memoryview into the mapped file."""
+        start = self.offsets[i]
+        return self._view[start:start + self.lengths[i]], self._headers[i]
+
+    def next(self):
+        """Return (index, None, body, headers) for the next request, cycling like SyntheticInputPool."""
+        i = next(self._counter) % len(self)
+        body, headers = self.get(i)
+        return i, None, body, headers
+
+    def describe(self):
+        """Cache settings for inclusion in a results file."""
+        return {
+            'body_cache': os.path.abspath(self.cache_dir),
+            'cache_key': self.index['cache_key'],
+            'pool_size': len(self),
+            'encoding': self.encoding,
+            'input_mode': self.input_mode,
+            'body_bytes': int(self.index['total_bytes'] / max(len(self), 1)),
+        }
+
+    def close(self):
+        self._view.release()
+        self._mmap.close()
+        self._file.close()
+
+class _Bodies:
+    """Read-only sequence of a cache's bodies; each item is fetched with BodyCache.get."""
+
+    def __init__(self, cache):
+        self._cache = cache
+
+    def __len__(self):
+        return len(self._cache)
+
+    def __getitem__(self, i):
+        return self._cache.get(i)[0]
+
+def is_current(cache_dir, settings):
+    """True if cache_dir already holds a cache built from the same settings."""
+    try:
+        with open(os.path.join(cache_dir, INDEX_FILE), 'r') as f:
+            return json.load(f).get('cache_key') == cache_key(settings)
+    except (OSError, ValueError):
+        return False
+
+def synthetic_items(args):
+    from synthetic_pool import generate_inputs, generate_images, input_for_mode
+    from image_decode import TENSOR_MODES
+    for i in range(args.num_samples):
+        # Generate one at a time so large caches do not need all tensors in memory
+        if args.input_mode in TENSOR_MODES:
+            input_data = generate_inputs(1, distribution=args.input_distribution, seed=args.seed + i)[0]
+        else:
+            input_data = input_for_mode(generate_images(1, seed=args.seed + i)[0], args.input_mode)
+        yield f"synthetic-{args.seed + i}", input_data
+
+def dataset_items(args):
+    from evaluate_with_mapping import load_val_annotations, preprocess_image
+    from image_decode import load_input, TENSOR_MODES
+    val_data = load_val_annotations(args.dataset_path)
+    if val_data is None:
+        return
+    val_annotations = val_data[0]
+    val_img_dir = os.path.join(args.dataset_path, 'val', 'images')
+    for img_file in list(val_annotations)[:args.num_samples]:
+        img_path = os.path.join(val_img_dir, img_file)
+        if args.input_mode in TENSOR_MODES:
+            input_data = preprocess_image(img_path)
+            if input_data is not None:
+                yield img_file, input_data.astype('float32')
+        else:
+            yield img_file, load_input(img_path, args.input_mode)
+
+def main():
+    """Main function."""
+    args = parse_args()
+    settings = {
+        'source': args.source,
+        'num_samples': args.num_samples,
+        'encoding': args.encoding,
+    }
+    if args.input_mode != 'fp32':
+        # Keeps the keys of existing fp32 caches unchanged
+        settings.update(input_mode=args.input_mode)
+    if args.source == 'synthetic':
+        settings.update(seed=args.seed, distribution=args.input_distribution)
+        items = synthetic_items(args)
+    else:
+        settings.update(dataset=os.path.abspath(args.dataset_path))
+        items = dataset_items(args)
+
+    if not args.force and is_current(args.output_dir, settings):
+        print(f"Body cache in {args.output_dir} is up to date")
+        return
+
+    index = write_cache(args.output_dir, items, args.encoding, settings, args.input_mode)
+    if index['count'] == 0:
+        print("Error: no inputs were cached")
+        sys.exit(1)
+    print(f"Cached {index['count']} {index['encoding']} {args.input_mode} request bodies "
+          f"({index['total_bytes'] / 1e6:.1f} MB) in {args.output_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Add server-side preprocessing models to a Triton model repository.
+
+For each input mode the repository gets a Python-backend preprocessing model
+(triton_preprocess.py) and an ensemble that chains it with the ONNX model:
+
+    <output-dir>/
+      preprocess_uint8/1/model.py     image_uint8 [H, W, 3] UINT8 -> pixel_values
+      preprocess_jpeg/1/model.py      image_bytes [1] STRING (encoded JPEG) -> pixel_values
+      mobilenetv4_uint8/1/            ensemble: preprocess_uint8 -> mobilenetv4
+      mobilenetv4_jpeg/1/             ensemble: preprocess_jpeg -> mobilenetv4
+
+Clients select them with `--input-mode uint8|jpeg`, sending the 64x64 source image
+(~12 KB as uint8, ~2 KB as JPEG) instead of a 600 KB float32 tensor. The ONNX model
+directory itself is left alone; prepare_model_pvc.sh copies it and its config comes from
+the ConfigMap in mobilenetv4-triton-deployment.yaml.
+"""
+
+import os
+import sys
+import shutil
+import argparse
+
+from image_decode import INTERPOLATIONS, DEFAULT_INTERPOLATION, INPUT_SIZE
+from inference_client import INPUT_MODE_TENSORS, input_model_name
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Files installed into each preprocessing model's version directory
+PREPROCESS_FILES = {
+    'model.py': 'triton_preprocess.py',
+    'image_decode.py': 'image_decode.py',
+    'stage_timer.py': 'stage_timer.py',
+}
+
+# Input tensor config per server-side input mode
+INPUT_CONFIGS = {
+    'uint8': ('TYPE_UINT8', '[ -1, -1, 3 ]'),
+    'jpeg': ('TYPE_STRING', '[ 1 ]'),
+}
+
+PREPROCESS_CONFIG = """name: "{name}"
+backend: "python"
+max_batch_size: 0
+input [
+  {{
+    name: "{input_name}"
+    data_type: {data_type}
+    dims: {dims}
+  }}
+]
+output [
+  {{
+    name: "pixel_values"
+    data_type: TYPE_FP32
+    dims: [ 1, 3, {height}, {width} ]
+  }}
+]
+parameters: {{ key: "interpolation" value: {{ string_value: "{interpolation}" }} }}
+instance_group [ {{ kind: KIND_CPU, count: {instances} }} ]
+"""
+
+ENSEMBLE_CONFIG = """name: "{name}"
+platform: "ensemble"
+max_batch_size: 0
+input [
+  {{
+    name: "{input_name}"
+    data_type: {data_type}
+    dims: {dims}
+  }}
+]
+output [
+  {{
+    name: "logits"
+    data_type: TYPE_FP32
+    dims: [ -1, 1000 ]
+  }}
+]
+ensemble_scheduling {{
+  step [
+    {{
+      model_name: "{preprocess_name}"
+      model_version: -1
+      input_map {{ key: "{input_name}" value: "{input_name}" }}
+      output_map {{ key: "pixel_values" value: "preprocessed" }}
+    }},
+    {{
+      model_name: "{model_name}"
+      model_version: -1
+      input_map {{ key: "pixel_values" value: "preprocessed" }}
+      output_map {{ key: "logits" value: "logits" }}
+    }}
+  ]
+}}
+"""
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Add server-side preprocessing ensembles to a Triton model repository')
+    parser.add_argument('--output-dir', type=str, required=True,
+                        help='Model repository directory (the one holding <model-name>/1/model.onnx)')
+    parser.add_argument('--model-name', type=str, default='mobilenetv4',
+                        help='Name of the ONNX model the ensembles call')
+    parser.add_argument('--input-modes', type=str, default=','.join(INPUT_CONFIGS),
+                        help=f"Comma-separated input modes to build: {', '.join(INPUT_CONFIGS)}")
+    parser.add_argument('--interpolation', type=str, default=DEFAULT_INTERPOLATION, choices=INTERPOLATIONS,
+                        help='Resampling filter used by the preprocessing models')
+    parser.add_argument('--instances', type=int, default=2,
+                        help='CPU instances per preprocessing model')
+    return parser.parse_args()
+
+def write_file(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+def build_input_mode(output_dir, model_name, input_mode, interpolation, instances):
+    """Write the preprocessing model and ensemble for one input mode; returns their names."""
+    input_name, _, _ = INPUT_MODE_TENSORS[input_mode]
+    data_type, dims = INPUT_CONFIGS[input_mode]
+    preprocess_name = f"preprocess_{input_mode}"
+    ensemble_name = input_model_name(model_name, input_mode)
+    width, height = INPUT_SIZE
+
+    preprocess_dir = os.path.join(output_dir, preprocess_name)
+    write_file(os.path.join(preprocess_dir, 'config.pbtxt'), PREPROCESS_CONFIG.format(
+        name=preprocess_name, input_name=input_name, data_type=data_type, dims=dims,
+        height=height, width=width, interpolation=interpolation, instances=instances))
+    os.makedirs(os.path.join(preprocess_dir, '1'), exist_ok=True)
+    for target, source in PREPROCESS_FILES.items():
+        shutil.copyfile(os.path.join(SCRIPT_DIR, source), os.path.join(preprocess_dir, '1', target))
+
+    ensemble_dir = os.path.join(output_dir, ensemble_name)
+    write_file(os.path.join(ensemble_dir, 'config.pbtxt'), ENSEMBLE_CONFIG.format(
+        name=ensemble_name, input_name=input_name, data_type=data_type, dims=dims,
+        preprocess_name=preprocess_name, model_name=model_name))
+    # Ensembles have no model file, but Triton still expects a version directory
+    os.makedirs(os.path.join(ensemble_dir, '1'), exist_ok=True)
+    return preprocess_name, ensemble_name
+
+def main():
+    """Main function."""
+    args = parse_args()
+    input_modes = [m.strip() for m in args.input_modes.split(',') if m.strip()]
+    unknown = [m for m in input_modes if m not in INPUT_CONFIGS]
+    if unknown:
+        print(f"Error: unknown input modes: {', '.join(unknown)}")
+        sys.exit(2)
+
+    for input_mode in input_modes:
+        preprocess_name, ensemble_name = build_input_mode(args.output_dir, args.model_name, input_mode,
+                                                          args.interpolation, args.instances)
+        print(f"{input_mode}: {ensemble_name} = {preprocess_name} -> {args.model_name}")
+    print(f"Preprocessing models written to {args.output_dir}")
+
+if __name__ == "__main__":
+    main()
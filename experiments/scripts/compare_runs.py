@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Compare latency and throughput of experiment runs with bootstrap confidence intervals.
+
+The first result set is the baseline; every other one is compared against it. For each
+metric (P50/P95/P99 latency, mean latency, throughput) the per-request samples of both runs
+are resampled with replacement, the relative change is computed for every bootstrap pair,
+and its confidence interval decides the verdict. A change is reported as a regression when
+the whole interval lies on the worse side of zero and the point estimate is worse than
+`--threshold-pct`. The exit code is 1 if any candidate regressed, so the tool can gate CI.
+
+A result set is a results JSON file with `latency_samples_ms` (and `completion_times_s` for
+throughput), or a run directory such as results/baseline/baseline_<timestamp>, in which
+case `--file-name` selects the file.
+"""
+
+import os
+import sys
+import json
+import argparse
+import numpy as np
+
+# Latency metric -> percentile of the per-request samples
+LATENCY_METRICS = {
+    'p50_latency_ms': 50,
+    'p95_latency_ms': 95,
+    'p99_latency_ms': 99,
+}
+METRICS = list(LATENCY_METRICS) + ['avg_latency_ms', 'throughput']
+
+# Upper bound on resampled values held in memory at once (bootstrap chunking)
+MAX_CHUNK_ELEMENTS = 4_000_000
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Compare experiment runs for performance regressions')
+    parser.add_argument('runs', nargs='+',
+                        help='Baseline result set followed by one or more candidates')
+    parser.add_argument('--file-name', type=str, default='accuracy_results.json',
+                        help='Results file to read when a run directory is given')
+    parser.add_argument('--metrics', type=str, default=','.join(METRICS),
+                        help=f"Comma-separated metrics: {', '.join(METRICS)}")
+    parser.add_argument('--bootstrap', type=int, default=2000,
+                        help='Number of bootstrap resamples')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                        help='Confidence level of the intervals')
+    parser.add_argument('--threshold-pct', type=float, default=5.0,
+                        help='Smallest relative change (percent) that counts as a regression')
+    parser.add_argument('--throughput-bin-s', type=float, default=1.0,
+                        help='Bin width (seconds) for resampling completion counts')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed for the bootstrap')
+    parser.add_argument('--output-file', type=str, default=None,
+                        help='Path to save the comparison as JSON')
+    return parser.parse_args()
+
+def load_run(path, file_name):
+    """Load a result set; returns (label, latency samples, completion times, items/request)."""
+    if os.path.isdir(path):
+        path = os.path.join(path, file_name)
+    with open(path, 'r') as f:
+        results = json.load(f)
+    latencies = np.asarray(results.get('latency_samples_ms', []), dtype=float)
+    completions = results.get('completion_times_s')
+    completions = np.sort(np.asarray(completions, dtype=float)) if completions else None
+    items_per_request = 1.0
+    if results.get('requests_per_second'):
+        items_per_request = results.get('images_per_second', 0) / results['requests_per_second'] or 1.0
+    return path, latencies, completions, items_per_request
+
+def bootstrap_indices(rng, n, count):
+    """Yield chunks of [k, n] resampling indices totalling `count` rows."""
+    rows = max(1, MAX_CHUNK_ELEMENTS // max(n, 1))
+    done = 0
+    while done < count:
+        k = min(rows, count - done)
+        yield rng.integers(0, n, size=(k, n))
+        done += k
+
+def bootstrap_latency(rng, samples, count):
+    """
+    Bootstrap distributions (length `count`) of every latency metric.
+
+    Each resample is drawn once and all percentiles and the mean are computed from it, so
+    the cost does not grow with the number of latency metrics.
+    """
+    values = {metric: [] for metric in list(LATENCY_METRICS) + ['avg_latency_ms']}
+    for idx in bootstrap_indices(rng, len(samples), count):
+        resampled = samples[idx]
+        percentiles = np.percentile(resampled, list(LATENCY_METRICS.values()), axis=1)
+        for metric, row in zip(LATENCY_METRICS, percentiles):
+            values[metric].append(row)
+        values['avg_latency_ms'].append(resampled.mean(axis=1))
+    return {metric: np.concatenate(rows) for metric, rows in values.items()}
+
+def throughput_bins(completions, bin_s):
+    """Completions per bin over the measured span."""
+    span = completions[-1] - completions[0]
+    num_bins = max(1, int(span // bin_s))
+    edges = completions[0] + bin_s * np.arange(num_bins + 1)
+    counts, _ = np.histogram(completions, bins=edges)
+    return counts.astype(float)
+
+def bootstrap_throughput(rng, bins, bin_s, items_per_request, count):
+    """Bootstrap distribution of throughput (items/sec) from resampled per-bin counts."""
+    values = []
+    for idx in bootstrap_indices(rng, len(bins), count):
+        values.append(bins[idx].mean(axis=1))
+    return np.concatenate(values) * items_per_request / bin_s
+
+def compare(baseline, candidate, metrics, args, rng, latency_dists):
+    """
+    Compare one candidate run with the baseline; returns a row per metric.
+
+    `latency_dists` caches bootstrap_latency results by run path, so the baseline is
+    resampled once for all candidates.
+    """
+    alpha = (1 - args.confidence) / 2
+    rows = {}
+    for run in (baseline, candidate):
+        if run[0] not in latency_dists and len(run[1]) and any(m != 'throughput' for m in metrics):
+            latency_dists[run[0]] = bootstrap_latency(rng, run[1], args.bootstrap)
+    for metric in metrics:
+        if metric == 'throughput':
+            if baseline[2] is None or candidate[2] is None or len(baseline[2]) < 2 or len(candidate[2]) < 2:
+                continue
+            base_bins = throughput_bins(baseline[2], args.throughput_bin_s)
+            cand_bins = throughput_bins(candidate[2], args.throughput_bin_s)
+            base_value = base_bins.mean() * baseline[3] / args.throughput_bin_s
+            cand_value = cand_bins.mean() * candidate[3] / args.throughput_bin_s
+            base_dist = bootstrap_throughput(rng, base_bins, args.throughput_bin_s, baseline[3], args.bootstrap)
+            cand_dist = bootstrap_throughput(rng, cand_bins, args.throughput_bin_s, candidate[3], args.bootstrap)
+            higher_is_better = True
+        else:
+            if len(baseline[1]) == 0 or len(candidate[1]) == 0:
+                continue
+            if metric == 'avg_latency_ms':
+                base_value, cand_value = baseline[1].mean(), candidate[1].mean()
+            else:
+                q = LATENCY_METRICS[metric]
+                base_value, cand_value = np.percentile(baseline[1], q), np.percentile(candidate[1], q)
+            base_dist = latency_dists[baseline[0]][metric]
+            cand_dist = latency_dists[candidate[0]][metric]
+            higher_is_better = False
+
+        # Relative change of independent bootstrap pairs
+        change = (cand_dist - base_dist) / np.where(base_dist == 0, np.nan, base_dist) * 100
+        low, high = np.nanpercentile(change, [alpha * 100, (1 - alpha) * 100])
+        point = (cand_value - base_value) / base_value * 100 if base_value else 0.0
+        worse = -point if higher_is_better else point
+        worse_low = -high if higher_is_better else low
+        better_high = -low if higher_is_better else high
+        if worse_low > 0 and worse > args.threshold_pct:
+            verdict = 'regression'
+        elif better_high < 0:
+            verdict = 'improvement'
+        else:
+            verdict = 'no significant change'
+        rows[metric] = {
+            'baseline': float(base_value),
+            'candidate': float(cand_value),
+            'change_pct': float(point),
+            'ci_low_pct': float(low),
+            'ci_high_pct': float(high),
+            'verdict': verdict,
+        }
+    return rows
+
+def main():
+    """Main function."""
+    args = parse_args()
+    if len(args.runs) < 2:
+        print("Error: need a baseline and at least one candidate")
+        sys.exit(2)
+    metrics = [m.strip() for m in args.metrics.split(',') if m.strip()]
+    unknown = [m for m in metrics if m not in METRICS]
+    if unknown:
+        print(f"Error: unknown metrics: {', '.join(unknown)}")
+        sys.exit(2)
+
+    runs = [load_run(path, args.file_name) for path in args.runs]
+    for path, latencies, completions, _ in runs:
+        if len(latencies) == 0:
+            print(f"Warning: {path} has no latency_samples_ms; latency metrics are skipped for it")
+    rng = np.random.default_rng(args.seed)
+    baseline = runs[0]
+    report = {'baseline': baseline[0], 'confidence': args.confidence,
+              'threshold_pct': args.threshold_pct, 'bootstrap': args.bootstrap, 'comparisons': []}
+    regressed = False
+    latency_dists = {}
+
+    for candidate in runs[1:]:
+        rows = compare(baseline, candidate, metrics, args, rng, latency_dists)
+        report['comparisons'].append({'candidate': candidate[0], 'metrics': rows})
+        print(f"\n{candidate[0]} vs {baseline[0]} ({args.confidence:.0%} CI, {args.bootstrap} resamples)")
+        print(f"{'metric':<16} {'baseline':>10} {'candidate':>10} {'change':>9} {'CI':>20}  verdict")
+        for metric, row in rows.items():
+            ci = f"[{row['ci_low_pct']:+.1f}%, {row['ci_high_pct']:+.1f}%]"
+            print(f"{metric:<16} {row['baseline']:>10.2f} {row['candidate']:>10.2f} "
+                  f"{row['change_pct']:>+8.1f}% {ci:>20}  {row['verdict']}")
+            regressed |= row['verdict'] == 'regression'
+
+    if args.output_file:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output_file)), exist_ok=True)
+        with open(args.output_file, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nComparison saved to {args.output_file}")
+
+    if regressed:
+        print("\nRegression detected")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Adaptive in-flight request limits for the load tools.
+
+Instead of a fixed `--concurrency`, the client discovers how many requests it can keep
+outstanding while staying under a latency target, in the style of Netflix's
+concurrency-limits library. Latency samples are aggregated into short windows; after each
+window the limit algorithm moves the limit:
+
+- AIMD: add one while the window latency is under the target and the limit is actually
+  being used, multiply by `backoff` when it is over the target or requests fail.
+- Gradient: scale the limit by target / observed latency (clamped to [0.5, 1]) and add a
+  sqrt(limit) queue allowance, smoothed so the limit settles instead of oscillating.
+"""
+
+import math
+import time
+import threading
+import numpy as np
+
+LIMIT_ALGORITHMS = ('gradient', 'aimd')
+
+class AIMDLimit:
+    """Additive-increase / multiplicative-decrease limit."""
+
+    def __init__(self, backoff=0.9):
+        self.backoff = backoff
+
+    def update(self, limit, window_latency_ms, target_ms, error_rate, max_inflight):
+        if error_rate > 0 or window_latency_ms > target_ms:
+            return limit * self.backoff
+        # Only grow when the current limit was the bottleneck during the window
+        if max_inflight >= int(limit):
+            return limit + 1
+        return limit
+
+class GradientLimit:
+    """Latency-gradient limit with a sqrt(limit) queue allowance."""
+
+    def __init__(self, smoothing=0.2):
+        self.smoothing = smoothing
+
+    def update(self, limit, window_latency_ms, target_ms, error_rate, max_inflight):
+        gradient = max(0.5, min(1.0, target_ms / max(window_latency_ms, 1e-6)))
+        if error_rate > 0:
+            gradient = 0.5
+        new_limit = limit * gradient + math.sqrt(limit)
+        if max_inflight < int(limit) / 2:
+            # Client-bound: do not grow a limit nobody is using
+            new_limit = min(new_limit, limit)
+        return limit * (1 - self.smoothing) + new_limit * self.smoothing
+
+class AdaptiveLimiter:
+    """
+    Thread-safe permit gate whose size follows a limit algorithm.
+
+    Workers call acquire() before sending and release() with the request's outcome after.
+    `latency_percentile` of each window is compared against `target_ms`.
+    """
+
+    def __init__(self, target_ms, algorithm='gradient', initial_limit=4, min_limit=1, max_limit=64,
+                 window_size=20, window_s=0.5, latency_percentile=90):
+        if algorithm not in LIMIT_ALGORITHMS:
+            raise ValueError(f"Unknown limit algorithm: {algorithm}")
+        self.target_ms = target_ms
+        self.algorithm = algorithm
+        self._algorithm = GradientLimit() if algorithm == 'gradient' else AIMDLimit()
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(initial_limit)
+        self.window_size = window_size
+        self.window_s = window_s
+        self.latency_percentile = latency_percentile
+        self.inflight = 0
+        self.history = []
+        self._cond = threading.Condition()
+        self._start = time.perf_counter()
+        self._reset_window()
+
+    def _reset_window(self):
+        self._window_latencies = []
+        self._window_errors = 0
+        self._window_start = time.perf_counter()
+        self._window_max_inflight = self.inflight
+
+    def acquire(self, timeout=None):
+        """Wait for a permit; returns False if none became free within `timeout` seconds."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.inflight < int(self.limit), timeout):
+                return False
+            self.inflight += 1
+            self._window_max_inflight = max(self._window_max_inflight, self.inflight)
+            return True
+
+    def release(self, latency_ms, ok):
+        """Return a permit and record the request's latency (or failure)."""
+        with self._cond:
+            self.inflight -= 1
+            if ok:
+                self._window_latencies.append(latency_ms)
+            else:
+                self._window_errors += 1
+            samples = len(self._window_latencies) + self._window_errors
+            if samples >= self.window_size or (
+                    samples > 0 and time.perf_counter() - self._window_start >= self.window_s):
+                self._update()
+            self._cond.notify_all()
+
+    def _update(self):
+        samples = len(self._window_latencies) + self._window_errors
+        error_rate = self._window_errors / samples
+        latency = (float(np.percentile(self._window_latencies, self.latency_percentile))
+                   if self._window_latencies else float('inf'))
+        new_limit = self._algorithm.update(self.limit, latency, self.target_ms, error_rate,
+                                           self._window_max_inflight)
+        self.limit = min(self.max_limit, max(self.min_limit, new_limit))
+        self.history.append({
+            't_s': time.perf_counter() - self._start,
+            'limit': self.limit,
+            'window_latency_ms': latency if math.isfinite(latency) else None,
+            'error_rate': error_rate,
+        })
+        self._reset_window()
+
+    def converged_limit(self, tail_fraction=1 / 3):
+        """Median limit over the last `tail_fraction` of the recorded windows."""
+        if not self.history:
+            return float(self.limit)
+        tail = self.history[-max(1, int(len(self.history) * tail_fraction)):]
+        return float(np.median([h['limit'] for h in tail]))
+
+    def summary(self):
+        """Limit settings and trajectory for inclusion in a results file."""
+        return {
+            'algorithm': self.algorithm,
+            'target_ms': self.target_ms,
+            'latency_percentile': self.latency_percentile,
+            'max_limit': self.max_limit,
+            'converged_limit': self.converged_limit(),
+            'final_limit': float(self.limit),
+            'limit_history': self.history,
+        }
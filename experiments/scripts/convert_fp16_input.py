@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Create an FP16-input variant of the MobileNetV4 ONNX model for Triton.
+
+The exported model takes a float32 `pixel_values` tensor. The variant declares the same
+input as float16 and inserts a Cast to float32 in front of the original graph, so the
+weights and arithmetic are unchanged and only the request payload and the host-to-device
+copy shrink by half. If the model already takes float16, it is copied as is.
+
+The result is written as its own model (`mobilenetv4_fp16/1/model.onnx` plus
+`config.pbtxt`) next to the FP32 model, and clients select it with `--input-mode fp16`.
+With onnxruntime installed, `--verify` compares both models' logits on random inputs.
+"""
+
+import os
+import sys
+import argparse
+import numpy as np
+
+FP16_CONFIG = """name: "{name}"
+platform: "onnxruntime_onnx"
+max_batch_size: 0
+input [
+  {{
+    name: "{input_name}"
+    data_type: TYPE_FP16
+    dims: [ 1, 3, 224, 224 ]
+  }}
+]
+output [
+  {{
+    name: "logits"
+    data_type: TYPE_FP32
+    dims: [ -1, 1000 ]
+  }}
+]
+instance_group [ {{ kind: KIND_GPU, count: 1 }} ]
+"""
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Create an FP16-input variant of the ONNX model')
+    parser.add_argument('--input-model', type=str, default='../models/mobilenetv4/1/model.onnx',
+                        help='FP32-input ONNX model')
+    parser.add_argument('--output-dir', type=str, default='../models',
+                        help='Model repository directory to write the variant into')
+    parser.add_argument('--model-name', type=str, default='mobilenetv4_fp16',
+                        help='Name of the FP16-input model in Triton')
+    parser.add_argument('--input-name', type=str, default='pixel_values',
+                        help='Model input to convert')
+    parser.add_argument('--verify', action='store_true',
+                        help='Compare FP32 and FP16-input logits with onnxruntime')
+    return parser.parse_args()
+
+def convert(model, input_name):
+    """Declare `input_name` as float16 and cast it back to float32 for the original graph."""
+    from onnx import helper, TensorProto
+    graph = model.graph
+    graph_input = next((i for i in graph.input if i.name == input_name), None)
+    if graph_input is None:
+        raise ValueError(f"Model has no input named {input_name}")
+    tensor_type = graph_input.type.tensor_type
+    if tensor_type.elem_type == TensorProto.FLOAT16:
+        return False
+    if tensor_type.elem_type != TensorProto.FLOAT:
+        raise ValueError(f"Input {input_name} is not float32")
+
+    cast_output = f"{input_name}_fp32"
+    for node in graph.node:
+        for i, name in enumerate(node.input):
+            if name == input_name:
+                node.input[i] = cast_output
+    cast = helper.make_node('Cast', [input_name], [cast_output], name=f"{input_name}_to_fp32",
+                            to=TensorProto.FLOAT)
+    graph.node.insert(0, cast)
+    tensor_type.elem_type = TensorProto.FLOAT16
+    return True
+
+def verify(fp32_path, fp16_path, input_name, num_inputs=8, seed=0):
+    """Max absolute logit difference and top-1 agreement between the two models."""
+    import onnxruntime as ort
+    from synthetic_pool import generate_inputs
+    fp32 = ort.InferenceSession(fp32_path, providers=['CPUExecutionProvider'])
+    fp16 = ort.InferenceSession(fp16_path, providers=['CPUExecutionProvider'])
+    max_diff, agree = 0.0, 0
+    for x in generate_inputs(num_inputs, distribution='imagenet', seed=seed):
+        a = fp32.run(None, {input_name: x})[0]
+        b = fp16.run(None, {input_name: x.astype(np.float16)})[0]
+        max_diff = max(max_diff, float(np.abs(a - b).max()))
+        agree += int(a.argmax() == b.argmax())
+    return max_diff, agree / num_inputs
+
+def main():
+    """Main function."""
+    args = parse_args()
+    try:
+        import onnx
+    except ImportError:
+        print("Error: the onnx package is required (pip install onnx)")
+        sys.exit(1)
+    if not os.path.exists(args.input_model):
+        print(f"Error: model not found at {args.input_model}")
+        sys.exit(1)
+
+    model = onnx.load(args.input_model)
+    converted = convert(model, args.input_name)
+    onnx.checker.check_model(model)
+
+    model_dir = os.path.join(args.output_dir, args.model_name)
+    output_model = os.path.join(model_dir, '1', 'model.onnx')
+    os.makedirs(os.path.dirname(output_model), exist_ok=True)
+    onnx.save(model, output_model)
+    with open(os.path.join(model_dir, 'config.pbtxt'), 'w') as f:
+        f.write(FP16_CONFIG.format(name=args.model_name, input_name=args.input_name))
+    action = "Added an FP16 input cast" if converted else "Input is already FP16, copied"
+    print(f"{action}: {output_model}")
+
+    if args.verify:
+        max_diff, agreement = verify(args.input_model, output_model, args.input_name)
+        print(f"FP16 vs FP32 input: max |logit diff| {max_diff:.4f}, top-1 agreement {agreement:.0%}")
+
+if __name__ == "__main__":
+    main()
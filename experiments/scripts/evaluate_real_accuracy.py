@@ -9,15 +9,24 @@ import json
 import time
 import argparse
 import numpy as np
-from PIL import Image
-import requests
 from tqdm import tqdm
 
+from inference_client import InferenceClient, input_model_name, INPUT_MODES, LB_POLICIES, add_request_args, request_options
+from logits_store import open_for_evaluation, check_model_id
+from results_store import add_results_store_args, save_run
+from metrics_exporter import add_metrics_args, serve_metrics
+from sharded_eval import add_shard_args, select_shard, shard_fields, confusion_counts, run_sharded
+from stage_timer import StageTimer, NULL_TIMER
+import image_decode
+from image_decode import BatchPreprocessor, preprocess_batch, INTERPOLATIONS, DEFAULT_INTERPOLATION
+
 def parse_args():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Evaluate MobileNetV4 accuracy on Tiny ImageNet')
     parser.add_argument('--url', type=str, default='http://localhost:8000',
-                        help='Triton server URL')
+                        help='Triton server URL(s): comma-separated, or dns://<headless-service>:8000')
+    parser.add_argument('--lb-policy', type=str, default='least_outstanding', choices=LB_POLICIES,
+                        help='How requests are spread over multiple endpoints')
     parser.add_argument('--model-name', type=str, default='mobilenetv4',
                         help='Model name in Triton')
     parser.add_argument('--dataset-path', type=str, 
@@ -25,9 +34,26 @@ def parse_args():
                         help='Path to Tiny ImageNet dataset')
     parser.add_argument('--num-samples', type=int, default=None,
                         help='Number of samples to evaluate (None for all)')
+    parser.add_argument('--logits-store', type=str, default=None,
+                        help='Directory of persisted logits; images already scored by this model are not re-sent')
+    parser.add_argument('--model-id', type=str, default=None,
+                        help='Identity of the served model file for --logits-store, e.g. the sha256 of its '
+                             'model.onnx (default: as recorded by prepare_model_pvc.sh)')
+    parser.add_argument('--input-mode', type=str, default='fp32', choices=INPUT_MODES,
+                        help='Send preprocessed float32/float16 tensors, or uint8 images / JPEG bytes to the preprocessing ensemble')
+    parser.add_argument('--interpolation', type=str, default=DEFAULT_INTERPOLATION, choices=INTERPOLATIONS,
+                        help='Resampling filter used to resize images to 224x224 (fp32 input mode)')
+    parser.add_argument('--decode-batch', type=int, default=64,
+                        help='Number of images decoded and resized together')
     parser.add_argument('--output-file', type=str, default='accuracy_results.json',
                         help='Path to save results')
-    return parser.parse_args()
+    add_request_args(parser)
+    add_results_store_args(parser)
+    add_metrics_args(parser)
+    add_shard_args(parser)
+    args = parser.parse_args()
+    check_model_id(parser, args)
+    return args
 
 def load_val_annotations(dataset_path):
     """Load validation annotations."""
@@ -55,31 +81,10 @@ def load_val_annotations(dataset_path):
     print(f"Loaded {len(val_annotations)} validation annotations with {len(class_ids)} classes")
     return val_annotations, class_to_idx, idx_to_class
 
-def preprocess_image(image_path):
+def preprocess_image(image_path, timer=NULL_TIMER, interpolation=DEFAULT_INTERPOLATION):
     """Preprocess image for MobileNetV4 inference."""
     try:
-        # Load and preprocess image
-        image = Image.open(image_path).convert('RGB')
-        
-        # Resize to 224x224 (MobileNetV4 input size)
-        image = image.resize((224, 224))
-        
-        # Convert to numpy array
-        image_array = np.array(image).astype(np.float32)
-        
-        # Convert to NCHW format [1, 3, 224, 224]
-        image_array = np.transpose(image_array, (2, 0, 1))
-        image_array = np.expand_dims(image_array, axis=0)
-        
-        # Normalize to [0, 1]
-        image_array = image_array / 255.0
-        
-        # Standardize with ImageNet mean and std
-        mean = np.array([0.485, 0.456, 0.406]).reshape((3, 1, 1))
-        std = np.array([0.229, 0.224, 0.225]).reshape((3, 1, 1))
-        image_array = (image_array - mean) / std
-        
-        return image_array
+        return preprocess_batch([image_path], interpolation, timer)[0]
     except Exception as e:
         print(f"Error preprocessing image {image_path}: {e}")
         return None
@@ -110,22 +115,45 @@ def evaluate_model(args):
                 'class_idx': class_to_idx[class_id]
             })
     
+    # Manifest of the full validation set, so limited runs fill the logits store incrementally
+    manifest_keys = [os.path.basename(img['path']) for img in val_images]
+    manifest_labels = [img['class_id'] for img in val_images]
+
     # Limit number of samples if specified
     if args.num_samples is not None and args.num_samples < len(val_images):
         val_images = val_images[:args.num_samples]
         print(f"Limited evaluation to {args.num_samples} samples")
+
+    # Deterministic split of the selected images across --workers processes
+    val_images = select_shard(val_images, args, key=lambda img: os.path.basename(img['path']))
     
     # Initialize counters
     correct = 0
     total = 0
+    reused = 0  # scored from the logits store, without a request
     class_correct = {}
     class_total = {}
     latencies = []
+    completion_times = []
     all_results = []
+    failed_results = []
     
-    # Construct the inference URL
-    infer_url = f"{args.url}/v2/models/{args.model_name}/infer"
+    # Create inference client; the stage timer is shared with preprocessing
+    timer = StageTimer()
+    metrics = serve_metrics(args.metrics_port, input_model_name(args.model_name, args.input_mode), timer)
+    client = InferenceClient(args.url, args.model_name, lb_policy=args.lb_policy, timer=timer,
+                             input_mode=args.input_mode, metrics=metrics, **request_options(args))
+    store = None
+    if args.logits_store:
+        store = open_for_evaluation(args.logits_store, client, args.model_id, manifest_keys, manifest_labels,
+                                    (preprocess_image, image_decode, args.interpolation, args.input_mode))
     
+    # Images are decoded and resized in batches; only those without stored logits are requested
+    pending = [img['path'] for img in val_images
+               if store is None or not store.has(store.index_of(os.path.basename(img['path'])))]
+    preprocessor = BatchPreprocessor(pending, args.decode_batch,
+                                     args.interpolation, timer, args.input_mode)
+
     # Process images and evaluate
     start_time = time.time()
     
@@ -141,59 +169,48 @@ def evaluate_model(args):
                 class_total[true_class_id] = 0
                 class_correct[true_class_id] = 0
             
-            # Preprocess image
-            input_data = preprocess_image(img_path)
-            if input_data is None:
-                print(f"Skipping {img_path} due to preprocessing error")
-                continue
-            
-            # Create request payload
-            payload = {
-                "inputs": [
-                    {
-                        "name": "pixel_values",
-                        "shape": list(input_data.shape),
-                        "datatype": "FP32",
-                        "data": input_data.flatten().tolist()
-                    }
-                ]
-            }
-            
-            # Send request
-            request_start = time.time()
-            response = requests.post(infer_url, json=payload)
-            latency = (time.time() - request_start) * 1000  # Convert to milliseconds
-            latencies.append(latency)
+            # Reuse logits this model already produced for the image
+            store_idx = store.index_of(os.path.basename(img_path)) if store is not None else None
+            if store_idx is not None and store.has(store_idx):
+                output_data = store.get(store_idx)
+                latency = None
+            else:
+                # Preprocess image
+                input_data = preprocessor.get(img_path)
+                if input_data is None:
+                    print(f"Skipping {img_path} due to preprocessing error")
+                    continue
             
-            if response.status_code != 200:
-                print(f"Error: {response.status_code} - {response.text}")
-                continue
+                # Send request
+                result = client.infer(input_data)
+                latency = result.latency_ms
+                latencies.append(latency)
             
-            # Parse response
-            response_data = response.json()
-            output_data = None
+                if result.error is not None:
+                    print(f"Error: {result.error}")
+                    failed_results.append({'image': os.path.basename(img_path), 'ok': False,
+                                           'latency_ms': float(latency), 'error': str(result.error)})
+                    continue
             
-            # Find the output tensor (usually named "logits" or similar)
-            for output in response_data.get('outputs', []):
-                if output.get('name') in ['logits', 'output', 'predictions']:
-                    output_data = np.array(output.get('data')).reshape(output.get('shape'))
-                    break
-            
-            if output_data is None:
-                print(f"Error: Could not find output tensor in response")
-                continue
+                completion_times.append(time.time() - start_time)
+                output_data = result.output
+                if store is not None:
+                    store.put(store_idx, output_data)
             
             # Get predicted class
-            predicted_class_idx = np.argmax(output_data)
-            predicted_class_id = idx_to_class.get(predicted_class_idx, str(predicted_class_idx))
+            with timer.stage('score'):
+                predicted_class_idx = int(np.argmax(output_data))
+                predicted_class_id = idx_to_class.get(predicted_class_idx, str(predicted_class_idx))
             
-            # Check if prediction is correct
-            is_correct = (predicted_class_idx == true_class_idx)
+                # Check if prediction is correct
+                is_correct = bool(predicted_class_idx == true_class_idx)
             if is_correct:
                 correct += 1
                 class_correct[true_class_id] += 1
             
             total += 1
+            if latency is None:
+                reused += 1
             class_total[true_class_id] += 1
             
             # Store detailed result
@@ -215,6 +232,9 @@ def evaluate_model(args):
         except Exception as e:
             print(f"Error processing {img_path}: {e}")
     
+    if store is not None:
+        store.close()
+
     # Calculate overall accuracy
     accuracy = correct / total if total > 0 else 0
     
@@ -223,10 +243,11 @@ def evaluate_model(args):
     for class_id in class_total:
         class_accuracy[class_id] = class_correct[class_id] / class_total[class_id] if class_total[class_id] > 0 else 0
     
-    # Calculate latency statistics
-    avg_latency = np.mean(latencies) if latencies else 0
-    p95_latency = np.percentile(latencies, 95) if latencies else 0
-    p99_latency = np.percentile(latencies, 99) if latencies else 0
+    # Latency and throughput cover inferred images only; no latencies if all came from the store
+    inferred = total - reused
+    avg_latency = float(np.mean(latencies)) if latencies else None
+    p95_latency = float(np.percentile(latencies, 95)) if latencies else None
+    p99_latency = float(np.percentile(latencies, 99)) if latencies else None
     
     # Calculate elapsed time
     elapsed_time = time.time() - start_time
@@ -236,21 +257,41 @@ def evaluate_model(args):
         'overall_accuracy': float(accuracy),
         'correct_count': correct,
         'total_count': total,
+        'reused_count': reused,
+        'inferred_count': inferred,
         'per_class_accuracy': {k: float(v) for k, v in class_accuracy.items()},
-        'avg_latency_ms': float(avg_latency),
-        'p95_latency_ms': float(p95_latency),
-        'p99_latency_ms': float(p99_latency),
+        'confusion': confusion_counts(all_results),
+        'avg_latency_ms': avg_latency,
+        'p95_latency_ms': p95_latency,
+        'p99_latency_ms': p99_latency,
         'elapsed_time': float(elapsed_time),
-        'images_per_second': float(total / elapsed_time) if elapsed_time > 0 else 0,
+        'images_per_second': float(inferred / elapsed_time) if elapsed_time > 0 else 0,
+        'input_mode': args.input_mode,
+        'logits_store': store.describe() if store is not None else None,
+        'endpoints': client.endpoints.stats(),
+        'request_stats': client.stats.summary(),
+        'stage_breakdown': timer.breakdown(),
+        # Per-request samples for compare_runs.py
+        'latency_samples_ms': [float(l) for l in latencies],
+        'completion_times_s': completion_times,
         'detailed_results': all_results[:100]  # Limit detailed results to first 100 to keep file size reasonable
     }
     
+    # Every per-request record, including failures, goes to the results store
+    records = [dict(r, ok=True) for r in all_results] + failed_results
+    results.update(shard_fields(args, client, timer, start_time, records))
+    save_run(args, 'evaluate_real_accuracy', records, results, model=client.model_name, input_mode=args.input_mode,
+             load_pattern='sequential', concurrency=1)
+
     # Print summary
     print(f"Evaluation complete: {correct}/{total} correct, accuracy: {accuracy:.4f}")
-    print(f"Average latency: {avg_latency:.2f} ms")
-    print(f"P95 latency: {p95_latency:.2f} ms")
-    print(f"P99 latency: {p99_latency:.2f} ms")
-    print(f"Evaluation took {elapsed_time:.2f} seconds ({total/elapsed_time:.2f} images/sec)")
+    if latencies:
+        print(f"Average latency: {avg_latency:.2f} ms")
+        print(f"P95 latency: {p95_latency:.2f} ms")
+        print(f"P99 latency: {p99_latency:.2f} ms")
+    print(f"Evaluation took {elapsed_time:.2f} seconds ({inferred} images inferred, "
+          f"{results['images_per_second']:.2f} images/sec; {reused} reused from the logits store)")
+    timer.print_breakdown()
     
     return results
 
@@ -269,7 +310,10 @@ def save_results(results, output_file):
 def main():
     """Main function."""
     args = parse_args()
-    results = evaluate_model(args)
+    if args.workers > 1:
+        results = run_sharded(args, __file__, 'evaluate_real_accuracy')
+    else:
+        results = evaluate_model(args)
     if results:
         save_results(results, args.output_file)
     else:
@@ -9,100 +9,99 @@ import json
 import time
 import argparse
 import numpy as np
-import requests
 from tqdm import tqdm
 
+from inference_client import InferenceClient, input_model_name, ENCODINGS, INPUT_MODES, LB_POLICIES, add_request_args, request_options
+from synthetic_pool import SyntheticInputPool, DISTRIBUTIONS
+from body_cache import BodyCache
+from stage_timer import StageTimer
+from results_store import add_results_store_args, save_run
+from metrics_exporter import add_metrics_args, serve_metrics
+
 def parse_args():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Evaluate MobileNetV4 with synthetic data')
     parser.add_argument('--url', type=str, default='http://localhost:8000',
-                        help='Triton server URL')
+                        help='Triton server URL(s): comma-separated, or dns://<headless-service>:8000')
+    parser.add_argument('--lb-policy', type=str, default='least_outstanding', choices=LB_POLICIES,
+                        help='How requests are spread over multiple endpoints')
     parser.add_argument('--model-name', type=str, default='mobilenetv4',
                         help='Model name in Triton')
     parser.add_argument('--num-samples', type=int, default=100,
                         help='Number of samples to evaluate')
     parser.add_argument('--output-file', type=str, default='synthetic_results.json',
                         help='Path to save results')
+    parser.add_argument('--pool-size', type=int, default=32,
+                        help='Number of distinct synthetic inputs generated up front and cycled')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed for the synthetic input pool')
+    parser.add_argument('--input-distribution', type=str, default='uniform',
+                        choices=DISTRIBUTIONS,
+                        help='Statistics of the synthetic inputs')
+    parser.add_argument('--encoding', type=str, default='json', choices=ENCODINGS,
+                        help='Request wire encoding')
+    parser.add_argument('--input-mode', type=str, default='fp32', choices=INPUT_MODES,
+                        help='Send float32/float16 tensors, or uint8 images / JPEG bytes to the preprocessing ensemble')
+    parser.add_argument('--body-cache', type=str, default=None,
+                        help='Replay request bodies from a cache built by body_cache.py instead')
     parser.add_argument('--debug', action='store_true',
                         help='Enable debug output')
+    add_request_args(parser)
+    add_results_store_args(parser)
+    add_metrics_args(parser)
     return parser.parse_args()
 
-def generate_synthetic_image():
-    """Generate a synthetic image tensor."""
-    # Generate random data in the shape expected by MobileNetV4
-    # [1, 3, 224, 224] - batch size 1, 3 channels, 224x224 pixels
-    image_data = np.random.rand(1, 3, 224, 224).astype(np.float32)
-    
-    # Normalize to [0, 1]
-    image_data = image_data / 255.0
-    
-    # Standardize with ImageNet mean and std
-    mean = np.array([0.485, 0.456, 0.406]).reshape((3, 1, 1))
-    std = np.array([0.229, 0.224, 0.225]).reshape((3, 1, 1))
-    image_data = (image_data - mean) / std
-    
-    return image_data
-
 def evaluate_model(args):
     """Evaluate model using synthetic data."""
     # Initialize counters
     total = 0
     successful = 0
     latencies = []
+    completion_times = []
     all_results = []
+    failed_results = []
     
-    # Construct the inference URL
-    infer_url = f"{args.url}/v2/models/{args.model_name}/infer"
+    # Generate and encode the synthetic inputs once (or map a prebuilt cache); requests cycle through them
+    if args.body_cache:
+        pool = BodyCache(args.body_cache)
+        print(f"Replaying {len(pool)} cached {pool.encoding} {pool.input_mode} request bodies from {args.body_cache}")
+    else:
+        pool = SyntheticInputPool(args.pool_size, args.seed, distribution=args.input_distribution,
+                                  encoding=args.encoding, input_mode=args.input_mode)
+        print(f"Prepared {len(pool)} synthetic inputs ({pool.distribution}, {pool.encoding}, {args.input_mode})")
+
+    # Create inference client for the model (or preprocessing ensemble) matching the inputs
+    timer = StageTimer()
+    metrics = serve_metrics(args.metrics_port, input_model_name(args.model_name, pool.input_mode), timer)
+    client = InferenceClient(args.url, args.model_name, lb_policy=args.lb_policy, timer=timer,
+                             input_mode=pool.input_mode, metrics=metrics, **request_options(args))
     
     # Process synthetic images
     start_time = time.time()
     
     for i in tqdm(range(args.num_samples), desc="Evaluating"):
         try:
-            # Generate synthetic image
-            input_data = generate_synthetic_image()
-            
-            # Create request payload
-            payload = {
-                "inputs": [
-                    {
-                        "name": "pixel_values",
-                        "shape": list(input_data.shape),
-                        "datatype": "FP32",
-                        "data": input_data.flatten().tolist()
-                    }
-                ]
-            }
+            # Take the next pre-encoded synthetic input
+            pool_index, _, body, headers = pool.next()
             
             # Send request
-            request_start = time.time()
-            response = requests.post(infer_url, json=payload)
-            latency = (time.time() - request_start) * 1000  # Convert to milliseconds
+            result = client.send(body, headers)
+            latency = result.latency_ms
             latencies.append(latency)
             
-            if response.status_code == 200:
+            if result.error is None:
                 successful += 1
-                
-                # Parse response
-                response_data = response.json()
-                output_data = None
-                
-                # Find the output tensor (usually named "logits" or similar)
-                for output in response_data.get('outputs', []):
-                    if output.get('name') in ['logits', 'output', 'predictions']:
-                        output_data = np.array(output.get('data')).reshape(output.get('shape'))
-                        break
-                
-                if output_data is None:
-                    print(f"Error: Could not find output tensor in response")
-                    continue
+                completion_times.append(time.time() - start_time)
+                output_data = result.output
                 
                 # Get top-5 predicted classes
-                top5_indices = np.argsort(output_data[0])[-5:][::-1]
+                with timer.stage('score'):
+                    top5_indices = np.argsort(output_data[0])[-5:][::-1]
                 
                 # Store result
                 result = {
                     'sample_id': i,
+                    'pool_index': pool_index,
                     'top5_indices': [int(idx) for idx in top5_indices],
                     'top5_values': [float(output_data[0][idx]) for idx in top5_indices],
                     'latency_ms': float(latency)
@@ -113,7 +112,9 @@ def evaluate_model(args):
                     print(f"Sample {i}: Top-5 classes: {top5_indices}")
                     print(f"Latency: {latency:.2f} ms")
             else:
-                print(f"Error: {response.status_code} - {response.text}")
+                print(f"Error: {result.error}")
+                failed_results.append({'sample_id': i, 'pool_index': pool_index, 'ok': False,
+                                       'latency_ms': float(latency), 'error': str(result.error)})
             
             total += 1
             
@@ -163,10 +164,22 @@ def evaluate_model(args):
         'p99_latency_ms': float(p99_latency),
         'elapsed_time': float(elapsed_time),
         'samples_per_second': float(total / elapsed_time) if elapsed_time > 0 else 0,
+        'input_pool': pool.describe(),
         'top_classes': list(class_distribution.items())[:10],  # Top 10 most frequent classes
+        'endpoints': client.endpoints.stats(),
+        'request_stats': client.stats.summary(),
+        'stage_breakdown': timer.breakdown(),
+        # Per-request samples for compare_runs.py
+        'latency_samples_ms': [float(l) for l in latencies],
+        'completion_times_s': completion_times,
         'detailed_results': all_results[:20]  # Limit detailed results to first 20 to keep file size reasonable
     }
     
+    # Every per-request record, including failures, goes to the results store
+    save_run(args, 'evaluate_synthetic', [dict(r, ok=True) for r in all_results] + failed_results,
+             results, model=client.model_name, input_mode=pool.input_mode,
+             load_pattern='sequential', concurrency=1)
+
     # Print summary
     print(f"Evaluation complete: Success rate: {success_rate:.4f} ({successful}/{total})")
     print(f"Model is {'responsive' if is_responsive else 'not responsive'}")
@@ -174,6 +187,7 @@ def evaluate_model(args):
     print(f"P95 latency: {p95_latency:.2f} ms")
     print(f"P99 latency: {p99_latency:.2f} ms")
     print(f"Evaluation took {elapsed_time:.2f} seconds ({total/elapsed_time:.2f} samples/sec)")
+    timer.print_breakdown()
     
     if class_distribution:
         print("Top 5 most frequent classes:")
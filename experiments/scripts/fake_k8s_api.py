@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Serve a fake Kubernetes API and Triton control plane for developing the action executor.
+
+The Kubernetes side holds the Triton Deployment, its pods and the config.pbtxt ConfigMap
+in memory and supports the calls rl/action_executor.py makes: GET, strategic merge PATCH
+(lists of named items are merged by name), and the pods/resize subresource. A change to
+the Deployment's pod template starts a rollout that replaces the pods after --rollout-s
+seconds, taking resources from the template and the model config from the ConfigMap, and
+the model is unavailable for the last --downtime-s seconds of it. An in-place resize
+shows up in the pod status after --resize-s seconds.
+
+The Triton side (--triton-port) answers model readiness and config and the model-control
+load call with a config override, which makes the model unavailable for --reload-s
+seconds. --no-resize and --no-model-control make those calls fail the way an older
+cluster or a Triton without explicit model control would, and --fixed-batch rejects
+batched configs the way Triton does for a model with a fixed batch dimension.
+"""
+
+import re
+import json
+import time
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Fake Kubernetes API and Triton control plane')
+    parser.add_argument('--port', type=int, default=8001,
+                        help='Port of the Kubernetes API (like kubectl proxy)')
+    parser.add_argument('--triton-port', type=int, default=8000,
+                        help='Port of the Triton model readiness and control endpoints')
+    parser.add_argument('--namespace', type=str, default='workloads',
+                        help='Namespace of the fake resources')
+    parser.add_argument('--deployment', type=str, default='mobilenetv4-triton-deployment',
+                        help='Name of the fake Triton deployment')
+    parser.add_argument('--configmap', type=str, default='mobilenetv4-config-pbtxt-cm',
+                        help='Name of the fake ConfigMap holding config.pbtxt')
+    parser.add_argument('--model-name', type=str, default='mobilenetv4',
+                        help='Model name in the fake Triton')
+    parser.add_argument('--replicas', type=int, default=1,
+                        help='Number of pods')
+    parser.add_argument('--rollout-s', type=float, default=8.0,
+                        help='How long a rollout takes')
+    parser.add_argument('--downtime-s', type=float, default=3.0,
+                        help='How long the model is unavailable at the end of a rollout')
+    parser.add_argument('--resize-s', type=float, default=1.0,
+                        help='How long an in-place resize takes to show in the pod status')
+    parser.add_argument('--reload-s', type=float, default=2.0,
+                        help='How long a model load through the control API takes')
+    parser.add_argument('--no-resize', action='store_true',
+                        help='Reject in-place pod resize (pods/resize returns 404)')
+    parser.add_argument('--no-model-control', action='store_true',
+                        help='Reject model-control load calls, as Triton without explicit model control')
+    parser.add_argument('--fixed-batch', action='store_true',
+                        help='Reject loads with max_batch_size > 0, as for a model with a fixed batch dimension')
+    return parser.parse_args()
+
+def merge_patch(target, patch):
+    """Strategic merge patch: dicts merge, lists of named dicts merge by name, None deletes."""
+    if not isinstance(patch, dict) or not isinstance(target, dict):
+        return patch
+    result = dict(target)
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        elif isinstance(value, list) and all(isinstance(v, dict) and 'name' in v for v in value) \
+                and isinstance(result.get(key), list):
+            items = {item.get('name'): item for item in result[key]}
+            for item in value:
+                items[item['name']] = merge_patch(items.get(item['name'], {}), item)
+            result[key] = list(items.values())
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+def parse_model_config(text):
+    """max_batch_size and instance count of a config.pbtxt."""
+    batch = re.search(r'max_batch_size:\s*(\d+)', text)
+    count = re.search(r'count:\s*(\d+)', text)
+    return {'max_batch_size': int(batch.group(1)) if batch else 0,
+            'instance_count': int(count.group(1)) if count else 1}
+
+class FakeCluster:
+    """In-memory Deployment, pods, ConfigMap and model state, advanced lazily on every request."""
+
+    def __init__(self, args):
+        self.args = args
+        self.lock = threading.Lock()
+        self.pod_serial = 0
+        self.rollout_done_at = None
+        self.model_ready_at = 0.0
+        self.resources = {'requests': {'cpu': '2', 'memory': '4Gi', 'nvidia.com/gpu': '1'},
+                          'limits': {'cpu': '2', 'memory': '4Gi', 'nvidia.com/gpu': '1'}}
+        self.config_text = (f'name: "{args.model_name}"\nplatform: "onnxruntime_onnx"\nmax_batch_size: 0\n'
+                            'instance_group [ { kind: KIND_GPU, count: 1 } ]\n')
+        self.deployment = {
+            'apiVersion': 'apps/v1', 'kind': 'Deployment',
+            'metadata': {'name': args.deployment, 'namespace': args.namespace, 'generation': 1},
+            'spec': {
+                'replicas': args.replicas,
+                'selector': {'matchLabels': {'app': 'mobilenetv4-triton'}},
+                'template': {
+                    'metadata': {'labels': {'app': 'mobilenetv4-triton'}},
+                    'spec': {'containers': [{'name': 'triton-inference-server',
+                                             'resources': json.loads(json.dumps(self.resources))}]},
+                },
+            },
+            'status': {'observedGeneration': 1, 'replicas': args.replicas,
+                       'updatedReplicas': args.replicas, 'availableReplicas': args.replicas},
+        }
+        self.configmap = {'apiVersion': 'v1', 'kind': 'ConfigMap',
+                          'metadata': {'name': args.configmap, 'namespace': args.namespace},
+                          'data': {'config.pbtxt': self.config_text}}
+        self.model_config = parse_model_config(self.config_text)
+        self.pods = {}
+        for _ in range(args.replicas):
+            self._new_pod()
+
+    def _new_pod(self):
+        self.pod_serial += 1
+        name = f"{self.args.deployment}-{self.pod_serial:05d}"
+        container = self.deployment['spec']['template']['spec']['containers'][0]
+        self.pods[name] = {
+            'apiVersion': 'v1', 'kind': 'Pod',
+            'metadata': {'name': name, 'namespace': self.args.namespace,
+                         'labels': {'app': 'mobilenetv4-triton'}},
+            'spec': {'containers': [{'name': container['name'],
+                                     'resources': json.loads(json.dumps(container['resources']))}]},
+            'status': {'phase': 'Running',
+                       'containerStatuses': [{'name': container['name'], 'ready': True,
+                                              'resources': json.loads(json.dumps(container['resources']))}]},
+            '_resize_done_at': None,
+        }
+
+    def advance(self):
+        """Finish resizes and rollouts whose time has come."""
+        now = time.monotonic()
+        for pod in self.pods.values():
+            if pod['_resize_done_at'] is not None and now >= pod['_resize_done_at']:
+                spec = pod['spec']['containers'][0]['resources']
+                pod['status']['containerStatuses'][0]['resources'] = json.loads(json.dumps(spec))
+                pod['_resize_done_at'] = None
+        if self.rollout_done_at is not None and now >= self.rollout_done_at:
+            self.pods = {}
+            for _ in range(self.args.replicas):
+                self._new_pod()
+            self.model_config = parse_model_config(self.configmap['data']['config.pbtxt'])
+            self.deployment['status'].update(observedGeneration=self.deployment['metadata']['generation'],
+                                             updatedReplicas=self.args.replicas,
+                                             availableReplicas=self.args.replicas)
+            self.rollout_done_at = None
+
+    def model_ready(self):
+        now = time.monotonic()
+        in_downtime = (self.rollout_done_at is not None
+                       and now >= self.rollout_done_at - self.args.downtime_s)
+        return now >= self.model_ready_at and not in_downtime
+
+    def patch_deployment(self, patch):
+        template = json.dumps(self.deployment['spec']['template'], sort_keys=True)
+        self.deployment = merge_patch(self.deployment, patch)
+        if json.dumps(self.deployment['spec']['template'], sort_keys=True) != template:
+            self.deployment['metadata']['generation'] += 1
+            self.deployment['status']['updatedReplicas'] = 0
+            self.deployment['status']['availableReplicas'] = self.args.replicas - 1
+            self.rollout_done_at = time.monotonic() + self.args.rollout_s
+        return self.deployment
+
+    def resize_pod(self, name, patch):
+        pod = self.pods[name]
+        containers = merge_patch({'containers': pod['spec']['containers']}, patch.get('spec', {}))
+        pod['spec']['containers'] = containers['containers']
+        pod['_resize_done_at'] = time.monotonic() + self.args.resize_s
+        return pod
+
+    def load_model(self, config):
+        time.sleep(self.args.reload_s)
+        with self.lock:
+            self.model_config = {'max_batch_size': int(config.get('max_batch_size', 0)),
+                                 'instance_count': int(config.get('instance_group', [{}])[0].get('count', 1))}
+            self.model_ready_at = time.monotonic()
+
+def public(resource):
+    return {k: v for k, v in resource.items() if not k.startswith('_')}
+
+def main():
+    """Main function."""
+    args = parse_args()
+    cluster = FakeCluster(args)
+    ns = args.namespace
+    deployment_path = f"/apis/apps/v1/namespaces/{ns}/deployments/{args.deployment}"
+    configmap_path = f"/api/v1/namespaces/{ns}/configmaps/{args.configmap}"
+    pods_path = f"/api/v1/namespaces/{ns}/pods"
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self):
+            length = int(self.headers.get('Content-Length', 0))
+            return json.loads(self.rfile.read(length) or b'{}')
+
+        def log_message(self, format, *log_args):
+            pass
+
+    class KubeHandler(Handler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            with cluster.lock:
+                cluster.advance()
+                if url.path == deployment_path:
+                    return self._reply(200, cluster.deployment)
+                if url.path == configmap_path:
+                    return self._reply(200, cluster.configmap)
+                if url.path == pods_path:
+                    selector = parse_qs(url.query).get('labelSelector', [''])[0]
+                    labels = dict(part.split('=', 1) for part in selector.split(',') if '=' in part)
+                    items = [public(p) for p in cluster.pods.values()
+                             if all(p['metadata']['labels'].get(k) == v for k, v in labels.items())]
+                    return self._reply(200, {'kind': 'PodList', 'items': items})
+                if url.path.startswith(pods_path + '/') and url.path[len(pods_path) + 1:] in cluster.pods:
+                    return self._reply(200, public(cluster.pods[url.path[len(pods_path) + 1:]]))
+            self._reply(404, {'kind': 'Status', 'reason': 'NotFound', 'code': 404})
+
+        def do_PATCH(self):
+            path = urlparse(self.path).path
+            patch = self._body()
+            with cluster.lock:
+                cluster.advance()
+                if path == deployment_path:
+                    return self._reply(200, cluster.patch_deployment(patch))
+                if path == configmap_path:
+                    cluster.configmap = merge_patch(cluster.configmap, patch)
+                    return self._reply(200, cluster.configmap)
+                if path.startswith(pods_path + '/') and path.endswith('/resize') and not args.no_resize:
+                    name = path[len(pods_path) + 1:-len('/resize')]
+                    if name in cluster.pods:
+                        return self._reply(200, public(cluster.resize_pod(name, patch)))
+            self._reply(404, {'kind': 'Status', 'reason': 'NotFound', 'code': 404})
+
+    class TritonHandler(Handler):
+        def do_GET(self):
+            model = f"/v2/models/{args.model_name}"
+            with cluster.lock:
+                cluster.advance()
+                ready = cluster.model_ready()
+                config = dict(cluster.model_config)
+            if self.path in ('/v2/health/ready', f"{model}/ready"):
+                return self._reply(200 if ready else 503, {})
+            if self.path == f"{model}/config":
+                return self._reply(200, {'name': args.model_name, 'max_batch_size': config['max_batch_size'],
+                                         'instance_group': [{'kind': 'KIND_GPU',
+                                                             'count': config['instance_count']}]})
+            self._reply(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != f"/v2/repository/models/{args.model_name}/load":
+                return self._reply(404, {'error': 'not found'})
+            body = self._body()
+            if args.no_model_control:
+                return self._reply(400, {'error': 'explicit model load / unload is not allowed if polling is enabled'})
+            config = json.loads(body.get('parameters', {}).get('config', '{}'))
+            if args.fixed_batch and int(config.get('max_batch_size', 0)) > 0:
+                return self._reply(400, {'error': f"failed to load '{args.model_name}', failed to poll from "
+                                                  f"model repository: model '{args.model_name}', tensor "
+                                                  f"'pixel_values': the model expects 4 dimensions "
+                                                  f"(shape [1,3,224,224]) but the model configuration "
+                                                  f"specifies 4 dimensions (an initial batch dimension because "
+                                                  f"max_batch_size > 0 followed by the explicit tensor shape, "
+                                                  f"making complete shape [-1,3,224,224])"})
+            with cluster.lock:
+                cluster.model_ready_at = float('inf')
+            cluster.load_model(config)
+            self._reply(200, {})
+
+    servers = [ThreadingHTTPServer(('0.0.0.0', args.port), KubeHandler),
+               ThreadingHTTPServer(('0.0.0.0', args.triton_port), TritonHandler)]
+    for server in servers[1:]:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Fake Kubernetes API at http://localhost:{args.port}, "
+          f"Triton control plane at http://localhost:{args.triton_port}")
+    try:
+        servers[0].serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.server_close()
+
+if __name__ == "__main__":
+    main()
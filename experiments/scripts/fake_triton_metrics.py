@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Serve a fake Triton metrics endpoint for developing the metrics scraper without a cluster.
+
+Counters advance with wall-clock time at the configured request rate, so windowed rates
+read back by triton_metrics.py should match --rps.
+"""
+
+import time
+import random
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Fake Triton Prometheus metrics endpoint')
+    parser.add_argument('--port', type=int, default=8002,
+                        help='Port to listen on')
+    parser.add_argument('--model-name', type=str, default='mobilenetv4',
+                        help='Model name reported in per-model series')
+    parser.add_argument('--rps', type=float, default=13.0,
+                        help='Simulated successful requests per second')
+    parser.add_argument('--queue-ms', type=float, default=2.0,
+                        help='Simulated queue time per request in milliseconds')
+    parser.add_argument('--compute-ms', type=float, default=5.0,
+                        help='Simulated compute time per request in milliseconds')
+    parser.add_argument('--gpu-utilization', type=float, default=0.43,
+                        help='Simulated GPU utilization (0-1)')
+    parser.add_argument('--extra-models', type=int, default=0,
+                        help='Number of idle extra models to include (exercises model filtering)')
+    return parser.parse_args()
+
+def render_metrics(args, elapsed):
+    """Render the exposition text for the given elapsed time."""
+    requests_done = int(args.rps * elapsed)
+    queue_us = int(requests_done * args.queue_ms * 1000)
+    compute_us = int(requests_done * args.compute_ms * 1000)
+    gpu_util = min(1.0, max(0.0, args.gpu_utilization + random.uniform(-0.02, 0.02)))
+    models = [args.model_name] + [f"idle_model_{i}" for i in range(args.extra_models)]
+
+    lines = []
+    per_model = [
+        ('nv_inference_request_success', 'counter', requests_done),
+        ('nv_inference_request_failure', 'counter', 0),
+        ('nv_inference_count', 'counter', requests_done),
+        ('nv_inference_exec_count', 'counter', requests_done),
+        ('nv_inference_request_duration_us', 'counter', queue_us + compute_us + requests_done * 300),
+        ('nv_inference_queue_duration_us', 'counter', queue_us),
+        ('nv_inference_compute_input_duration_us', 'counter', requests_done * 100),
+        ('nv_inference_compute_infer_duration_us', 'counter', compute_us),
+        ('nv_inference_compute_output_duration_us', 'counter', requests_done * 50),
+    ]
+    for name, kind, value in per_model:
+        lines.append(f"# HELP {name} Fake {name}")
+        lines.append(f"# TYPE {name} {kind}")
+        for model in models:
+            model_value = value if model == args.model_name else 0
+            lines.append(f'{name}{{model="{model}",version="1"}} {model_value}')
+
+    gpu = 'gpu_uuid="GPU-00000000-0000-0000-0000-000000000000"'
+    lines += [
+        "# HELP nv_gpu_utilization GPU utilization rate [0.0 - 1.0)",
+        "# TYPE nv_gpu_utilization gauge",
+        f"nv_gpu_utilization{{{gpu}}} {gpu_util:.4f}",
+        "# HELP nv_gpu_memory_total_bytes GPU total memory, in bytes",
+        "# TYPE nv_gpu_memory_total_bytes gauge",
+        f"nv_gpu_memory_total_bytes{{{gpu}}} 10737418240",
+        "# HELP nv_gpu_memory_used_bytes GPU used memory, in bytes",
+        "# TYPE nv_gpu_memory_used_bytes gauge",
+        f"nv_gpu_memory_used_bytes{{{gpu}}} 1610612736",
+    ]
+    return "\n".join(lines) + "\n"
+
+def main():
+    """Main function."""
+    args = parse_args()
+    start = time.time()
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = render_metrics(args, time.time() - start).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *log_args):
+            pass
+
+    server = ThreadingHTTPServer(('0.0.0.0', args.port), MetricsHandler)
+    print(f"Fake Triton metrics at http://localhost:{args.port}/metrics ({args.rps} req/s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,660 @@
+#!/usr/bin/env python3
+"""
+Shared request path for the Triton HTTP/REST inference API (KServe v2 protocol).
+
+The evaluators and load tools all build the same `pixel_values` payload, POST it to
+`/v2/models/<model>/infer` and look for the `logits` output; this module keeps that in one
+place and reuses a keep-alive session per client.
+
+A client can also spread requests over several Triton endpoints (a comma-separated URL
+list, or `dns://<headless-service>:<port>` resolved to one endpoint per pod), routing each
+request to the endpoint with the fewest outstanding requests. This avoids kube-proxy
+pinning every keep-alive connection to a single pod.
+"""
+
+import json
+import time
+import zlib
+import struct
+import random
+import socket
+import threading
+from collections import namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit
+import numpy as np
+import requests
+from urllib3.exceptions import HTTPError as Urllib3Error
+
+from stage_timer import NULL_TIMER
+from metrics_exporter import NULL_METRICS
+
+# Output tensor names we accept, in order of preference
+OUTPUT_NAMES = ('logits', 'output', 'predictions')
+
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+# Wire encodings: tensor data inlined as JSON, or raw bytes via Triton's binary data extension
+ENCODINGS = ('json', 'binary')
+
+# Triton datatype <-> NumPy dtype for binary tensors
+DATATYPES = {'FP32': np.float32, 'FP16': np.float16, 'UINT8': np.uint8, 'INT64': np.int64}
+
+# Input tensor, datatype and model name suffix per client input mode. fp16 requests go to the
+# FP16-input model from convert_fp16_input.py; uint8 and jpeg requests to the ensembles built
+# by build_model_repository.py, which preprocess on the server.
+INPUT_MODE_TENSORS = {
+    'fp32': ('pixel_values', 'FP32', ''),
+    'fp16': ('pixel_values', 'FP16', '_fp16'),
+    'uint8': ('image_uint8', 'UINT8', '_uint8'),
+    'jpeg': ('image_bytes', 'BYTES', '_jpeg'),
+}
+INPUT_MODES = tuple(INPUT_MODE_TENSORS)
+
+# HTTP body compression: requests are sent with Content-Encoding and responses requested with
+# Accept-Encoding; 'none' asks for identity responses so uncompressed runs are comparable
+COMPRESSIONS = ('none', 'gzip', 'deflate')
+DEFAULT_COMPRESSION_LEVEL = 6
+
+# Endpoint selection policies for EndpointPool
+LB_POLICIES = ('least_outstanding', 'p2c', 'round_robin')
+
+# Result of one inference request; `error` is None on success. `attempts` counts connection
+# retries and `hedged` is True when a duplicate request answered first.
+InferResult = namedtuple('InferResult', ['output', 'latency_ms', 'status_code', 'error', 'attempts', 'hedged'],
+                         defaults=(1, False))
+
+# Per-request deadline (seconds) and retry budget used unless a caller overrides them
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_RETRIES = 2
+RETRY_BACKOFF_S = 0.05
+
+# First-attempt latency samples kept for the hedging delay estimate
+HEDGE_WINDOW = 500
+HEDGE_MIN_SAMPLES = 20
+# Attempt threads per calling thread: the original and its hedge, plus room for losing attempts
+# of earlier requests that are still waiting for the server (each until its deadline at most)
+HEDGE_THREADS = 4
+
+def add_request_args(parser):
+    """Add the deadline, retry and hedging options shared by the evaluators and load tools."""
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help='Deadline per request in seconds, including retries')
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                        help='Retries with jittered backoff after connection errors')
+    parser.add_argument('--hedge', action='store_true',
+                        help='Send a duplicate request when the first is slower than the observed P95')
+    parser.add_argument('--hedge-after-ms', type=float, default=None,
+                        help='Fixed hedging delay instead of the observed P95')
+    parser.add_argument('--compression', type=str, default='none', choices=COMPRESSIONS,
+                        help='Compress request bodies and ask for compressed responses')
+    parser.add_argument('--compression-level', type=int, default=DEFAULT_COMPRESSION_LEVEL,
+                        help='zlib compression level (1 fastest, 9 smallest)')
+
+def request_options(args):
+    """InferenceClient keyword arguments from add_request_args options."""
+    return {'timeout': args.timeout, 'retries': args.retries,
+            'hedge': args.hedge, 'hedge_after_ms': args.hedge_after_ms,
+            'compression': args.compression, 'compression_level': args.compression_level}
+
+def input_model_name(model_name, input_mode):
+    """Name of the model (or preprocessing ensemble) that accepts `input_mode` inputs."""
+    return model_name + INPUT_MODE_TENSORS[input_mode][2]
+
+def build_json_payload(input_data, input_name='pixel_values', datatype='FP32'):
+    """Build a v2 inference request payload with the tensor inlined as JSON."""
+    if datatype == 'BYTES':
+        # JSON strings cannot carry arbitrary bytes such as an encoded JPEG
+        raise ValueError("BYTES inputs need the binary encoding")
+    return {
+        "inputs": [
+            {
+                "name": input_name,
+                "shape": list(input_data.shape),
+                "datatype": datatype,
+                "data": input_data.flatten().tolist()
+            }
+        ]
+    }
+
+def encode_json_body(input_data, input_name='pixel_values', datatype='FP32'):
+    """Encode an input tensor into a ready-to-send JSON request body."""
+    return json.dumps(build_json_payload(input_data, input_name, datatype)).encode('utf-8')
+
+def encode_binary_body(input_data, input_name='pixel_values', datatype='FP32', output_name='logits'):
+    """
+    Encode an input tensor with Triton's binary tensor data extension.
+
+    The body is a JSON inference header followed by the raw little-endian tensor bytes;
+    the output is requested in binary as well. Returns (body, headers).
+    """
+    if datatype == 'BYTES':
+        # Each element is a 4-byte little-endian length followed by its bytes
+        raw = b''.join(struct.pack('<I', len(item)) + item for item in input_data.flat)
+    else:
+        raw = np.ascontiguousarray(input_data, dtype=DATATYPES[datatype]).tobytes()
+    header = {
+        "inputs": [
+            {
+                "name": input_name,
+                "shape": list(input_data.shape),
+                "datatype": datatype,
+                "parameters": {"binary_data_size": len(raw)}
+            }
+        ],
+        "outputs": [
+            {"name": output_name, "parameters": {"binary_data": True}}
+        ]
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+    headers = {
+        'Content-Type': 'application/octet-stream',
+        'Inference-Header-Content-Length': str(len(header_bytes)),
+    }
+    return header_bytes + raw, headers
+
+def encode_body(input_data, encoding='json', input_name='pixel_values', datatype='FP32'):
+    """Encode an input tensor into its final wire form; returns (body, headers)."""
+    if encoding == 'binary':
+        return encode_binary_body(input_data, input_name, datatype)
+    if encoding == 'json':
+        return encode_json_body(input_data, input_name, datatype), JSON_HEADERS
+    raise ValueError(f"Unknown encoding: {encoding}")
+
+def compress_body(body, compression, level=DEFAULT_COMPRESSION_LEVEL):
+    """Compress a request body for Content-Encoding `compression` (gzip or deflate)."""
+    if compression == 'gzip':
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    elif compression == 'deflate':
+        # HTTP "deflate" is the zlib format
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 15)
+    else:
+        raise ValueError(f"Unknown compression: {compression}")
+    return compressor.compress(body) + compressor.flush()
+
+def find_output(response_data, names=OUTPUT_NAMES, binary=b''):
+    """Find the output tensor (usually named "logits") in a response header."""
+    offset = 0
+    for output in response_data.get('outputs', []):
+        size = output.get('parameters', {}).get('binary_data_size')
+        if output.get('name') in names:
+            if size is None:
+                return np.array(output.get('data')).reshape(output.get('shape'))
+            dtype = DATATYPES.get(output.get('datatype'), np.float32)
+            return np.frombuffer(binary, dtype=dtype, count=size // np.dtype(dtype).itemsize,
+                                 offset=offset).reshape(output.get('shape'))
+        # Binary outputs are concatenated in header order
+        offset += size or 0
+    return None
+
+def parse_response(response):
+    """Extract the output tensor from a JSON or binary-extension response."""
+    header_length = response.headers.get('Inference-Header-Content-Length')
+    if header_length is None:
+        return find_output(response.json())
+    content = response.content
+    header_length = int(header_length)
+    return find_output(json.loads(content[:header_length]), binary=content[header_length:])
+
+def resolve_endpoints(url):
+    """
+    Expand a --url value into a list of base URLs.
+
+    Accepts a single URL, a comma-separated list, or `dns://host:port`, which resolves
+    every address behind the name (one per pod for a headless service).
+    """
+    urls = []
+    for part in url.split(','):
+        part = part.strip().rstrip('/')
+        if not part:
+            continue
+        if part.startswith('dns://'):
+            target = urlsplit(part)
+            port = target.port or 8000
+            infos = socket.getaddrinfo(target.hostname, port, type=socket.SOCK_STREAM)
+            addresses = sorted({info[4][0] for info in infos})
+            urls.extend(f"http://[{a}]:{port}" if ':' in a else f"http://{a}:{port}" for a in addresses)
+        else:
+            urls.append(part)
+    if not urls:
+        raise ValueError(f"No inference endpoints in {url!r}")
+    return urls
+
+class EndpointPool:
+    """
+    Route requests across inference endpoints and keep per-endpoint statistics.
+
+    One pool is shared by every client (and thread) of a run so that outstanding-request
+    counts reflect the whole load. DNS-discovered endpoints are re-resolved every
+    `refresh_interval` seconds; statistics are kept per URL across refreshes.
+    """
+
+    def __init__(self, url, policy='least_outstanding', refresh_interval=30.0, seed=None):
+        if policy not in LB_POLICIES:
+            raise ValueError(f"Unknown load balancing policy: {policy}")
+        self.spec = url
+        self.policy = policy
+        self.refresh_interval = refresh_interval if 'dns://' in url else None
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._next = 0
+        self._outstanding = {}
+        self._stats = {}
+        self._set_urls(resolve_endpoints(url))
+
+    def _set_urls(self, urls):
+        self.urls = urls
+        self._resolved_at = time.monotonic()
+        for u in urls:
+            self._outstanding.setdefault(u, 0)
+            self._stats.setdefault(u, {'requests': 0, 'errors': 0, 'latencies_ms': []})
+
+    def __len__(self):
+        return len(self.urls)
+
+    def refresh(self):
+        """Re-resolve DNS endpoints if the refresh interval has passed."""
+        if self.refresh_interval is None or time.monotonic() - self._resolved_at < self.refresh_interval:
+            return
+        with self._lock:
+            # Claim this refresh so concurrent threads do not all resolve at once
+            self._resolved_at = time.monotonic()
+        try:
+            urls = resolve_endpoints(self.spec)
+        except (OSError, ValueError):
+            # Keep routing to the last known endpoints if DNS is briefly unavailable
+            urls = self.urls
+        with self._lock:
+            self._set_urls(urls)
+
+    def acquire(self, exclude=None):
+        """Pick an endpoint for one request and count it as outstanding; returns its URL."""
+        self.refresh()
+        with self._lock:
+            urls = self.urls
+            if exclude is not None and len(urls) > 1:
+                # Hedged requests go to a different endpoint than the original when possible
+                urls = [u for u in urls if u != exclude]
+            if len(urls) == 1:
+                chosen = urls[0]
+            elif self.policy == 'round_robin':
+                chosen = urls[self._next % len(urls)]
+                self._next += 1
+            elif self.policy == 'p2c':
+                a, b = self._rng.sample(urls, 2)
+                chosen = a if self._outstanding[a] <= self._outstanding[b] else b
+            else:
+                # Rotate the scan start so ties do not always go to the first endpoint
+                start = self._next % len(urls)
+                self._next += 1
+                rotated = urls[start:] + urls[:start]
+                chosen = min(rotated, key=lambda u: self._outstanding[u])
+            self._outstanding[chosen] += 1
+            return chosen
+
+    def release(self, url, latency_ms, ok):
+        """Mark a request to `url` as finished and record its outcome."""
+        with self._lock:
+            self._outstanding[url] -= 1
+            stats = self._stats[url]
+            stats['requests'] += 1
+            if ok:
+                stats['latencies_ms'].append(latency_ms)
+            else:
+                stats['errors'] += 1
+
+    def stats(self):
+        """Per-endpoint request, error and latency summary for a results file."""
+        with self._lock:
+            snapshot = {u: dict(s, latencies_ms=list(s['latencies_ms'])) for u, s in self._stats.items()}
+        summary = {}
+        for u, s in snapshot.items():
+            latencies = np.asarray(s['latencies_ms'], dtype=float)
+            entry = {'requests': s['requests'], 'errors': s['errors'],
+                     'error_rate': s['errors'] / s['requests'] if s['requests'] else 0.0}
+            if len(latencies):
+                p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+                entry.update(avg_latency_ms=float(latencies.mean()), p50_latency_ms=float(p50),
+                             p95_latency_ms=float(p95), p99_latency_ms=float(p99))
+            summary[u] = entry
+        return {'policy': self.policy, 'endpoints': summary}
+
+def compression_summary(counts):
+    """
+    Bytes saved against CPU spent from RequestStats counters.
+
+    `breakeven_link_mbps` is the link speed below which the transfer time saved (request and
+    response bytes) exceeds the client CPU time spent compressing requests and decompressing
+    responses: compression pays off on slower links.
+    """
+    requests_sent = max(counts['requests'], 1)
+    raw_request = counts['uncompressed_request_bytes'] or counts['request_bytes']
+    raw_response = counts['uncompressed_response_bytes'] or counts['response_bytes']
+    saved = (raw_request - counts['request_bytes']) + (raw_response - counts['response_bytes'])
+    cpu_s = (counts['compress_cpu_ns'] + counts['decompress_cpu_ns']) / 1e9
+    return {
+        'request_ratio': counts['request_bytes'] / raw_request if raw_request else 1.0,
+        'response_ratio': counts['response_bytes'] / raw_response if raw_response else 1.0,
+        'bytes_saved_per_request': saved / requests_sent,
+        'compress_cpu_ms_per_request': counts['compress_cpu_ns'] / 1e6 / requests_sent,
+        'decompress_cpu_ms_per_request': counts['decompress_cpu_ns'] / 1e6 / requests_sent,
+        'breakeven_link_mbps': saved * 8 / cpu_s / 1e6 if cpu_s > 0 else None,
+    }
+
+class RequestStats:
+    """
+    Retry, timeout and hedging counters plus latency samples, shareable between clients.
+
+    `first_attempt` holds the latency of every original (non-hedge) attempt, including
+    ones that lost to their hedge, so comparing its P99 with `end_to_end` shows how much
+    hedging cut the tail.
+
+    Byte counters hold wire and uncompressed sizes of request and response bodies, and
+    `compress_cpu_ns` / `decompress_cpu_ns` the client CPU spent compressing requests and
+    decompressing responses; summary() turns them into the compression trade-off.
+    """
+
+    def __init__(self):
+        self.counts = {'requests': 0, 'retries': 0, 'timeouts': 0, 'connection_errors': 0,
+                       'hedges_sent': 0, 'hedges_won': 0, 'request_bytes': 0,
+                       'uncompressed_request_bytes': 0, 'response_bytes': 0,
+                       'uncompressed_response_bytes': 0, 'compress_cpu_ns': 0, 'decompress_cpu_ns': 0}
+        # (algorithm, level) of the clients recording into these stats
+        self.compression = ('none', None)
+        self.first_attempt_ms = deque(maxlen=HEDGE_WINDOW)
+        self.samples = {'first_attempt': [], 'end_to_end': [], 'hedged': []}
+        self._lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counts[name] += n
+
+    def record(self, name, latency_ms):
+        with self._lock:
+            self.samples[name].append(latency_ms)
+            if name == 'first_attempt':
+                self.first_attempt_ms.append(latency_ms)
+
+    def percentile(self, q):
+        """Percentile of recent first-attempt latencies, or None before enough samples."""
+        with self._lock:
+            if len(self.first_attempt_ms) < HEDGE_MIN_SAMPLES:
+                return None
+            recent = list(self.first_attempt_ms)
+        return float(np.percentile(recent, q))
+
+    def summary(self):
+        """Counters and latency percentiles for a results file."""
+        with self._lock:
+            counts = dict(self.counts)
+            samples = {k: list(v) for k, v in self.samples.items()}
+        summary = dict(counts)
+        for name, values in samples.items():
+            if values:
+                p50, p95, p99 = np.percentile(values, [50, 95, 99])
+                summary[f"{name}_latency_ms"] = {'count': len(values), 'p50': float(p50),
+                                                 'p95': float(p95), 'p99': float(p99)}
+        algorithm, level = self.compression
+        summary['compression'] = dict(compression_summary(counts), algorithm=algorithm, level=level)
+        return summary
+
+def _remaining(deadline, limit=None):
+    """Seconds left until a perf_counter deadline, at most `limit`; None for no limit at all."""
+    if deadline is None:
+        return limit
+    left = max(deadline - time.perf_counter(), 0.0)
+    return left if limit is None else min(left, limit)
+
+def _close_response(attempt):
+    """Done callback of a losing attempt: release its response."""
+    if not attempt.cancelled() and attempt.exception() is None:
+        attempt.result().close()
+
+class InferenceClient:
+    """
+    Send inference requests to one Triton model over a keep-alive session.
+
+    `url` may name several endpoints (see resolve_endpoints); pass a shared `endpoints`
+    pool instead when several clients should balance load together.
+
+    Every request has a deadline of `timeout` seconds covering all of its attempts.
+    Connection errors are retried up to `retries` times with jittered exponential backoff.
+    With `hedge`, a duplicate is sent (to another endpoint when there is one, otherwise on
+    another pooled connection) if the original has not answered after the observed P95
+    first-attempt latency, or `hedge_after_ms`; whichever response arrives first is used.
+
+    A StageTimer passed as `timer` records serialize, network and deserialize times, and
+    a ClientMetrics passed as `metrics` (see metrics_exporter.py) counts every request.
+
+    With `compression` gzip or deflate, request bodies are compressed at `compression_level`
+    (timed as the 'compress' stage) and compressed responses are accepted.
+
+    With `input_mode` fp16, the preprocessed tensor is sent as float16 to `<model_name>_fp16`.
+    With uint8 or jpeg, requests carry the decoded image or the JPEG bytes and go to the
+    model's preprocessing ensemble (`<model_name>_uint8` / `<model_name>_jpeg`). All three
+    always use the binary encoding.
+    """
+
+    def __init__(self, url, model_name, input_name='pixel_values', timeout=DEFAULT_TIMEOUT,
+                 encoding='json', lb_policy='least_outstanding', endpoints=None,
+                 retries=DEFAULT_RETRIES, hedge=False, hedge_after_ms=None, stats=None, timer=None,
+                 input_mode='fp32', compression='none', compression_level=DEFAULT_COMPRESSION_LEVEL,
+                 metrics=None):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression: {compression}")
+        self.endpoints = endpoints if endpoints is not None else EndpointPool(url, lb_policy)
+        # Control-plane requests (config, readiness) go to the first endpoint
+        self.url = self.endpoints.urls[0]
+        self.input_mode = input_mode
+        self.model_name = input_model_name(model_name, input_mode)
+        self.input_name = input_name
+        self.datatype = 'FP32'
+        if input_mode != 'fp32':
+            self.input_name, self.datatype, _ = INPUT_MODE_TENSORS[input_mode]
+        self.timeout = timeout
+        # Compact inputs are sent as raw bytes; JSON would inflate them several times
+        self.encoding = encoding if input_mode == 'fp32' else 'binary'
+        self.retries = retries
+        self.hedge = hedge
+        self.hedge_after_ms = hedge_after_ms
+        self.compression = None if compression == 'none' else compression
+        self.compression_level = compression_level
+        self.accept_encoding = self.compression or 'identity'
+        self.stats = stats if stats is not None else RequestStats()
+        if self.compression is not None:
+            self.stats.compression = (self.compression, compression_level)
+        self.timer = timer if timer is not None else NULL_TIMER
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+        self.infer_path = f"/v2/models/{self.model_name}/infer"
+        self.session = requests.Session()
+        self._executors = threading.local()
+
+    def _post(self, endpoint, body, headers, deadline, first_attempt=True):
+        """One HTTP attempt against `endpoint`; updates endpoint and first-attempt stats."""
+        timeout = None if deadline is None else max(deadline - time.perf_counter(), 1e-3)
+        start = time.perf_counter()
+        try:
+            # Compressed responses are read raw and decompressed by _read_body, which times it
+            response = self.session.post(endpoint + self.infer_path, data=body, headers=headers,
+                                         timeout=timeout, stream=self.compression is not None)
+            if self.compression is not None:
+                self._read_body(response)
+        except requests.RequestException:
+            self.endpoints.release(endpoint, (time.perf_counter() - start) * 1000, False)
+            raise
+        latency = (time.perf_counter() - start) * 1000
+        self.endpoints.release(endpoint, latency, response.status_code == 200)
+        if first_attempt:
+            self.stats.record('first_attempt', latency)
+        return response
+
+    def _read_body(self, response):
+        """
+        Read a streamed response body, decompressing it on this thread's CPU clock.
+
+        Counts the body's wire size before decompressing and its decoded size, whether or not
+        the response had a Content-Length (chunked responses do not).
+        """
+        try:
+            content = response.raw.read(decode_content=False)
+        except Urllib3Error as e:
+            response.close()
+            # What requests raises when reading the body fails
+            raise requests.ConnectionError(e) from e
+        self.stats.count('response_bytes', len(content))
+        encoding = response.headers.get('Content-Encoding', 'identity').lower()
+        if encoding in ('gzip', 'deflate'):
+            cpu_start = time.thread_time_ns()
+            # wbits 47 accepts both the gzip and the zlib (HTTP deflate) format
+            content = zlib.decompress(content, 47)
+            self.stats.count('decompress_cpu_ns', time.thread_time_ns() - cpu_start)
+        self.stats.count('uncompressed_response_bytes', len(content))
+        response._content = content
+
+    def _hedge_executor(self):
+        """Attempt threads of the calling thread, so concurrent callers never wait for each other's."""
+        executor = getattr(self._executors, 'executor', None)
+        if executor is None:
+            executor = self._executors.executor = ThreadPoolExecutor(max_workers=HEDGE_THREADS)
+        return executor
+
+    def _post_hedged(self, body, headers, deadline):
+        """
+        Send the request, duplicating it if it is slow; returns (response, hedged).
+
+        The deadline covers the whole race, not just each socket operation: if no attempt has
+        succeeded by then, requests.Timeout is raised. A losing attempt cannot be interrupted
+        while it waits for the server, but its response is closed as soon as it arrives.
+        """
+        executor = self._hedge_executor()
+        endpoint = self.endpoints.acquire()
+        primary = executor.submit(self._post, endpoint, body, headers, deadline)
+        attempts = [primary]
+        delay_ms = self.hedge_after_ms if self.hedge_after_ms is not None else self.stats.percentile(95)
+        if delay_ms is not None:
+            done, _ = wait(attempts, timeout=_remaining(deadline, delay_ms / 1000))
+            if not done and (deadline is None or time.perf_counter() < deadline):
+                self.stats.count('hedges_sent')
+                attempts.append(executor.submit(self._post, self.endpoints.acquire(exclude=endpoint),
+                                                body, headers, deadline, False))
+
+        # First successful attempt wins; a failed one falls back to the other before giving up
+        winner, pending = None, set(attempts)
+        while pending and winner is None:
+            done, pending = wait(pending, timeout=_remaining(deadline), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            winner = next((f for f in attempts if f in done and f.exception() is None), None)
+        for attempt in attempts:
+            if attempt is not winner:
+                attempt.add_done_callback(_close_response)
+        if winner is None:
+            if not all(f.done() for f in attempts):
+                raise requests.Timeout(f"No response within the deadline ({len(attempts)} attempts)")
+            raise primary.exception()
+        hedged = winner is not primary
+        if hedged:
+            self.stats.count('hedges_won')
+        return winner.result(), hedged
+
+    def send(self, body, headers=JSON_HEADERS, parse_output=True):
+        """POST a pre-encoded request body; latency covers the HTTP round trip(s) only."""
+        self.metrics.start()
+        try:
+            result = self._send(body, headers, parse_output)
+        except Exception:
+            self.metrics.finish(0.0, 'exception')
+            raise
+        self.metrics.finish(result.latency_ms,
+                            None if result.error is None else result.status_code or 'transport')
+        return result
+
+    def _send(self, body, headers, parse_output):
+        headers = dict(headers, **{'Accept-Encoding': self.accept_encoding})
+        if self.compression is not None:
+            cpu_start = time.thread_time_ns()
+            with self.timer.stage('compress'):
+                raw_size = len(body)
+                body = compress_body(body, self.compression, self.compression_level)
+            self.stats.count('compress_cpu_ns', time.thread_time_ns() - cpu_start)
+            self.stats.count('uncompressed_request_bytes', raw_size)
+            headers['Content-Encoding'] = self.compression
+        request_start = time.perf_counter()
+        deadline = request_start + self.timeout if self.timeout else None
+        self.stats.count('requests')
+        self.stats.count('request_bytes', len(body))
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                if self.hedge:
+                    response, hedged = self._post_hedged(body, headers, deadline)
+                else:
+                    response, hedged = self._post(self.endpoints.acquire(), body, headers, deadline), False
+                break
+            except requests.ConnectionError as e:
+                # Includes connect timeouts: nothing reached the server, so retrying is safe
+                self.stats.count('connection_errors')
+                backoff = random.uniform(0, RETRY_BACKOFF_S * 2 ** (attempts - 1))
+                if attempts > self.retries or (deadline is not None
+                                               and time.perf_counter() + backoff >= deadline):
+                    latency = (time.perf_counter() - request_start) * 1000
+                    return InferResult(None, latency, None, f"Connection error: {e}", attempts, False)
+                self.stats.count('retries')
+                time.sleep(backoff)
+            except requests.Timeout:
+                self.stats.count('timeouts')
+                latency = (time.perf_counter() - request_start) * 1000
+                return InferResult(None, latency, None,
+                                   f"Deadline of {self.timeout}s exceeded", attempts, False)
+        latency = (time.perf_counter() - request_start) * 1000  # Convert to milliseconds
+        self.stats.record('end_to_end', latency)
+        self.timer.add_ms('network', latency)
+        if hedged:
+            self.stats.record('hedged', latency)
+
+        if self.compression is None:
+            # Identity responses (Accept-Encoding) are the same size on the wire and decoded;
+            # with compression _read_body has counted both for every attempt
+            self.stats.count('uncompressed_response_bytes', len(response.content))
+            self.stats.count('response_bytes', len(response.content))
+
+        if response.status_code != 200:
+            return InferResult(None, latency, response.status_code,
+                               f"{response.status_code} - {response.text}", attempts, hedged)
+        if not parse_output:
+            return InferResult(None, latency, response.status_code, None, attempts, hedged)
+
+        with self.timer.stage('deserialize'):
+            output_data = parse_response(response)
+        if output_data is None:
+            return InferResult(None, latency, response.status_code,
+                               "Could not find output tensor in response", attempts, hedged)
+        return InferResult(output_data, latency, response.status_code, None, attempts, hedged)
+
+    def infer(self, input_data, datatype=None, parse_output=True):
+        """Encode a NumPy tensor in the client's wire encoding and run one inference request."""
+        with self.timer.stage('serialize'):
+            body, headers = encode_body(input_data, self.encoding, self.input_name,
+                                        datatype or self.datatype)
+        return self.send(body, headers, parse_output=parse_output)
+
+    def model_config(self):
+        """Return the model configuration reported by the server."""
+        response = self.session.get(f"{self.url}/v2/models/{self.model_name}/config", timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    def model_metadata(self):
+        """Return the model metadata (name, versions, platform, tensors) reported by the server."""
+        response = self.session.get(f"{self.url}/v2/models/{self.model_name}", timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    def is_model_ready(self):
+        """Check the model readiness endpoint."""
+        try:
+            response = self.session.get(f"{self.url}/v2/models/{self.model_name}/ready", timeout=5)
+            return response.status_code == 200
+        except requests.RequestException:
+            return False
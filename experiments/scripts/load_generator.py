@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Closed-loop load generation against Triton using the shared inference client.
+
+Each of `concurrency` worker threads keeps exactly one request in flight, cycling through
+pre-encoded request bodies so that the measurement reflects the server rather than
+client-side tensor encoding. With `--concurrency auto` the in-flight limit is tuned at
+runtime against a latency target (see concurrency_limit.py), so one run finds the
+highest sustainable throughput.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import numpy as np
+
+from inference_client import (InferenceClient, EndpointPool, RequestStats, JSON_HEADERS, ENCODINGS,
+                              INPUT_MODES, LB_POLICIES, add_request_args, request_options,
+                              input_model_name)
+from concurrency_limit import AdaptiveLimiter, LIMIT_ALGORITHMS
+from results_store import add_results_store_args, save_run
+from metrics_exporter import add_metrics_args, serve_metrics
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Closed-loop load test against Triton')
+    parser.add_argument('--url', type=str, default='http://localhost:8000',
+                        help='Triton server URL(s): comma-separated, or dns://<headless-service>:8000')
+    parser.add_argument('--lb-policy', type=str, default='least_outstanding', choices=LB_POLICIES,
+                        help='How requests are spread over multiple endpoints')
+    parser.add_argument('--model-name', type=str, default='mobilenetv4',
+                        help='Model name in Triton')
+    parser.add_argument('--concurrency', type=str, default='auto',
+                        help="Requests kept in flight, or 'auto' to adapt to --latency-target-ms")
+    parser.add_argument('--latency-target-ms', type=float, default=100.0,
+                        help='Latency target for --concurrency auto')
+    parser.add_argument('--latency-percentile', type=float, default=90.0,
+                        help='Percentile of each window compared against the target')
+    parser.add_argument('--limit-algorithm', type=str, default='gradient', choices=LIMIT_ALGORITHMS,
+                        help='Limit algorithm for --concurrency auto')
+    parser.add_argument('--max-concurrency', type=int, default=64,
+                        help='Upper bound on the adaptive limit')
+    parser.add_argument('--duration', type=float, default=60.0,
+                        help='Measurement time in seconds')
+    parser.add_argument('--warmup', type=float, default=5.0,
+                        help='Warmup time in seconds (not measured)')
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help='Images per request')
+    parser.add_argument('--pool-size', type=int, default=32,
+                        help='Number of distinct pre-encoded inputs cycled')
+    parser.add_argument('--encoding', type=str, default='binary', choices=ENCODINGS,
+                        help='Request wire encoding')
+    parser.add_argument('--input-mode', type=str, default='fp32', choices=INPUT_MODES,
+                        help='Send float32/float16 tensors, or uint8 images / JPEG bytes to the preprocessing ensemble')
+    parser.add_argument('--body-cache', type=str, default=None,
+                        help='Replay request bodies from a cache built by body_cache.py instead')
+    parser.add_argument('--record-trace', type=str, default=None,
+                        help='Save the arrival schedule of every request as a workload trace (.npz)')
+    parser.add_argument('--output-file', type=str, default='load_results.json',
+                        help='Path to save results')
+    add_request_args(parser)
+    add_results_store_args(parser)
+    add_metrics_args(parser)
+    return parser.parse_args()
+
+def latency_summary(latencies_ms):
+    """Average and tail latency of a list of samples, in milliseconds."""
+    if len(latencies_ms) == 0:
+        return {'avg_latency_ms': 0.0, 'p50_latency_ms': 0.0,
+                'p95_latency_ms': 0.0, 'p99_latency_ms': 0.0}
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        'avg_latency_ms': float(np.mean(latencies_ms)),
+        'p50_latency_ms': float(p50),
+        'p95_latency_ms': float(p95),
+        'p99_latency_ms': float(p99),
+    }
+
+def run_closed_loop(url, model_name, bodies, concurrency, duration, warmup=2.0,
+                    headers=JSON_HEADERS, items_per_request=1, lb_policy='least_outstanding',
+                    limiter=None, client_options=None, recorder=None):
+    """
+    Drive the server with `concurrency` outstanding requests for warmup + duration seconds.
+
+    With an AdaptiveLimiter, `concurrency` is the number of worker threads (the upper bound)
+    and the limiter decides how many of them may have a request in flight at a time.
+    A TraceRecorder passed as `recorder` captures when each request (warmup included) was sent.
+
+    `headers` is either one dict for all bodies or a list parallel to `bodies`. When `url`
+    names several endpoints, all workers share one EndpointPool so routing sees the
+    total number of outstanding requests per endpoint. `client_options` (deadline, retry
+    and hedging settings) are passed to every worker's InferenceClient.
+    Requests completing during the warmup period are excluded from the statistics.
+    Returns throughput, latency percentiles and the raw per-request samples.
+    """
+    header_list = headers if isinstance(headers, list) else [headers] * len(bodies)
+    start = time.perf_counter()
+    measure_start = start + warmup
+    stop_at = measure_start + duration
+    per_worker = [None] * concurrency
+    endpoints = EndpointPool(url, lb_policy)
+    request_stats = RequestStats()
+
+    def worker(worker_id):
+        client = InferenceClient(url, model_name, endpoints=endpoints, stats=request_stats,
+                                 **(client_options or {}))
+        latencies = []
+        completions = []
+        errors = 0
+        i = worker_id
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                break
+            if limiter is not None and not limiter.acquire(timeout=0.1):
+                continue
+            body = bodies[i % len(bodies)]
+            body_headers = header_list[i % len(bodies)]
+            if recorder is not None:
+                recorder.record(i % len(bodies), worker_id)
+            i += concurrency
+            send_start = time.perf_counter()
+            try:
+                result = client.send(body, body_headers, parse_output=False)
+                ok = result.error is None
+            except Exception:
+                ok = False
+            done = time.perf_counter()
+            if limiter is not None:
+                limiter.release((done - send_start) * 1000, ok)
+            if done < measure_start or done > stop_at:
+                continue
+            if ok:
+                latencies.append(result.latency_ms)
+                completions.append(done - measure_start)
+            else:
+                errors += 1
+        per_worker[worker_id] = (latencies, completions, errors)
+
+    threads = [threading.Thread(target=worker, args=(w,), daemon=True) for w in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies = np.concatenate([np.asarray(w[0], dtype=float) for w in per_worker])
+    completions = np.concatenate([np.asarray(w[1], dtype=float) for w in per_worker])
+    errors = sum(w[2] for w in per_worker)
+    order = np.argsort(completions)
+
+    results = {
+        'concurrency': concurrency,
+        'duration_s': duration,
+        'successful_count': int(len(latencies)),
+        'error_count': int(errors),
+        'requests_per_second': len(latencies) / duration,
+        'images_per_second': len(latencies) * items_per_request / duration,
+        **latency_summary(latencies),
+        'latency_samples_ms': latencies[order],
+        'completion_times_s': completions[order],
+        'endpoints': endpoints.stats(),
+        'request_stats': request_stats.summary(),
+    }
+    if limiter is not None:
+        # Throughput once the limit has settled: the last third of the measurement
+        settled = completions >= duration * 2 / 3
+        results['concurrency'] = 'auto'
+        results['converged_limit'] = limiter.converged_limit()
+        results['converged_requests_per_second'] = int(settled.sum()) / (duration / 3)
+        results['converged_images_per_second'] = results['converged_requests_per_second'] * items_per_request
+        results['adaptive_limit'] = limiter.summary()
+    return results
+
+def main():
+    """Main function."""
+    args = parse_args()
+    if args.body_cache:
+        from body_cache import BodyCache
+        cache = BodyCache(args.body_cache)
+        bodies, headers = cache.bodies, cache.headers
+        input_mode = cache.input_mode
+    else:
+        from synthetic_pool import SyntheticInputPool
+        pool = SyntheticInputPool(args.pool_size, shape=(args.batch_size, 3, 224, 224),
+                                  distribution='imagenet', encoding=args.encoding,
+                                  input_mode=args.input_mode)
+        bodies, headers = pool.bodies, pool.headers
+        input_mode = args.input_mode
+    # uint8 and jpeg bodies go to the preprocessing ensemble
+    model_name = input_model_name(args.model_name, input_mode)
+
+    metrics = serve_metrics(args.metrics_port, model_name)
+    recorder = None
+    if args.record_trace:
+        from workload_trace import TraceRecorder
+        recorder = TraceRecorder(source='load_generator', model=model_name, input_mode=input_mode,
+                                 payloads=len(bodies), concurrency=args.concurrency)
+
+    limiter = None
+    if args.concurrency == 'auto':
+        limiter = AdaptiveLimiter(args.latency_target_ms, args.limit_algorithm,
+                                  max_limit=args.max_concurrency,
+                                  latency_percentile=args.latency_percentile)
+        concurrency = args.max_concurrency
+    else:
+        concurrency = int(args.concurrency)
+
+    results = run_closed_loop(args.url, model_name, bodies, concurrency, args.duration,
+                              args.warmup, headers=headers, items_per_request=args.batch_size,
+                              lb_policy=args.lb_policy, limiter=limiter,
+                              client_options=dict(request_options(args), metrics=metrics),
+                              recorder=recorder)
+    results = {k: v.tolist() if isinstance(v, np.ndarray) else v for k, v in results.items()}
+    results['input_mode'] = input_mode
+    results['body_bytes'] = int(np.mean([len(b) for b in bodies]))
+    if results['successful_count'] == 0:
+        print("Error: no request succeeded")
+        sys.exit(1)
+
+    if limiter is not None:
+        print(f"Converged limit: {results['converged_limit']:.1f} in flight "
+              f"({args.limit_algorithm}, P{args.latency_percentile:g} target {args.latency_target_ms} ms)")
+        print(f"Converged throughput: {results['converged_images_per_second']:.1f} images/sec")
+    compression = results['request_stats']['compression']
+    if compression['algorithm'] != 'none':
+        breakeven = compression['breakeven_link_mbps']
+        print(f"Compression {compression['algorithm']} level {compression['level']}: "
+              f"{compression['bytes_saved_per_request'] / 1024:.1f} KB saved per request for "
+              f"{compression['compress_cpu_ms_per_request']:.2f} + {compression['decompress_cpu_ms_per_request']:.2f} ms "
+              f"client CPU (compress + decompress)"
+              + (f"; pays off on links slower than {breakeven:.0f} Mbit/s" if breakeven else ""))
+    # Failed requests are only counted, so they are stored without latency or completion time
+    errors = results['error_count']
+    save_run(args, 'load_generator', {
+        'latency_ms': np.concatenate([results['latency_samples_ms'], np.full(errors, np.nan)]),
+        'completion_s': np.concatenate([results['completion_times_s'], np.full(errors, np.nan)]),
+        'ok': np.concatenate([np.ones(results['successful_count'], dtype=np.int8), np.zeros(errors, dtype=np.int8)]),
+    }, results, model=model_name, input_mode=input_mode, load_pattern='closed_loop',
+        concurrency=results['concurrency'], batch_size=args.batch_size)
+    print(f"Throughput: {results['images_per_second']:.1f} images/sec, "
+          f"P50 {results['p50_latency_ms']:.1f} / P95 {results['p95_latency_ms']:.1f} / "
+          f"P99 {results['p99_latency_ms']:.1f} ms, {results['error_count']} errors")
+
+    if recorder is not None:
+        trace = recorder.save(args.record_trace)
+        print(f"Recorded {len(trace)} arrivals to {args.record_trace}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output_file)), exist_ok=True)
+    with open(args.output_file, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {args.output_file}")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,35 @@
-from locust import HttpUser, task, between
+import os
+import socket
+import itertools
+from locust import HttpUser, FastHttpUser, task, between
+
+# Directory of a cache built by body_cache.py; when present, inference requests are replayed from it
+BODY_CACHE_DIR = os.environ.get("BODY_CACHE_DIR", "")
+MODEL_NAME = os.environ.get("MODEL_NAME", "mobilenetv4")
+# Where to save the arrival trace of the inference requests; {host} expands to the hostname,
+# so each Locust worker writes its own file (merge them with workload_trace.py)
+TRACE_FILE = os.environ.get("TRACE_FILE", "")
+# Scenario file (see scenario.py) whose users and think time drive a headless run
+SCENARIO_FILE = os.environ.get("SCENARIO_FILE", "")
+# Where to save the completion time, latency and success of every inference request (.npz),
+# for run_scenario.py; {host} expands to the hostname like TRACE_FILE
+REQUEST_LOG_FILE = os.environ.get("REQUEST_LOG_FILE", "")
+
+scenario = None
+if SCENARIO_FILE:
+    from locust import LoadTestShape
+    from scenario import load_scenario
+
+    scenario = load_scenario(SCENARIO_FILE)
+
+    class ScenarioShape(LoadTestShape):
+        """Follow the user count of the scenario; the test stops when it ends"""
+
+        def tick(self):
+            users = scenario.users_at(self.get_run_time())
+            if users is None:
+                return None
+            return users, max(scenario.max_users, 1)
 
 class TritonUser(HttpUser):
     wait_time = between(1, 2)  # Wait 1-2 seconds between tasks
@@ -16,4 +47,78 @@ class TritonUser(HttpUser):
     @task
     def model_metadata(self):
         """Get model metadata"""
-        self.client.get("/v2/models/mobilenetv4")
\ No newline at end of file
+        self.client.get(f"/v2/models/{MODEL_NAME}")
+
+if BODY_CACHE_DIR and os.path.exists(os.path.join(BODY_CACHE_DIR, "index.json")):
+    from body_cache import BodyCache
+
+    body_cache = BodyCache(BODY_CACHE_DIR)
+    # geventhttpclient sends bytes or file objects, not the cache's memoryviews, so copy
+    # each body once when the worker starts rather than on every request
+    cached_bodies = [bytes(body) for body in body_cache.bodies]
+    body_counter = itertools.count()
+    user_ids = itertools.count()
+
+    trace_recorder = None
+    if TRACE_FILE:
+        from locust import events
+        from workload_trace import TraceRecorder
+
+        trace_recorder = TraceRecorder(source="locust", model=MODEL_NAME, payloads=len(body_cache),
+                                       host=socket.gethostname())
+
+        @events.test_stop.add_listener
+        def save_trace(environment, **kwargs):
+            """Write the recorded arrivals (the master runs no users and records none)"""
+            trace = trace_recorder.trace()
+            if len(trace):
+                trace.save(TRACE_FILE.replace("{host}", socket.gethostname()))
+
+    request_log = None
+    if REQUEST_LOG_FILE:
+        import time
+        import numpy as np
+        from locust import events
+
+        request_log = {"started_at": time.time(), "rows": []}
+
+        @events.test_start.add_listener
+        def start_request_log(environment, **kwargs):
+            request_log["started_at"] = time.time()
+
+        @events.request.add_listener
+        def log_request(request_type, name, response_time, exception=None, start_time=None, **kwargs):
+            """Record an inference request; times are seconds since the test started"""
+            if name != "infer":
+                return
+            if start_time is None:
+                start_time = time.time() - response_time / 1000
+            completion = start_time + response_time / 1000 - request_log["started_at"]
+            request_log["rows"].append((completion, response_time, exception is None))
+
+        @events.test_stop.add_listener
+        def save_request_log(environment, **kwargs):
+            """Write the per-request samples (the master runs no users and records none)"""
+            rows = sorted(request_log["rows"])
+            if rows:
+                np.savez(REQUEST_LOG_FILE.replace("{host}", socket.gethostname()),
+                         completion_s=np.array([r[0] for r in rows], dtype=float),
+                         latency_ms=np.array([r[1] for r in rows], dtype=float),
+                         ok=np.array([r[2] for r in rows], dtype=np.int8),
+                         started_at=request_log["started_at"])
+
+    class TritonInferUser(FastHttpUser):
+        # Wait 1-2 seconds between tasks, or the scenario's think time
+        wait_time = between(*scenario.think_time_s) if scenario else between(1, 2)
+
+        def on_start(self):
+            self.user_id = next(user_ids)
+
+        @task
+        def infer(self):
+            """Replay a pre-serialized inference request from the body cache"""
+            index = next(body_counter) % len(body_cache)
+            if trace_recorder is not None:
+                trace_recorder.record(index, self.user_id)
+            self.client.post(f"/v2/models/{MODEL_NAME}/infer", data=cached_bodies[index],
+                             headers=body_cache.headers[index], name="infer")
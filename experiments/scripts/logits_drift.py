@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Report how far a model variant's predictions drift from a reference run.
+
+Both runs are logits stores over the same image manifest, e.g. an evaluation with
+`--input-mode fp32` and one with `--input-mode fp16` (each evaluator run with
+`--logits-store`). Only images scored in both stores are compared. The report covers
+raw logit differences, how often the top-1 class and top-5 set agree, the KL divergence
+of the softmax outputs, and the accuracy of each run with the images whose correctness flipped.
+"""
+
+import os
+import sys
+import json
+import argparse
+import numpy as np
+
+from logits_store import LogitsStore
+from score_logits import resolve_store, class_indices, load_mapping, topk
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Compare the logits of two runs over the same images')
+    parser.add_argument('--baseline', type=str, required=True,
+                        help='Reference logits store (e.g. the FP32 run)')
+    parser.add_argument('--candidate', type=str, required=True,
+                        help='Logits store to compare (e.g. the FP16 run)')
+    parser.add_argument('--dataset-path', type=str,
+                        default='/home/guilin/allProjects/ecrl/data/tiny-imagenet/tiny-imagenet-200',
+                        help='Path to Tiny ImageNet dataset (for the wnids.txt class order)')
+    parser.add_argument('--mapping-file', type=str,
+                        default='/home/guilin/allProjects/ecrl/data/tiny-imagenet/class_mapping.json',
+                        help='Path to class mapping file (for mapped accuracy)')
+    parser.add_argument('--max-top1-disagreement', type=float, default=None,
+                        help='Exit with code 1 if the top-1 disagreement rate is above this fraction')
+    parser.add_argument('--output-file', type=str, default=None,
+                        help='Path to save the report as JSON')
+    return parser.parse_args()
+
+def softmax(logits):
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    probs = np.exp(shifted)
+    return probs / probs.sum(axis=1, keepdims=True)
+
+def accuracy_drift(base_top1, cand_top1, true_idx):
+    """Accuracy of both runs and how many images became right or wrong."""
+    valid = true_idx >= 0
+    base_hit = (base_top1 == true_idx) & valid
+    cand_hit = (cand_top1 == true_idx) & valid
+    count = int(valid.sum())
+    return {
+        'baseline_accuracy': float(base_hit.sum() / count) if count else 0.0,
+        'candidate_accuracy': float(cand_hit.sum() / count) if count else 0.0,
+        'accuracy_delta': float((cand_hit.sum() - base_hit.sum()) / count) if count else 0.0,
+        'became_correct': int((cand_hit & ~base_hit).sum()),
+        'became_wrong': int((base_hit & ~cand_hit).sum()),
+    }
+
+def drift(baseline, candidate, dataset_path, mapping_file):
+    """Drift statistics over the images scored in both stores."""
+    rows = np.flatnonzero(np.asarray(baseline.filled) & np.asarray(candidate.filled))
+    report = {
+        'baseline': baseline.describe(),
+        'candidate': candidate.describe(),
+        'compared_count': int(len(rows)),
+    }
+    if len(rows) == 0:
+        return report
+    base = np.asarray(baseline.logits[rows], dtype=np.float64)
+    cand = np.asarray(candidate.logits[rows], dtype=np.float64)
+
+    diff = np.abs(cand - base)
+    per_image_max = diff.max(axis=1)
+    base_top1, cand_top1 = base.argmax(axis=1), cand.argmax(axis=1)
+    base_top5, cand_top5 = topk(base, 5), topk(cand, 5)
+    p, q = softmax(base), softmax(cand)
+    kl = (p * (np.log(np.clip(p, 1e-12, None)) - np.log(np.clip(q, 1e-12, None)))).sum(axis=1)
+
+    report['logits'] = {
+        'mean_abs_diff': float(diff.mean()),
+        'max_abs_diff': float(diff.max()),
+        'p99_image_max_abs_diff': float(np.percentile(per_image_max, 99)),
+        'max_relative_diff': float((per_image_max / np.maximum(np.abs(base).max(axis=1), 1e-12)).max()),
+    }
+    report['top1_agreement'] = float((base_top1 == cand_top1).mean())
+    report['top1_disagreements'] = [baseline.keys[i] for i in rows[base_top1 != cand_top1]][:100]
+    report['top5_overlap'] = float(np.mean([len(set(a) & set(b)) / 5 for a, b in zip(base_top5, cand_top5)]))
+    report['mean_kl_divergence'] = float(kl.mean())
+    report['max_kl_divergence'] = float(kl.max())
+
+    labels = [baseline.labels[i] for i in rows]
+    true_idx = class_indices(labels, dataset_path)
+    report['top1'] = accuracy_drift(base_top1, cand_top1, true_idx)
+    if os.path.exists(mapping_file):
+        lookup = load_mapping(mapping_file, int(true_idx.max()) + 1)
+        true_imagenet = np.where(true_idx >= 0, lookup[true_idx], -1)
+        report['mapped_top1'] = accuracy_drift(base_top1, cand_top1, true_imagenet)
+    return report
+
+def main():
+    """Main function."""
+    args = parse_args()
+    stores = []
+    for path in (args.baseline, args.candidate):
+        store_dir = resolve_store(path)
+        if store_dir is None:
+            print(f"Error: no logits store found in {path}")
+            sys.exit(2)
+        stores.append(LogitsStore(store_dir, mode='r'))
+    baseline, candidate = stores
+    if baseline.meta['manifest_hash'] != candidate.meta['manifest_hash']:
+        print("Error: the stores cover different image manifests")
+        sys.exit(2)
+
+    report = drift(baseline, candidate, args.dataset_path, args.mapping_file)
+    print(f"{candidate.meta['model_version']} vs {baseline.meta['model_version']}: "
+          f"{report['compared_count']} images scored in both")
+    if report['compared_count'] == 0:
+        sys.exit(2)
+    logits = report['logits']
+    print(f"Logits: mean |diff| {logits['mean_abs_diff']:.5f}, max |diff| {logits['max_abs_diff']:.5f}, "
+          f"max relative {logits['max_relative_diff']:.2e}")
+    print(f"Top-1 agreement {report['top1_agreement']:.4f}, top-5 overlap {report['top5_overlap']:.4f}, "
+          f"mean KL {report['mean_kl_divergence']:.2e}")
+    for name in ('top1', 'mapped_top1'):
+        if name in report:
+            acc = report[name]
+            print(f"{name}: {acc['baseline_accuracy']:.4f} -> {acc['candidate_accuracy']:.4f} "
+                  f"({acc['accuracy_delta']:+.4f}; {acc['became_correct']} fixed, {acc['became_wrong']} broken)")
+
+    if args.output_file:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output_file)), exist_ok=True)
+        with open(args.output_file, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Drift report saved to {args.output_file}")
+
+    if args.max_top1_disagreement is not None and 1 - report['top1_agreement'] > args.max_top1_disagreement:
+        print("Top-1 drift above the allowed limit")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
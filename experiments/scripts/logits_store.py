@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Persistent, memory-mapped store of raw model logits per evaluation image.
+
+A store holds an `[N, num_classes]` float32 array of logits and an `[N]` filled mask for a
+fixed, ordered image manifest. It is keyed by the manifest, the model version reported by
+Triton, the sha256 of the served model file and a hash of the preprocessing code, and lives in
+`<root>/<key>/`. Triton does not report which model file it serves (MODEL_VARIANT ships a
+different model.onnx under the same name, version and config), so the file hash comes from
+the record prepare_model_pvc.sh writes, or from `--model-id`; without one no store is used. Evaluators only
+send requests for rows that are not filled yet, so rerunning an evaluation (or a different
+scorer, see score_logits.py) against an unchanged model and dataset needs no inference.
+Several processes may fill disjoint rows of one store at the same time (sharded evaluation).
+"""
+
+import os
+import json
+import fcntl
+import time
+import hashlib
+import inspect
+import numpy as np
+
+LOGITS_FILE = 'logits.npy'
+FILLED_FILE = 'filled.npy'
+META_FILE = 'meta.json'
+LOCK_FILE = '.lock'
+
+# Flush the memory maps to disk every this many new rows
+FLUSH_EVERY = 256
+
+# {model name: sha256 of its model.onnx} of the last model repository prepare_model_pvc.sh deployed
+DEPLOYED_MODELS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..',
+                                    'models', 'deployed_models.json')
+
+def _hash(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode('utf-8') if isinstance(part, str) else part)
+        h.update(b'\0')
+    return h.hexdigest()[:16]
+
+def manifest_hash(keys, labels):
+    """Hash of the ordered (image, label) manifest."""
+    return _hash(*(f"{k}\t{l}" for k, l in zip(keys, labels)))
+
+def preprocess_hash(*parts):
+    """
+    Hash of the preprocessing: the source code of functions or modules, plus settings.
+
+    Source lines are stripped and blank lines dropped, so identical implementations that only
+    differ in whitespace (the evaluators each carry a copy) hash the same. Other parts, such
+    as the interpolation name, are hashed by their string form.
+    """
+    texts = []
+    for part in parts:
+        if inspect.isfunction(part) or inspect.ismodule(part):
+            lines = [line.strip() for line in inspect.getsource(part).splitlines()]
+            texts.append('\n'.join(line for line in lines if line))
+        else:
+            texts.append(str(part))
+    return _hash(*texts)
+
+def model_version(client, model_id):
+    """Model name, served versions and a hash of the model config as reported by Triton, plus the model file id."""
+    metadata = client.model_metadata()
+    config = client.model_config()
+    versions = ','.join(str(v) for v in metadata.get('versions', []))
+    return f"{client.model_name}:{versions}:{_hash(json.dumps(config, sort_keys=True))}:{model_id}"
+
+def deployed_model_id(model_name, path=DEPLOYED_MODELS_FILE):
+    """sha256 of the model file prepare_model_pvc.sh deployed as `model_name`, or None if unknown."""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f).get(model_name)
+    except (OSError, ValueError):
+        return None
+
+def check_model_id(parser, args):
+    """
+    Resolve `args.model_id` for a run with `--logits-store`; exits if the model file is unknown.
+
+    Preprocessing ensembles run the `--model-name` model, so that is the file identified.
+    """
+    if args.logits_store and not args.model_id:
+        args.model_id = deployed_model_id(args.model_name)
+        if args.model_id is None:
+            parser.error(f"--logits-store needs the identity of the served model file: no entry for "
+                         f"'{args.model_name}' in {os.path.normpath(DEPLOYED_MODELS_FILE)} (written by "
+                         f"prepare_model_pvc.sh); pass --model-id, e.g. the sha256 of its model.onnx")
+
+class LogitsStore:
+    """Logits for one (manifest, model version, preprocessing) combination."""
+
+    def __init__(self, store_dir, mode='r+'):
+        with open(os.path.join(store_dir, META_FILE), 'r') as f:
+            self.meta = json.load(f)
+        self.store_dir = store_dir
+        self.keys = self.meta['keys']
+        self.labels = self.meta['labels']
+        self.logits = np.load(os.path.join(store_dir, LOGITS_FILE), mmap_mode=mode)
+        self.filled = np.load(os.path.join(store_dir, FILLED_FILE), mmap_mode=mode)
+        self._index = {key: i for i, key in enumerate(self.keys)}
+        self._pending = 0
+
+    @classmethod
+    def open(cls, root, keys, labels, model_version, preprocess_hash, num_classes=1000):
+        """Open the store matching the given key, creating an empty one if needed."""
+        m_hash = manifest_hash(keys, labels)
+        store_dir = os.path.join(root, _hash(m_hash, model_version, preprocess_hash))
+        os.makedirs(store_dir, exist_ok=True)
+        # Shard processes open the store concurrently; only one may create it
+        with open(os.path.join(store_dir, LOCK_FILE), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if not os.path.exists(os.path.join(store_dir, META_FILE)):
+                cls._create(store_dir, keys, labels, m_hash, model_version, preprocess_hash, num_classes)
+        return cls(store_dir)
+
+    @staticmethod
+    def _create(store_dir, keys, labels, m_hash, model_version, preprocess_hash, num_classes):
+        np.lib.format.open_memmap(os.path.join(store_dir, LOGITS_FILE), mode='w+',
+                                  dtype=np.float32, shape=(len(keys), num_classes)).flush()
+        np.lib.format.open_memmap(os.path.join(store_dir, FILLED_FILE), mode='w+',
+                                  dtype=np.bool_, shape=(len(keys),)).flush()
+        meta = {
+            'manifest_hash': m_hash,
+            'model_version': model_version,
+            'preprocess_hash': preprocess_hash,
+            'num_classes': num_classes,
+            'created': time.time(),
+            'keys': list(keys),
+            'labels': list(labels),
+        }
+        # Write metadata last so a half-created store is never opened
+        with open(os.path.join(store_dir, META_FILE), 'w') as f:
+            json.dump(meta, f)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def index_of(self, key):
+        return self._index[key]
+
+    def has(self, i):
+        return bool(self.filled[i])
+
+    def num_filled(self):
+        return int(np.count_nonzero(self.filled))
+
+    def missing(self):
+        """Indices of rows that still need inference."""
+        return np.flatnonzero(~np.asarray(self.filled))
+
+    def put(self, i, output):
+        """Store the logits of row i (any shape with num_classes elements)."""
+        self.logits[i] = np.asarray(output, dtype=np.float32).reshape(-1)
+        self.filled[i] = True
+        self._pending += 1
+        if self._pending >= FLUSH_EVERY:
+            self.flush()
+
+    def get(self, i):
+        """Logits of row i as a [1, num_classes] array, the shape the server returns."""
+        return np.asarray(self.logits[i]).reshape(1, -1)
+
+    def flush(self):
+        # Logits before the mask, so a filled row is always backed by data on disk
+        self.logits.flush()
+        self.filled.flush()
+        self._pending = 0
+
+    def close(self):
+        if self._pending:
+            self.flush()
+
+    def describe(self):
+        """Store identity for inclusion in a results file."""
+        return {
+            'logits_store': os.path.abspath(self.store_dir),
+            'model_version': self.meta['model_version'],
+            'manifest_hash': self.meta['manifest_hash'],
+            'preprocess_hash': self.meta['preprocess_hash'],
+            'filled': self.num_filled(),
+            'size': len(self),
+        }
+
+def find_stores(root):
+    """Metadata of every store under root, most recently modified first."""
+    stores = []
+    if not os.path.isdir(root):
+        return stores
+    for name in os.listdir(root):
+        meta_path = os.path.join(root, name, META_FILE)
+        if os.path.exists(meta_path):
+            stores.append((os.path.getmtime(os.path.join(root, name, FILLED_FILE)),
+                           os.path.join(root, name)))
+    return [path for _, path in sorted(stores, reverse=True)]
+
+def open_for_evaluation(root, client, model_id, keys, labels, preprocess):
+    """
+    Open the store for this client's model and a manifest; prints how much is reusable.
+
+    `model_id` identifies the served model file (see check_model_id). `preprocess` is a
+    function, or a tuple of functions, modules and settings, passed to preprocess_hash.
+    """
+    if not model_id:
+        raise ValueError("A logits store is only reused for a known model file (model_id)")
+    parts = preprocess if isinstance(preprocess, tuple) else (preprocess,)
+    store = LogitsStore.open(root, keys, labels, model_version(client, model_id), preprocess_hash(*parts))
+    print(f"Logits store {store.store_dir}: {store.num_filled()}/{len(store)} images already scored")
+    return store
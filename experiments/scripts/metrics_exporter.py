@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Client-side Prometheus metrics for the evaluators and load generators.
+
+With `--metrics-port`, a tool serves `/metrics` with its request rate, in-flight count,
+a latency histogram, errors by status code and the per-stage timings of its StageTimer,
+so client- and server-side views can be scraped together.
+
+Recording is lock-free: each thread updates its own shard of plain counters, and a scrape
+sums the shards. A scrape can see a shard between two updates, which only shifts a count
+to the next scrape.
+
+The series are named `ecrl_client_*`; CLIENT_SERIES lets TritonMetricsScraper
+(triton_metrics.py) poll an exporter the same way it polls Triton, e.g. to use the
+client-observed latency as a controller state feature.
+"""
+
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency histogram bucket upper bounds in seconds (Prometheus client defaults, extended to 30 s)
+LATENCY_BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Exporter series for TritonMetricsScraper: (column name, metric name, kind, aggregation)
+CLIENT_SERIES = [
+    ('client_requests', 'ecrl_client_requests_total', 'counter', 'sum'),
+    ('client_errors', 'ecrl_client_errors_total', 'counter', 'sum'),
+    ('client_in_flight', 'ecrl_client_in_flight_requests', 'gauge', 'sum'),
+    ('client_latency_seconds', 'ecrl_client_request_latency_seconds_sum', 'counter', 'sum'),
+    ('client_latency_count', 'ecrl_client_request_latency_seconds_count', 'counter', 'sum'),
+]
+
+def add_metrics_args(parser):
+    """Add the --metrics-port option shared by the evaluators and load tools."""
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='Serve client-side Prometheus metrics on this port at /metrics')
+
+class _Shard:
+    """Counters written by one thread only."""
+
+    __slots__ = ('started', 'finished', 'errors', 'buckets', 'latency_sum_s')
+
+    def __init__(self):
+        self.started = 0
+        self.finished = 0
+        self.errors = {}
+        # One count per bucket plus +Inf; not cumulative
+        self.buckets = [0] * (len(LATENCY_BUCKETS_S) + 1)
+        self.latency_sum_s = 0.0
+
+class ClientMetrics:
+    """
+    Request counters sharded per thread.
+
+    Call `start()` when a request is issued and `finish(latency_ms, error_code)` when it
+    completes; `error_code` is None for success, else the HTTP status, 'transport' when no
+    response arrived, or 'exception' when the client raised.
+    An optional StageTimer is read at scrape time for the per-stage series.
+    """
+
+    def __init__(self, model_name='', timer=None):
+        self.model_name = model_name
+        self.timer = timer
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            # Only taken once per thread
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def start(self):
+        self._shard().started += 1
+
+    def finish(self, latency_ms, error_code=None):
+        shard = self._shard()
+        shard.finished += 1
+        latency_s = latency_ms / 1000
+        shard.buckets[bisect.bisect_left(LATENCY_BUCKETS_S, latency_s)] += 1
+        shard.latency_sum_s += latency_s
+        if error_code is not None:
+            shard.errors[error_code] = shard.errors.get(error_code, 0) + 1
+
+    def snapshot(self):
+        """Totals over all shards."""
+        with self._shards_lock:
+            shards = list(self._shards)
+        errors = {}
+        buckets = [0] * (len(LATENCY_BUCKETS_S) + 1)
+        started = finished = 0
+        latency_sum_s = 0.0
+        for shard in shards:
+            started += shard.started
+            finished += shard.finished
+            latency_sum_s += shard.latency_sum_s
+            for code, count in list(shard.errors.items()):
+                errors[code] = errors.get(code, 0) + count
+            for i, count in enumerate(shard.buckets):
+                buckets[i] += count
+        return {'requests': finished, 'in_flight': max(started - finished, 0), 'errors': errors,
+                'buckets': buckets, 'latency_sum_s': latency_sum_s}
+
+    def render(self):
+        """Prometheus text exposition of the current totals."""
+        snap = self.snapshot()
+        model = f'model="{self.model_name}"'
+        lines = [
+            "# HELP ecrl_client_requests_total Requests completed by the client",
+            "# TYPE ecrl_client_requests_total counter",
+            f"ecrl_client_requests_total{{{model}}} {snap['requests']}",
+            "# HELP ecrl_client_in_flight_requests Requests issued and not yet completed",
+            "# TYPE ecrl_client_in_flight_requests gauge",
+            f"ecrl_client_in_flight_requests{{{model}}} {snap['in_flight']}",
+            "# HELP ecrl_client_errors_total Failed requests by HTTP status, transport or exception",
+            "# TYPE ecrl_client_errors_total counter",
+        ]
+        for code, count in sorted(snap['errors'].items(), key=lambda item: str(item[0])):
+            lines.append(f'ecrl_client_errors_total{{{model},code="{code}"}} {count}')
+
+        lines += [
+            "# HELP ecrl_client_request_latency_seconds Client-observed request latency",
+            "# TYPE ecrl_client_request_latency_seconds histogram",
+        ]
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS_S + ('+Inf',), snap['buckets']):
+            cumulative += count
+            lines.append(f'ecrl_client_request_latency_seconds_bucket{{{model},le="{bound}"}} {cumulative}')
+        lines.append(f"ecrl_client_request_latency_seconds_sum{{{model}}} {snap['latency_sum_s']:.6f}")
+        lines.append(f"ecrl_client_request_latency_seconds_count{{{model}}} {cumulative}")
+
+        histograms = list(getattr(self.timer, 'histograms', {}).items())
+        if histograms:
+            lines += [
+                "# HELP ecrl_client_stage_seconds Time spent in each client pipeline stage",
+                "# TYPE ecrl_client_stage_seconds summary",
+            ]
+            for stage, histogram in histograms:
+                lines.append(f'ecrl_client_stage_seconds_sum{{{model},stage="{stage}"}} '
+                             f'{histogram.total_ns / 1e9:.6f}')
+                lines.append(f'ecrl_client_stage_seconds_count{{{model},stage="{stage}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+class NullMetrics:
+    """Drop-in ClientMetrics that records nothing."""
+
+    def start(self):
+        pass
+
+    def finish(self, latency_ms, error_code=None):
+        pass
+
+NULL_METRICS = NullMetrics()
+
+def serve_metrics(port, model_name='', timer=None):
+    """
+    Start a ClientMetrics exporter on `port` in a daemon thread and return the metrics.
+
+    Returns None when `port` is None, so tools can pass `args.metrics_port` straight through.
+    """
+    if port is None:
+        return None
+    metrics = ClientMetrics(model_name, timer)
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *log_args):
+            pass
+
+    server = ThreadingHTTPServer(('0.0.0.0', port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Client metrics at http://localhost:{port}/metrics")
+    return metrics
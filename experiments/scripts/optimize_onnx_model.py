@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Build optimized variants of the MobileNetV4 ONNX model and benchmark them on CPU.
+
+Runs between download-hf-model and prepare-model. From the downloaded model it writes:
+
+  fp32          offline graph optimization (constant folding, Conv+BatchNorm fusion and
+                the other provider-independent rewrites of onnxruntime's basic level)
+                with the batch dimension made dynamic
+  fp16          the fp32 variant with float16 weights and arithmetic, float32 inputs/outputs
+  int8          static INT8 quantization (QDQ, per-channel weights) calibrated on a
+                Tiny ImageNet subset
+  int8_dynamic  dynamic INT8 quantization: weights quantized offline, activations at run
+                time, so it needs no calibration data
+
+Each variant is its own Triton model (`<output-dir>/<model-name>_opt_<variant>/1/model.onnx`
+plus `config.pbtxt`) with float32 `pixel_values` in and `logits` out like the original,
+so prepare_model_pvc.sh can ship any of them unchanged. Every variant is then run with
+the CPU execution provider: latency and throughput per batch size, model size, and the
+top-1/top-5 agreement and largest logit difference against the original model on
+held-out Tiny ImageNet images. The fastest variant whose top-1 disagreement stays within
+`--max-top1-disagreement` is recommended and its name written to `<output-dir>/RECOMMENDED`.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import numpy as np
+
+from image_decode import preprocess_batch
+from autotune_sweep import render_model_config
+
+VARIANTS = ('fp32', 'fp16', 'int8', 'int8_dynamic')
+
+# Name of the dynamic batch dimension
+BATCH_DIM = 'batch'
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Build and benchmark optimized ONNX model variants')
+    parser.add_argument('--input-model', type=str, default='../models/mobilenetv4/1/model.onnx',
+                        help='Original ONNX model')
+    parser.add_argument('--output-dir', type=str, default='../models/optimized',
+                        help='Directory to write the variant models and the report into')
+    parser.add_argument('--model-name', type=str, default='mobilenetv4',
+                        help='Model name in Triton; variants are named <model-name>_opt_<variant>')
+    parser.add_argument('--variants', type=str, default=','.join(VARIANTS),
+                        help=f"Comma-separated variants to build ({', '.join(VARIANTS)})")
+    parser.add_argument('--input-name', type=str, default='pixel_values',
+                        help='Model input')
+    parser.add_argument('--dataset-path', type=str,
+                        default='/home/guilin/allProjects/ecrl/data/tiny-imagenet/tiny-imagenet-200',
+                        help='Path to Tiny ImageNet dataset (calibration and agreement images)')
+    parser.add_argument('--calibration-samples', type=int, default=256,
+                        help='Validation images used to calibrate the static INT8 variant')
+    parser.add_argument('--eval-samples', type=int, default=500,
+                        help='Held-out validation images used for top-1 agreement')
+    parser.add_argument('--batch-sizes', type=str, default='1,8,32',
+                        help='Comma-separated batch sizes to benchmark')
+    parser.add_argument('--iterations', type=int, default=50,
+                        help='Timed runs per variant and batch size')
+    parser.add_argument('--warmup', type=int, default=5,
+                        help='Untimed runs before each measurement')
+    parser.add_argument('--threads', type=int, default=0,
+                        help='onnxruntime intra-op threads (0: onnxruntime default)')
+    parser.add_argument('--max-batch-size', type=int, default=32,
+                        help='max_batch_size in the config.pbtxt of dynamic-batch variants')
+    parser.add_argument('--select-batch-size', type=int, default=1,
+                        help='Batch size whose mean latency decides the recommended variant')
+    parser.add_argument('--max-top1-disagreement', type=float, default=0.01,
+                        help='Largest top-1 disagreement with the original for a variant to be recommended')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed for the calibration/evaluation split')
+    parser.add_argument('--output-file', type=str, default=None,
+                        help='Path to save the report (default: <output-dir>/optimization_report.json)')
+    return parser.parse_args()
+
+def parse_list(value, cast=str):
+    return [cast(v) for v in value.split(',') if v.strip()]
+
+def load_images(dataset_path, calibration_samples, eval_samples, seed):
+    """Disjoint calibration and evaluation sets of preprocessed validation images, [N, 3, 224, 224]."""
+    image_dir = os.path.join(dataset_path, 'val', 'images')
+    if not os.path.isdir(image_dir):
+        return None, None
+    files = sorted(f for f in os.listdir(image_dir) if f.lower().endswith(('.jpeg', '.jpg', '.png')))
+    random.Random(seed).shuffle(files)
+    selected = files[:calibration_samples + eval_samples]
+    tensors = preprocess_batch([os.path.join(image_dir, f) for f in selected])
+    tensors = [t for t in tensors if t is not None]
+    stacked = np.concatenate(tensors) if tensors else np.zeros((0, 3, 224, 224), dtype=np.float32)
+    return stacked[:calibration_samples], stacked[calibration_samples:]
+
+def make_batch_dynamic(model):
+    """Replace the leading dimension of every graph input and output with a symbolic batch dimension."""
+    import onnx
+    for value in list(model.graph.input) + list(model.graph.output):
+        dims = value.type.tensor_type.shape.dim
+        if len(dims) > 0:
+            dims[0].Clear()
+            dims[0].dim_param = BATCH_DIM
+    # Intermediate shapes inferred for batch 1 would contradict the inputs, so infer them again
+    del model.graph.value_info[:]
+    return onnx.shape_inference.infer_shapes(model)
+
+def optimize_graph(model_path, output_path):
+    """Offline graph optimization with onnxruntime's provider-independent (basic) rewrites."""
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_BASIC
+    options.optimized_model_filepath = output_path
+    ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+
+def session(path, threads=0):
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = threads
+    return ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+
+def run_logits(sess, input_name, inputs, batch_size):
+    """Logits for [N, 3, 224, 224] inputs, run in batches of batch_size."""
+    outputs = [sess.run(None, {input_name: inputs[i:i + batch_size]})[0]
+               for i in range(0, len(inputs), batch_size)]
+    return np.concatenate(outputs)
+
+def check_dynamic_batch(path, input_name, inputs):
+    """Whether a batch of several inputs gives the same logits as running them one by one."""
+    sess = session(path)
+    sample = inputs[:4]
+    try:
+        batched = run_logits(sess, input_name, sample, len(sample))
+    except Exception as e:
+        print(f"Warning: batched inference failed ({e})")
+        return False
+    single = run_logits(sess, input_name, sample, 1)
+    return batched.shape == single.shape and np.allclose(batched, single, atol=1e-3, rtol=1e-3)
+
+def build_fp32(args, input_path, output_path, inputs):
+    """Dynamic-batch, graph-optimized FP32 model; falls back to the original batch dimension."""
+    import onnx
+    staging = output_path + '.dynamic.onnx'
+    onnx.save(make_batch_dynamic(onnx.load(input_path)), staging)
+    optimize_graph(staging, output_path)
+    os.remove(staging)
+    if check_dynamic_batch(output_path, args.input_name, inputs):
+        return True
+    print("Warning: the model does not support a dynamic batch dimension, keeping the original one")
+    optimize_graph(input_path, output_path)
+    return False
+
+def build_fp16(fp32_path, output_path):
+    """FP16 weights and compute, with float32 graph inputs and outputs."""
+    import onnx
+    from onnxruntime.transformers.float16 import convert_float_to_float16
+    model = convert_float_to_float16(onnx.load(fp32_path), keep_io_types=True)
+    onnx.save(model, output_path)
+
+class CalibrationReader:
+    """Feeds calibration images to the onnxruntime quantizer one at a time."""
+
+    def __init__(self, input_name, images):
+        self.input_name = input_name
+        self.images = images
+        self.index = 0
+
+    def get_next(self):
+        if self.index >= len(self.images):
+            return None
+        self.index += 1
+        return {self.input_name: self.images[self.index - 1:self.index]}
+
+    def rewind(self):
+        self.index = 0
+
+def build_int8(fp32_path, output_path, input_name, calibration):
+    """Static INT8 (QDQ, per-channel weights) calibrated on the calibration images."""
+    from onnxruntime.quantization import quantize_static, QuantFormat, QuantType
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+    prepared = output_path + '.prep.onnx'
+    quant_pre_process(fp32_path, prepared, skip_optimization=True)
+    try:
+        reader = CalibrationReader(input_name, calibration)
+        quantize_static(prepared, output_path, reader, quant_format=QuantFormat.QDQ, per_channel=True,
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    finally:
+        os.remove(prepared)
+
+def build_int8_dynamic(fp32_path, output_path):
+    """Dynamic INT8: weights quantized offline, activation ranges computed per run."""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    quantize_dynamic(fp32_path, output_path, weight_type=QuantType.QUInt8)
+
+def benchmark(path, input_name, inputs, batch_sizes, iterations, warmup, threads):
+    """Latency percentiles and throughput per batch size."""
+    sess = session(path, threads)
+    results = {}
+    for batch_size in batch_sizes:
+        batch = np.resize(inputs, (batch_size,) + inputs.shape[1:]).astype(np.float32)
+        feed = {input_name: batch}
+        for _ in range(warmup):
+            sess.run(None, feed)
+        latencies = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            sess.run(None, feed)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies = np.array(latencies)
+        results[str(batch_size)] = {
+            'mean_latency_ms': float(latencies.mean()),
+            'p50_latency_ms': float(np.percentile(latencies, 50)),
+            'p95_latency_ms': float(np.percentile(latencies, 95)),
+            'images_per_second': float(batch_size * 1000.0 / latencies.mean()),
+        }
+    return results
+
+def agreement(reference, logits):
+    """Top-1 and top-5 agreement and the largest logit difference against the reference logits."""
+    ref_top1 = reference.argmax(axis=1)
+    top1 = logits.argmax(axis=1)
+    ref_top5 = np.argsort(-reference, axis=1)[:, :5]
+    top5 = np.argsort(-logits, axis=1)[:, :5]
+    return {
+        'top1_agreement': float((top1 == ref_top1).mean()),
+        'top5_overlap': float(np.mean([len(set(a) & set(b)) / 5.0 for a, b in zip(ref_top5, top5)])),
+        'top1_in_reference_top5': float((ref_top5 == top1[:, None]).any(axis=1).mean()),
+        'max_logit_diff': float(np.abs(reference - logits).max()),
+        'mean_logit_diff': float(np.abs(reference - logits).mean()),
+    }
+
+def write_variant(args, name, build, dynamic):
+    """Build one variant as a Triton model directory; returns the model path."""
+    model_dir = os.path.join(args.output_dir, f"{args.model_name}_opt_{name}")
+    model_path = os.path.join(model_dir, '1', 'model.onnx')
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    build(model_path)
+    with open(os.path.join(model_dir, 'config.pbtxt'), 'w') as f:
+        f.write(render_model_config(f"{args.model_name}_opt_{name}", 1, args.max_batch_size if dynamic else 0))
+    return model_path
+
+def recommend(report, batch_size, max_disagreement):
+    """Fastest variant (mean latency at batch_size) within the top-1 disagreement budget."""
+    acceptable = [(v['benchmark'][str(batch_size)]['mean_latency_ms'], name)
+                  for name, v in report['variants'].items()
+                  if 'error' not in v and str(batch_size) in v['benchmark']
+                  and 1.0 - v['top1_agreement'] <= max_disagreement]
+    return min(acceptable)[1] if acceptable else None
+
+def print_report(report, batch_sizes):
+    print(f"\n{'variant':<14}{'size MB':>9}{'top-1 agr.':>12}{'max diff':>10}"
+          + ''.join(f"{f'b{b} ms':>10}{f'b{b} img/s':>12}" for b in batch_sizes))
+    for name, v in report['variants'].items():
+        if 'error' in v:
+            print(f"{name:<14}failed: {v['error']}")
+            continue
+        row = f"{name:<14}{v['size_mb']:>9.2f}{v['top1_agreement']:>12.2%}{v['max_logit_diff']:>10.4f}"
+        for b in batch_sizes:
+            m = v['benchmark'].get(str(b))
+            row += f"{m['mean_latency_ms']:>10.2f}{m['images_per_second']:>12.1f}" if m else f"{'-':>10}{'-':>12}"
+        print(row)
+
+def main():
+    """Main function."""
+    args = parse_args()
+    try:
+        import onnx  # noqa: F401
+        import onnxruntime  # noqa: F401
+    except ImportError:
+        print("Error: the onnx and onnxruntime packages are required (pip install onnx onnxruntime)")
+        sys.exit(1)
+    if not os.path.exists(args.input_model):
+        print(f"Error: model not found at {args.input_model}")
+        sys.exit(1)
+    variants = parse_list(args.variants)
+    unknown = set(variants) - set(VARIANTS)
+    if unknown:
+        print(f"Error: unknown variants {sorted(unknown)}, expected {', '.join(VARIANTS)}")
+        sys.exit(1)
+    batch_sizes = sorted(set(parse_list(args.batch_sizes, int)) | {args.select_batch_size})
+
+    calibration, evaluation = load_images(args.dataset_path, args.calibration_samples, args.eval_samples, args.seed)
+    if evaluation is None or len(evaluation) == 0:
+        print(f"Error: no validation images found under {args.dataset_path}")
+        sys.exit(1)
+    print(f"Loaded {len(calibration)} calibration and {len(evaluation)} evaluation images")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    # fp32 is the base of the other variants, so it is always built
+    fp32_path = os.path.join(args.output_dir, f"{args.model_name}_opt_fp32", '1', 'model.onnx')
+    os.makedirs(os.path.dirname(fp32_path), exist_ok=True)
+    dynamic = build_fp32(args, args.input_model, fp32_path, evaluation)
+    builders = {
+        'fp32': lambda path: None,
+        'fp16': lambda path: build_fp16(fp32_path, path),
+        'int8': lambda path: build_int8(fp32_path, path, args.input_name, calibration),
+        'int8_dynamic': lambda path: build_int8_dynamic(fp32_path, path),
+    }
+
+    original = session(args.input_model, args.threads)
+    # The original may only accept batch 1
+    reference = run_logits(original, args.input_name, evaluation, 1)
+    report = {
+        'input_model': args.input_model,
+        'dynamic_batch': dynamic,
+        'calibration_samples': len(calibration),
+        'eval_samples': len(evaluation),
+        'threads': args.threads,
+        'variants': {'original': {
+            'path': args.input_model,
+            'size_mb': os.path.getsize(args.input_model) / 2**20,
+            'benchmark': benchmark(args.input_model, args.input_name, evaluation, [1],
+                                   args.iterations, args.warmup, args.threads),
+            **agreement(reference, reference),
+        }},
+    }
+    eval_batch = max(batch_sizes) if dynamic else 1
+    for name in ['fp32'] + [v for v in variants if v != 'fp32']:
+        print(f"Building and benchmarking {name}...")
+        try:
+            path = write_variant(args, name, builders[name], dynamic)
+            logits = run_logits(session(path, args.threads), args.input_name, evaluation, eval_batch)
+            report['variants'][name] = {
+                'path': path,
+                'size_mb': os.path.getsize(path) / 2**20,
+                'benchmark': benchmark(path, args.input_name, evaluation, batch_sizes if dynamic else [1],
+                                       args.iterations, args.warmup, args.threads),
+                **agreement(reference, logits),
+            }
+        except Exception as e:
+            print(f"Error: building or running the {name} variant failed: {e}")
+            report['variants'][name] = {'error': str(e)}
+    if 'fp32' not in variants:
+        shutil.rmtree(os.path.dirname(os.path.dirname(fp32_path)))
+        report['variants'].pop('fp32')
+
+    select_batch = args.select_batch_size if dynamic else 1
+    report['recommended'] = recommend(report, select_batch, args.max_top1_disagreement)
+    report['recommended_by'] = {'batch_size': select_batch, 'max_top1_disagreement': args.max_top1_disagreement}
+    print_report(report, batch_sizes)
+    with open(os.path.join(args.output_dir, 'RECOMMENDED'), 'w') as f:
+        f.write(f"{report['recommended'] or 'original'}\n")
+    print(f"\nRecommended: {report['recommended'] or 'original (no variant within the disagreement budget)'} "
+          f"(fastest at batch size {select_batch} with top-1 disagreement <= {args.max_top1_disagreement:.1%})")
+
+    output_file = args.output_file or os.path.join(args.output_dir, 'optimization_report.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+    with open(output_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {output_file}")
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,24 @@ LOCAL_MODEL_PATH="$PROJECT_ROOT_ABS/models/mobilenetv4/1/model.onnx"
 TRITON_DEPLOYMENT_YAML_PATH="$(dirname "$0")/mobilenetv4-triton-deployment.yaml" # Current directory (experiments/scripts)
 CONFIGMAP_NAME="mobilenetv4-config-pbtxt-cm"
 NAMESPACE="workloads"
+# Set WITH_PREPROCESS=1 to also install the server-side preprocessing ensembles (uint8/jpeg inputs)
+WITH_PREPROCESS="${WITH_PREPROCESS:-0}"
+# Set WITH_FP16=1 to also install the FP16-input model variant (mobilenetv4_fp16)
+WITH_FP16="${WITH_FP16:-0}"
+# Optimized variants written by optimize_onnx_model.py. MODEL_VARIANT=<variant> (or
+# "recommended") ships that variant as the main model; WITH_VARIANTS=1 also installs every
+# variant as its own model (mobilenetv4_opt_<variant>)
+OPTIMIZED_MODEL_DIR="${OPTIMIZED_MODEL_DIR:-$PROJECT_ROOT_ABS/models/optimized}"
+MODEL_VARIANT="${MODEL_VARIANT:-}"
+WITH_VARIANTS="${WITH_VARIANTS:-0}"
+
+if [ "$MODEL_VARIANT" == "recommended" ]; then
+    MODEL_VARIANT=$(cat "$OPTIMIZED_MODEL_DIR/RECOMMENDED" 2>/dev/null)
+    echo "Recommended model variant: ${MODEL_VARIANT:-none (run 'make optimize-model' first)}"
+fi
+if [ -n "$MODEL_VARIANT" ] && [ "$MODEL_VARIANT" != "original" ]; then
+    LOCAL_MODEL_PATH="$OPTIMIZED_MODEL_DIR/mobilenetv4_opt_$MODEL_VARIANT/1/model.onnx"
+fi
 
 echo "Project root determined as: $PROJECT_ROOT_ABS"
 echo "Expecting local ONNX model at: $LOCAL_MODEL_PATH"
@@ -31,11 +49,54 @@ if [ -f "$LOCAL_MODEL_PATH" ]; then
     cp "$LOCAL_MODEL_PATH" "$MODEL_DIR_IN_TEMP_HOST/model.onnx"
 else
     echo "ERROR: Local ONNX model not found at $LOCAL_MODEL_PATH!"
-    echo "Please ensure the model is downloaded first (e.g., via 'make download-hf-model')."
+    echo "Please ensure the model is downloaded first (e.g., via 'make download-hf-model'),"
+    echo "and with MODEL_VARIANT set, that the variants are built ('make optimize-model')."
     rm -rf "$TEMP_DIR_HOST" # Clean up temp dir
     exit 1 # Exit if model is not found, as further steps will fail
 fi
 
+if [ "$WITH_PREPROCESS" == "1" ]; then
+    echo "Adding server-side preprocessing models to $TEMP_DIR_HOST"
+    if ! python3 "$(dirname "$0")/build_model_repository.py" --output-dir "$TEMP_DIR_HOST"; then
+        echo "ERROR: Could not build the preprocessing models."
+        rm -rf "$TEMP_DIR_HOST"
+        exit 1
+    fi
+fi
+
+if [ "$WITH_FP16" == "1" ]; then
+    echo "Adding the FP16-input model variant to $TEMP_DIR_HOST"
+    if ! python3 "$(dirname "$0")/convert_fp16_input.py" --input-model "$LOCAL_MODEL_PATH" --output-dir "$TEMP_DIR_HOST"; then
+        echo "ERROR: Could not convert the model to FP16 input."
+        rm -rf "$TEMP_DIR_HOST"
+        exit 1
+    fi
+fi
+
+if [ "$WITH_VARIANTS" == "1" ]; then
+    echo "Adding the optimized model variants from $OPTIMIZED_MODEL_DIR to $TEMP_DIR_HOST"
+    if ! ls -d "$OPTIMIZED_MODEL_DIR"/mobilenetv4_opt_*/ > /dev/null 2>&1; then
+        echo "ERROR: No optimized variants in $OPTIMIZED_MODEL_DIR (run 'make optimize-model' first)."
+        rm -rf "$TEMP_DIR_HOST"
+        exit 1
+    fi
+    cp -r "$OPTIMIZED_MODEL_DIR"/mobilenetv4_opt_*/ "$TEMP_DIR_HOST/"
+fi
+
+# Record the sha256 of every staged model.onnx by model name, in the model repository and (once
+# the copy succeeded) locally. Logits stores are keyed by it: MODEL_VARIANT serves a different
+# model file under the same name, version and config.
+DEPLOYED_MODELS_FILE="$PROJECT_ROOT_ABS/models/deployed_models.json"
+python3 - "$TEMP_DIR_HOST" > "$TEMP_DIR_HOST/deployed_models.json" <<'PYEOF'
+import os, sys, glob, json, hashlib
+models = {}
+for path in sorted(glob.glob(os.path.join(sys.argv[1], '*', '1', 'model.onnx'))):
+    with open(path, 'rb') as f:
+        models[path.split(os.sep)[-3]] = hashlib.sha256(f.read()).hexdigest()
+json.dump(models, sys.stdout, indent=2)
+PYEOF
+echo "Model file identities: $(tr -d '\n ' < "$TEMP_DIR_HOST/deployed_models.json")"
+
 # Create namespace if it doesn't exist
 $KUBECTL get ns $NAMESPACE > /dev/null 2>&1 || $KUBECTL create namespace $NAMESPACE
 echo "Ensured namespace '$NAMESPACE' exists."
@@ -51,7 +112,8 @@ if [ ! -f "$TRITON_DEPLOYMENT_YAML_PATH" ]; then
     rm -rf "$TEMP_DIR_HOST"
     exit 1
 fi
-$KUBECTL apply -f "$TRITON_DEPLOYMENT_YAML_PATH"
+# TRITON_IMAGE (set by the Makefile) replaces the stock Triton image
+sed "s#image: nvcr.io/nvidia/tritonserver:24.04-py3#image: ${TRITON_IMAGE:-nvcr.io/nvidia/tritonserver:24.04-py3}#" "$TRITON_DEPLOYMENT_YAML_PATH" | $KUBECTL apply -f -
 
 # Wait for the PVC to be bound
 PVC_NAME="mobilenetv4-model-pvc"
@@ -94,7 +156,7 @@ spec:
     # Command to copy from the hostPath mount to the PVC mount
     # The source is /host_temp_model_files (mounted from TEMP_DIR_HOST)
     # The destination is /pvc_mount (mounted from PVC_NAME)
-    command: ["/bin/sh", "-c", "echo 'Copying model files from host to PVC...'; mkdir -p /pvc_mount/mobilenetv4/1 && cp /host_temp_model_files/mobilenetv4/1/model.onnx /pvc_mount/mobilenetv4/1/model.onnx && echo 'Copy complete. Verifying target on PVC...' && ls -lR /pvc_mount && echo 'Sleeping for a bit to allow volume to sync...' && sleep 5"]
+    command: ["/bin/sh", "-c", "echo 'Copying model files from host to PVC...'; mkdir -p /pvc_mount/mobilenetv4/1 && cp -r /host_temp_model_files/. /pvc_mount/ && echo 'Copy complete. Verifying target on PVC...' && ls -lR /pvc_mount && echo 'Sleeping for a bit to allow volume to sync...' && sleep 5"]
     volumeMounts:
     - name: model-storage-on-pvc # PVC mount
       mountPath: /pvc_mount
@@ -113,6 +175,8 @@ EOF
 echo "Waiting for model-copy-pod to complete..."
 if $KUBECTL wait --for=condition=Succeeded pod/model-copy-pod -n $NAMESPACE --timeout=180s; then
     echo "model-copy-pod completed successfully."
+    cp "$TEMP_DIR_HOST/deployed_models.json" "$DEPLOYED_MODELS_FILE"
+    echo "Recorded the deployed model identities in $DEPLOYED_MODELS_FILE"
     echo "Logs from model-copy-pod:"
     $KUBECTL logs model-copy-pod -n $NAMESPACE
 else
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Aggregate runs from a columnar results store (see results_store.py).
+
+Runs are selected by metadata (`--where model=mobilenetv4 --where config.lb_policy=p2c`,
+`--since 2026-01-01`) and grouped by any metadata fields (`--group-by input_mode,concurrency`).
+For each group the per-request columns of all its runs are pooled:
+
+- latency quantiles and mean over successful requests (`latency_ms`),
+- throughput: successful requests per second of run time, summed over the group's runs,
+- error rate (`ok`), top-1 accuracy (`correct`) and top-5 accuracy (`top5_correct`)
+  where the tool recorded them.
+
+`--list` prints the matching runs instead.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+from results_store import ResultsStore, get_field
+
+METRICS = ('runs', 'requests', 'error_rate', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'p999_ms',
+           'throughput', 'accuracy', 'top5_accuracy')
+PERCENTILES = {'p50_ms': 50, 'p95_ms': 95, 'p99_ms': 99, 'p999_ms': 99.9}
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Query a columnar results store')
+    parser.add_argument('--store', type=str, required=True,
+                        help='Results store directory')
+    parser.add_argument('--where', type=str, action='append', default=[],
+                        help='Metadata filter field=value (dotted paths allowed); repeatable')
+    parser.add_argument('--since', type=str, default=None,
+                        help='Only runs created on or after this date (YYYY-MM-DD)')
+    parser.add_argument('--group-by', type=str, default='tool,model',
+                        help='Comma-separated metadata fields to group runs by')
+    parser.add_argument('--metrics', type=str, default=','.join(METRICS),
+                        help=f"Comma-separated metrics: {', '.join(METRICS)}")
+    parser.add_argument('--list', action='store_true',
+                        help='List the matching runs instead of aggregating')
+    parser.add_argument('--output-file', type=str, default=None,
+                        help='Path to save the table as JSON')
+    return parser.parse_args()
+
+def run_duration(meta, columns):
+    """Run time in seconds: recorded duration, else the span of completion times."""
+    duration = get_field(meta, 'duration_s') or get_field(meta, 'summary.elapsed_time')
+    if duration:
+        return float(duration)
+    completions = columns.get('completion_s')
+    if completions is not None and len(completions) > 1:
+        finite = completions[np.isfinite(completions)]
+        if len(finite) > 1:
+            return float(finite.max() - finite.min())
+    return 0.0
+
+def aggregate(store, runs, metrics):
+    """Pool the per-request columns of `runs` into one row of metrics."""
+    latencies, ok_count, total, duration = [], 0, 0, 0.0
+    correct, top5 = [], []
+    for meta in runs:
+        columns = store.load_run(meta, ['latency_ms', 'ok', 'correct', 'top5_correct', 'completion_s'])
+        n = meta['rows']
+        ok = columns['ok'] == 1 if 'ok' in columns else np.ones(n, dtype=bool)
+        total += n
+        ok_count += int(ok.sum())
+        duration += run_duration(meta, columns)
+        if 'latency_ms' in columns:
+            latency = columns['latency_ms'][ok]
+            # Cached results (e.g. from a logits store) have no latency
+            latencies.append(latency[np.isfinite(latency)])
+        for name, sink in (('correct', correct), ('top5_correct', top5)):
+            if name in columns:
+                values = columns[name][ok]
+                sink.append(values[values >= 0])
+
+    latencies = np.concatenate(latencies) if latencies else np.array([])
+    correct = np.concatenate(correct) if correct else np.array([])
+    top5 = np.concatenate(top5) if top5 else np.array([])
+    row = {}
+    for metric in metrics:
+        if metric == 'runs':
+            row[metric] = len(runs)
+        elif metric == 'requests':
+            row[metric] = total
+        elif metric == 'error_rate':
+            row[metric] = (total - ok_count) / total if total else None
+        elif metric == 'mean_ms':
+            row[metric] = float(latencies.mean()) if len(latencies) else None
+        elif metric in PERCENTILES:
+            row[metric] = float(np.percentile(latencies, PERCENTILES[metric])) if len(latencies) else None
+        elif metric == 'throughput':
+            row[metric] = ok_count / duration if duration > 0 else None
+        elif metric == 'accuracy':
+            row[metric] = float(correct.mean()) if len(correct) else None
+        elif metric == 'top5_accuracy':
+            row[metric] = float(top5.mean()) if len(top5) else None
+    return row
+
+def format_value(value):
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return f"{value:.4f}" if abs(value) < 10 else f"{value:.1f}"
+    return str(value)
+
+def print_table(rows, columns):
+    widths = {c: max(len(c), *(len(format_value(r.get(c))) for r in rows)) for c in columns}
+    print('  '.join(f"{c:>{widths[c]}}" for c in columns))
+    for row in rows:
+        print('  '.join(f"{format_value(row.get(c)):>{widths[c]}}" for c in columns))
+
+def main():
+    """Main function."""
+    args = parse_args()
+    where = {}
+    for condition in args.where:
+        if '=' not in condition:
+            print(f"Error: --where needs field=value, got {condition!r}")
+            sys.exit(2)
+        field, value = condition.split('=', 1)
+        where[field.strip()] = value.strip()
+    since = time.mktime(time.strptime(args.since, '%Y-%m-%d')) if args.since else None
+    metrics = [m.strip() for m in args.metrics.split(',') if m.strip()]
+    unknown = [m for m in metrics if m not in METRICS]
+    if unknown:
+        print(f"Error: unknown metrics: {', '.join(unknown)}")
+        sys.exit(2)
+    group_by = [g.strip() for g in args.group_by.split(',') if g.strip()]
+
+    store = ResultsStore(args.store)
+    start = time.perf_counter()
+    runs = store.runs(where, since)
+    if not runs:
+        print(f"No runs in {args.store} match")
+        sys.exit(1)
+
+    if args.list:
+        rows = [{'run_id': m['run_id'], 'rows': m['rows'], **{g: get_field(m, g) for g in group_by}}
+                for m in runs]
+        print_table(rows, ['run_id', 'rows'] + group_by)
+    else:
+        groups = {}
+        for meta in runs:
+            key = tuple(str(get_field(meta, g)) for g in group_by)
+            groups.setdefault(key, []).append(meta)
+        rows = []
+        for key in sorted(groups):
+            rows.append(dict(zip(group_by, key), **aggregate(store, groups[key], metrics)))
+        print_table(rows, group_by + metrics)
+        print(f"\n{len(runs)} runs, {sum(m['rows'] for m in runs)} records "
+              f"in {time.perf_counter() - start:.2f}s")
+
+    if args.output_file:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output_file)), exist_ok=True)
+        with open(args.output_file, 'w') as f:
+            json.dump(rows, f, indent=2)
+        print(f"Table saved to {args.output_file}")
+
+if __name__ == "__main__":
+    main()
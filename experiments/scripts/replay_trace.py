@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Open-loop replay of a workload trace (see workload_trace.py) against Triton.
+
+A dispatcher thread releases each request at its trace offset divided by `--speed`
+(2.0 replays twice as fast, 0.5 at half speed): it sleeps until SPIN_S before the due
+time and busy-waits the rest, with a short GIL switch interval so sender threads cannot
+hold it off for long. Median dispatch lag stays in the microseconds and P99 at a few
+milliseconds at thousands of requests per second. A pool of `--workers` sender threads,
+each with its own keep-alive client, sends the requests. Arrivals never wait for
+responses, so two runs of the same trace see the same load whatever the server does.
+
+The report includes how far behind schedule requests were dispatched and actually sent;
+a growing send lag means the worker pool was saturated and should be enlarged.
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+import numpy as np
+
+from inference_client import (InferenceClient, EndpointPool, RequestStats, ENCODINGS, INPUT_MODES,
+                              LB_POLICIES, add_request_args, request_options, input_model_name)
+from load_generator import latency_summary
+from workload_trace import load_trace
+from results_store import add_results_store_args, save_run
+from metrics_exporter import add_metrics_args, serve_metrics
+
+# The dispatcher busy-waits for the last SPIN_S seconds before each due time
+SPIN_S = 0.002
+
+# GIL switch interval during a replay. The default 5 ms lets busy sender threads hold the
+# interpreter that long while the dispatcher is due; 0.2 ms cut the P99 dispatch lag ~5x.
+SWITCH_INTERVAL_S = 0.0002
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Replay a workload trace against Triton')
+    parser.add_argument('--trace', type=str, required=True,
+                        help='Workload trace (.npz) to replay')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='Time scaling: >1 compresses the schedule, <1 stretches it')
+    parser.add_argument('--url', type=str, default='http://localhost:8000',
+                        help='Triton server URL(s): comma-separated, or dns://<headless-service>:8000')
+    parser.add_argument('--lb-policy', type=str, default='least_outstanding', choices=LB_POLICIES,
+                        help='How requests are spread over multiple endpoints')
+    parser.add_argument('--model-name', type=str, default='mobilenetv4',
+                        help='Model name in Triton')
+    parser.add_argument('--workers', type=int, default=64,
+                        help='Sender threads (upper bound on requests in flight)')
+    parser.add_argument('--pool-size', type=int, default=32,
+                        help='Number of distinct pre-encoded inputs payload ids map onto')
+    parser.add_argument('--encoding', type=str, default='binary', choices=ENCODINGS,
+                        help='Request wire encoding')
+    parser.add_argument('--input-mode', type=str, default='fp32', choices=INPUT_MODES,
+                        help='Send float32/float16 tensors, or uint8 images / JPEG bytes to the preprocessing ensemble')
+    parser.add_argument('--body-cache', type=str, default=None,
+                        help='Replay request bodies from a cache built by body_cache.py instead')
+    parser.add_argument('--output-file', type=str, default='replay_results.json',
+                        help='Path to save results')
+    add_request_args(parser)
+    add_results_store_args(parser)
+    add_metrics_args(parser)
+    return parser.parse_args()
+
+def lag_summary(lag_ms):
+    """Percentiles of how far behind schedule a step happened, in milliseconds."""
+    if len(lag_ms) == 0:
+        return {}
+    p50, p99 = np.percentile(lag_ms, [50, 99])
+    return {'p50_ms': float(p50), 'p99_ms': float(p99), 'max_ms': float(np.max(lag_ms)),
+            'late_over_1ms': float(np.mean(lag_ms > 1.0))}
+
+def replay(url, model_name, bodies, trace, speed=1.0, workers=64, headers=None,
+           lb_policy='least_outstanding', client_options=None):
+    """
+    Send `bodies[payload_id % len(bodies)]` at each trace offset / `speed`.
+
+    Returns per-request arrays indexed like the trace: dispatch and send lag, latency,
+    success flag and completion time (seconds since the replay started).
+    """
+    count = len(trace)
+    header_list = headers if isinstance(headers, list) else [headers] * len(bodies)
+    due = trace.offset_s / speed
+    dispatch_lag = np.full(count, np.nan)
+    send_lag = np.full(count, np.nan)
+    latency = np.full(count, np.nan)
+    ok = np.zeros(count, dtype=np.int8)
+    completion = np.full(count, np.nan)
+    endpoints = EndpointPool(url, lb_policy)
+    request_stats = RequestStats()
+    pending = queue.SimpleQueue()
+
+    # Each worker writes only the rows of the requests it sent
+    def worker():
+        client = InferenceClient(url, model_name, endpoints=endpoints, stats=request_stats,
+                                 **(client_options or {}))
+        while True:
+            i = pending.get()
+            if i is None:
+                return
+            b = trace.payload_id[i] % len(bodies)
+            send_lag[i] = time.perf_counter() - start - due[i]
+            try:
+                result = client.send(bodies[b], header_list[b], parse_output=False)
+                ok[i] = result.error is None
+                latency[i] = result.latency_ms
+            except Exception:
+                pass
+            completion[i] = time.perf_counter() - start
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+    for t in threads:
+        t.start()
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(SWITCH_INTERVAL_S)
+    try:
+        start = time.perf_counter()
+        for i in range(count):
+            target = start + due[i]
+            remaining = target - time.perf_counter()
+            if remaining > SPIN_S:
+                time.sleep(remaining - SPIN_S)
+            while time.perf_counter() < target:
+                pass
+            dispatch_lag[i] = time.perf_counter() - target
+            pending.put(i)
+        for _ in threads:
+            pending.put(None)
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    return {'dispatch_lag_ms': dispatch_lag * 1000, 'send_lag_ms': send_lag * 1000,
+            'latency_ms': latency, 'ok': ok, 'completion_s': completion,
+            'elapsed_s': time.perf_counter() - start, 'endpoints': endpoints.stats(),
+            'request_stats': request_stats.summary()}
+
+def main():
+    """Main function."""
+    args = parse_args()
+    if args.speed <= 0:
+        print("Error: --speed must be positive")
+        sys.exit(2)
+    trace = load_trace(args.trace)
+    if len(trace) == 0:
+        print(f"Error: {args.trace} holds no requests")
+        sys.exit(2)
+    if args.body_cache:
+        from body_cache import BodyCache
+        cache = BodyCache(args.body_cache)
+        bodies, headers = cache.bodies, cache.headers
+        input_mode = cache.input_mode
+    else:
+        from synthetic_pool import SyntheticInputPool
+        pool = SyntheticInputPool(args.pool_size, distribution='imagenet', encoding=args.encoding,
+                                  input_mode=args.input_mode)
+        bodies, headers = pool.bodies, pool.headers
+        input_mode = args.input_mode
+    model_name = input_model_name(args.model_name, input_mode)
+    metrics = serve_metrics(args.metrics_port, model_name)
+
+    print(f"Replaying {len(trace)} requests over {trace.duration_s / args.speed:.1f}s "
+          f"({len(trace) / max(trace.duration_s, 1e-9) * args.speed:.1f} req/s, speed x{args.speed:g})")
+    run = replay(args.url, model_name, bodies, trace, args.speed, args.workers, headers,
+                 args.lb_policy, dict(request_options(args), metrics=metrics))
+
+    succeeded = run['ok'] == 1
+    latencies = run['latency_ms'][succeeded]
+    results = {
+        'trace': args.trace,
+        'trace_meta': trace.meta,
+        'speed': args.speed,
+        'input_mode': input_mode,
+        'scheduled_duration_s': trace.duration_s / args.speed,
+        'elapsed_time': run['elapsed_s'],
+        'successful_count': int(succeeded.sum()),
+        'error_count': int(len(trace) - succeeded.sum()),
+        'offered_requests_per_second': len(trace) / run['elapsed_s'],
+        'requests_per_second': int(succeeded.sum()) / run['elapsed_s'],
+        **latency_summary(latencies),
+        'dispatch_lag': lag_summary(run['dispatch_lag_ms']),
+        'send_lag': lag_summary(run['send_lag_ms']),
+        'endpoints': run['endpoints'],
+        'request_stats': run['request_stats'],
+        # Per-request samples for compare_runs.py
+        'latency_samples_ms': latencies.tolist(),
+        'completion_times_s': run['completion_s'][succeeded].tolist(),
+    }
+    save_run(args, 'replay_trace', {
+        'payload_id': trace.payload_id, 'client_id': trace.client_id,
+        'scheduled_s': trace.offset_s / args.speed, 'send_lag_ms': run['send_lag_ms'],
+        'latency_ms': run['latency_ms'], 'ok': run['ok'], 'completion_s': run['completion_s'],
+    }, results, model=model_name, input_mode=input_mode, load_pattern='trace_replay',
+        trace=os.path.basename(args.trace), speed=args.speed)
+
+    dispatch, send = results['dispatch_lag'], results['send_lag']
+    print(f"Dispatch lag P50 {dispatch['p50_ms']:.3f} / P99 {dispatch['p99_ms']:.3f} ms; "
+          f"send lag P99 {send['p99_ms']:.3f} ms ({send['late_over_1ms']:.1%} over 1 ms)")
+    if send['p99_ms'] > 10 * max(dispatch['p99_ms'], 0.1):
+        print(f"Warning: requests waited for a free worker; consider more than --workers {args.workers}")
+    print(f"Throughput: {results['requests_per_second']:.1f} req/s, "
+          f"P50 {results['p50_latency_ms']:.1f} / P95 {results['p95_latency_ms']:.1f} / "
+          f"P99 {results['p99_latency_ms']:.1f} ms, {results['error_count']} errors")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output_file)), exist_ok=True)
+    with open(args.output_file, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {args.output_file}")
+
+if __name__ == "__main__":
+    main()
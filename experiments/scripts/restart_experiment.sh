@@ -17,7 +17,8 @@ sleep 5
 
 # Apply the updated Triton deployment
 echo "Applying updated Triton deployment..."
-$KUBECTL apply -f "$(dirname "$0")/mobilenetv4-triton-deployment.yaml"
+# TRITON_IMAGE (set by the Makefile) replaces the stock Triton image
+sed "s#image: nvcr.io/nvidia/tritonserver:24.04-py3#image: ${TRITON_IMAGE:-nvcr.io/nvidia/tritonserver:24.04-py3}#" "$(dirname "$0")/mobilenetv4-triton-deployment.yaml" | $KUBECTL apply -f -
 
 # Wait for Triton to be ready
 echo "Waiting for Triton server to be ready..."
@@ -25,11 +26,12 @@ $KUBECTL wait --for=condition=available deployment/mobilenetv4-triton-deployment
 
 # Create Locust configmap
 echo "Creating Locust configmap..."
-$KUBECTL create configmap locustfile-config --from-file=locustfile.py="$(dirname "$0")/locustfile.py" -n workloads
+$KUBECTL create configmap locustfile-config --from-file=locustfile.py="$(dirname "$0")/locustfile.py" --from-file=body_cache.py="$(dirname "$0")/body_cache.py" --from-file=inference_client.py="$(dirname "$0")/inference_client.py" --from-file=stage_timer.py="$(dirname "$0")/stage_timer.py" --from-file=metrics_exporter.py="$(dirname "$0")/metrics_exporter.py" --from-file=workload_trace.py="$(dirname "$0")/workload_trace.py" --from-file=scenario.py="$(dirname "$0")/scenario.py" -n workloads
 
 # Apply Locust deployment
 echo "Deploying Locust..."
-$KUBECTL apply -f "$(dirname "$0")/locust-deployment.yaml"
+# The pods mount the body cache from BODY_CACHE_DIR on the node (the Makefile passes it)
+sed "s#/tmp/ecrl-body-cache#${BODY_CACHE_DIR:-/tmp/ecrl-body-cache}#" "$(dirname "$0")/locust-deployment.yaml" | $KUBECTL apply -f -
 
 # Wait for Locust to be ready
 echo "Waiting for Locust to be ready..."
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Columnar store of per-request experiment results.
+
+Every run becomes a directory under `<root>/runs/` holding its per-request records as
+columns in chunked `.npz` files (CHUNK_ROWS rows each) and a `meta.json` with the run
+metadata: tool, model, input mode, load pattern, concurrency, the full command line
+configuration and the run's summary numbers. Nothing is truncated, and because each
+column is a plain NumPy array, query_results.py can aggregate months of runs in seconds
+without parsing result JSON files.
+
+Metadata fields are addressed with dotted paths, e.g. `model`, `config.lb_policy` or
+`summary.images_per_second`.
+"""
+
+import os
+import json
+import time
+import uuid
+import numpy as np
+
+RUNS_DIR = 'runs'
+META_FILE = 'meta.json'
+
+# Rows per .npz chunk
+CHUNK_ROWS = 100_000
+
+def add_results_store_args(parser):
+    """Add the --results-store/--run-label options shared by the evaluators and load tools."""
+    parser.add_argument('--results-store', type=str, default=None,
+                        help='Also append every per-request record of this run to a columnar results store')
+    parser.add_argument('--run-label', type=str, default=None,
+                        help='Free-form label stored with the run (e.g. baseline, agent-v2)')
+
+def get_field(meta, path):
+    """Value of a dotted metadata path, or None."""
+    value = meta
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+def _column(values):
+    """Convert one list of record values into a NumPy array without object dtype."""
+    present = [v for v in values if v is not None]
+    if present and all(isinstance(v, (bool, np.bool_)) for v in present):
+        # -1 marks a missing value
+        return np.array([-1 if v is None else int(v) for v in values], dtype=np.int8)
+    if present and all(isinstance(v, (int, np.integer)) for v in present) and len(present) == len(values):
+        return np.array(values, dtype=np.int64)
+    if present and all(isinstance(v, (int, float, np.integer, np.floating)) for v in present):
+        return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+    return np.array(['' if v is None else v if isinstance(v, str) else json.dumps(v)
+                     for v in values], dtype=np.str_)
+
+def records_to_columns(records):
+    """Turn a list of per-request dicts into {name: array}; missing keys become missing values."""
+    names = []
+    for record in records:
+        for name in record:
+            if name not in names:
+                names.append(name)
+    return {name: _column([record.get(name) for record in records]) for name in names}
+
+class ResultsStore:
+    """A directory of runs, each a set of column chunks plus metadata."""
+
+    def __init__(self, root):
+        self.root = root
+        self.runs_dir = os.path.join(root, RUNS_DIR)
+
+    def write_run(self, metadata, columns):
+        """Write one run's columns (equal-length arrays) and metadata; returns the run id."""
+        lengths = {len(v) for v in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+        rows = lengths.pop() if lengths else 0
+        tool = metadata.get('tool', 'run')
+        run_id = f"{time.strftime('%Y%m%d_%H%M%S')}_{tool}_{uuid.uuid4().hex[:6]}"
+        run_dir = os.path.join(self.runs_dir, run_id)
+        os.makedirs(run_dir)
+
+        chunks = []
+        for start in range(0, rows, CHUNK_ROWS):
+            name = f"part-{len(chunks):05d}.npz"
+            np.savez(os.path.join(run_dir, name),
+                     **{k: np.asarray(v)[start:start + CHUNK_ROWS] for k, v in columns.items()})
+            chunks.append(name)
+
+        meta = dict(metadata, run_id=run_id, created=time.time(), rows=rows,
+                    columns={k: str(np.asarray(v).dtype) for k, v in columns.items()}, chunks=chunks)
+        # Metadata last, so a partially written run is never listed
+        with open(os.path.join(run_dir, META_FILE), 'w') as f:
+            json.dump(meta, f, default=str)
+        return run_id
+
+    def runs(self, where=None, since=None):
+        """Metadata of the runs whose fields equal every `where` value (compared as strings)."""
+        if not os.path.isdir(self.runs_dir):
+            return []
+        selected = []
+        for run_id in sorted(os.listdir(self.runs_dir)):
+            meta_path = os.path.join(self.runs_dir, run_id, META_FILE)
+            if not os.path.exists(meta_path):
+                continue
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            if since is not None and meta.get('created', 0) < since:
+                continue
+            if where and any(str(get_field(meta, k)) != v for k, v in where.items()):
+                continue
+            selected.append(meta)
+        return selected
+
+    def load_run(self, meta, columns=None):
+        """Columns of one run as {name: array}; absent columns are skipped."""
+        run_dir = os.path.join(self.runs_dir, meta['run_id'])
+        names = [c for c in (columns or meta['columns']) if c in meta['columns']]
+        parts = {name: [] for name in names}
+        for chunk in meta['chunks']:
+            with np.load(os.path.join(run_dir, chunk)) as data:
+                for name in names:
+                    parts[name].append(data[name])
+        return {name: np.concatenate(arrays) if arrays else np.array([]) for name, arrays in parts.items()}
+
+def save_run(args, tool, records, summary, **metadata):
+    """
+    Store a tool's per-request records if `--results-store` was given; returns the run id.
+
+    `metadata` holds the fields runs are grouped by (model, input_mode, load_pattern,
+    concurrency, ...); the parsed arguments are kept as `config`.
+    """
+    if not getattr(args, 'results_store', None):
+        return None
+    config = {k: v for k, v in vars(args).items() if isinstance(v, (str, int, float, bool, type(None)))}
+    meta = dict(metadata, tool=tool, label=args.run_label, config=config,
+                summary={k: v for k, v in summary.items() if isinstance(v, (int, float, str, bool))})
+    columns = records if isinstance(records, dict) else records_to_columns(records)
+    run_id = ResultsStore(args.results_store).write_run(meta, columns)
+    rows = len(next(iter(columns.values()))) if columns else 0
+    print(f"Stored {rows} records as run {run_id} in {args.results_store}")
+    return run_id
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Run a load scenario (see scenario.py) headless and record a time-aligned result series.
+
+With `--driver generator` (default), one thread per user sends pre-encoded requests with
+the scenario's think time, and the number of active users follows the scenario. With
+`--driver locust`, Locust runs headless on this machine with ScenarioShape from
+locustfile.py (needs `--body-cache`, the locust package and a single endpoint), and the
+per-request samples it logs are read back.
+
+Either way, `<output-dir>/scenario_results.json` holds the scenario, a per-window series
+of users, throughput, errors and latency quantiles labelled by phase, and a summary per
+phase, so baseline runs need no one at the Locust UI.
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import random
+import argparse
+import subprocess
+import threading
+import numpy as np
+
+from inference_client import (InferenceClient, EndpointPool, RequestStats, ENCODINGS, INPUT_MODES,
+                              LB_POLICIES, add_request_args, request_options, input_model_name,
+                              resolve_endpoints)
+from load_generator import latency_summary
+from scenario import load_scenario
+from results_store import add_results_store_args, save_run
+from metrics_exporter import add_metrics_args, serve_metrics
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DRIVERS = ('generator', 'locust')
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Run a declarative load scenario headless')
+    parser.add_argument('--scenario', type=str, required=True,
+                        help='Scenario file (JSON)')
+    parser.add_argument('--driver', type=str, default='generator', choices=DRIVERS,
+                        help='Drive the load with the project load generator or with Locust')
+    parser.add_argument('--url', type=str, default='http://localhost:8000',
+                        help='Triton server URL(s): comma-separated, or dns://<headless-service>:8000')
+    parser.add_argument('--lb-policy', type=str, default='least_outstanding', choices=LB_POLICIES,
+                        help='How requests are spread over multiple endpoints')
+    parser.add_argument('--model-name', type=str, default='mobilenetv4',
+                        help='Model name in Triton')
+    parser.add_argument('--window', type=float, default=5.0,
+                        help='Width in seconds of the windows of the result series')
+    parser.add_argument('--pool-size', type=int, default=32,
+                        help='Number of distinct pre-encoded inputs cycled')
+    parser.add_argument('--encoding', type=str, default='binary', choices=ENCODINGS,
+                        help='Request wire encoding')
+    parser.add_argument('--input-mode', type=str, default='fp32', choices=INPUT_MODES,
+                        help='Send float32/float16 tensors, or uint8 images / JPEG bytes to the preprocessing ensemble')
+    parser.add_argument('--body-cache', type=str, default=None,
+                        help='Replay request bodies from a cache built by body_cache.py instead')
+    parser.add_argument('--output-dir', type=str, default='.',
+                        help='Run results directory')
+    add_request_args(parser)
+    add_results_store_args(parser)
+    add_metrics_args(parser)
+    return parser.parse_args()
+
+def run_users(url, model_name, bodies, scenario, headers=None, lb_policy='least_outstanding',
+              client_options=None, seed=0):
+    """
+    Drive `scenario` with one thread per user; user k is active while k < the target users.
+
+    Returns per-request arrays (completion time, latency, success) and the target user
+    count sampled every 100 ms.
+    """
+    header_list = headers if isinstance(headers, list) else [headers] * len(bodies)
+    endpoints = EndpointPool(url, lb_policy)
+    request_stats = RequestStats()
+    target = [0]
+    stop = threading.Event()
+    max_users = scenario.max_users
+    per_user = [None] * max_users
+    think_min, think_max = scenario.think_time_s
+
+    def user(k):
+        client = InferenceClient(url, model_name, endpoints=endpoints, stats=request_stats,
+                                 **(client_options or {}))
+        rng = random.Random(seed + k)
+        rows = []
+        i = k
+        while not stop.is_set():
+            if k >= target[0]:
+                stop.wait(0.05)
+                continue
+            b = i % len(bodies)
+            i += max_users
+            try:
+                result = client.send(bodies[b], header_list[b], parse_output=False)
+                ok, latency = result.error is None, result.latency_ms
+            except Exception:
+                ok, latency = False, float('nan')
+            rows.append((time.perf_counter() - start, latency, ok))
+            if think_max > 0:
+                stop.wait(rng.uniform(think_min, think_max))
+        per_user[k] = rows
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(k,), daemon=True) for k in range(max_users)]
+    for t in threads:
+        t.start()
+    users = []
+    while True:
+        t = time.perf_counter() - start
+        count = scenario.users_at(t)
+        if count is None:
+            break
+        target[0] = count
+        users.append((t, count))
+        time.sleep(0.1)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    rows = [row for user_rows in per_user for row in (user_rows or [])]
+    rows.sort()
+    completion = np.array([r[0] for r in rows], dtype=float)
+    return {
+        'completion_s': completion,
+        'latency_ms': np.array([r[1] for r in rows], dtype=float),
+        'ok': np.array([r[2] for r in rows], dtype=np.int8),
+        'users': np.array(users, dtype=float).reshape(-1, 2),
+        'endpoints': endpoints.stats(),
+        'request_stats': request_stats.summary(),
+    }
+
+def window_series(run, scenario, window):
+    """Per-window users, throughput, errors and latency quantiles of a run."""
+    series = []
+    completion, latency, ok, users = run['completion_s'], run['latency_ms'], run['ok'] == 1, run['users']
+    for w in range(int(np.ceil(scenario.duration_s / window))):
+        lo, hi = w * window, min((w + 1) * window, scenario.duration_s)
+        phase = scenario.phase_at(lo)
+        in_window = (completion >= lo) & (completion < hi)
+        done = latency[in_window & ok]
+        sampled = users[(users[:, 0] >= lo) & (users[:, 0] < hi), 1] if len(users) else []
+        row = {
+            't_s': lo,
+            'phase': phase['name'] if phase else None,
+            'users': float(np.mean(sampled)) if len(sampled) else scenario.users_at(lo),
+            'requests_per_second': len(done) / (hi - lo),
+            'errors_per_second': int((in_window & ~ok).sum()) / (hi - lo),
+        }
+        for q in (50, 95, 99):
+            row[f"p{q}_latency_ms"] = float(np.percentile(done, q)) if len(done) else None
+        series.append(row)
+    return series
+
+def phase_summaries(run, scenario):
+    """Throughput, error rate and latency of each phase of a run."""
+    summaries = []
+    completion, latency, ok = run['completion_s'], run['latency_ms'], run['ok'] == 1
+    for phase in scenario.phases:
+        lo, hi = phase['start_s'], phase['start_s'] + phase['duration_s']
+        in_phase = (completion >= lo) & (completion < hi)
+        total = int(in_phase.sum())
+        summaries.append({
+            'phase': phase['name'],
+            'users_from': phase['users_from'],
+            'users_to': phase['users_to'],
+            'requests': total,
+            'requests_per_second': int((in_phase & ok).sum()) / phase['duration_s'],
+            'error_rate': float((in_phase & ~ok).sum() / total) if total else 0.0,
+            **latency_summary(latency[in_phase & ok]),
+        })
+    return summaries
+
+def run_locust(args, scenario, model_name):
+    """
+    Run Locust headless with ScenarioShape; returns per-request arrays like run_users.
+
+    locustfile.py logs every inference request; the user counts come from Locust's stats
+    history. Locust sends to a single host, so `--url` must resolve to one endpoint.
+    """
+    endpoints = resolve_endpoints(args.url)
+    if len(endpoints) > 1:
+        print(f"Error: --driver locust sends to a single host, but {args.url} resolves to "
+              f"{len(endpoints)} endpoints; use --driver generator to spread load over them")
+        sys.exit(2)
+    prefix = os.path.join(os.path.abspath(args.output_dir), 'locust')
+    request_log = f"{prefix}_requests.npz"
+    if os.path.exists(request_log):
+        os.remove(request_log)
+    env = dict(os.environ, BODY_CACHE_DIR=os.path.abspath(args.body_cache),
+               SCENARIO_FILE=os.path.abspath(args.scenario), MODEL_NAME=model_name,
+               REQUEST_LOG_FILE=request_log)
+    command = ['locust', '-f', os.path.join(SCRIPT_DIR, 'locustfile.py'), '--headless',
+               '--host', endpoints[0], '--csv', prefix, '--csv-full-history',
+               '--only-summary', 'TritonInferUser']
+    print(' '.join(command))
+    completed = subprocess.run(command, cwd=SCRIPT_DIR, env=env)
+    # Locust exits with 1 when any request failed; the logs are still complete
+    if not os.path.exists(request_log) or not os.path.exists(f"{prefix}_stats_history.csv"):
+        print(f"Error: Locust exited with {completed.returncode} and wrote no request log or stats history")
+        sys.exit(1)
+
+    with np.load(request_log) as log:
+        run = {name: log[name] for name in ('completion_s', 'latency_ms', 'ok')}
+        started_at = float(log['started_at'])
+    users = []
+    with open(f"{prefix}_stats_history.csv", newline='') as f:
+        for row in csv.DictReader(f):
+            if row.get('Name') == 'Aggregated':
+                users.append((float(row['Timestamp']) - started_at, float(row['User Count'])))
+    run['users'] = np.array(users, dtype=float).reshape(-1, 2)
+    return run
+
+def main():
+    """Main function."""
+    args = parse_args()
+    scenario = load_scenario(args.scenario)
+    os.makedirs(args.output_dir, exist_ok=True)
+    print(f"Scenario {scenario.name}: {len(scenario.phases)} phases, {scenario.duration_s:.0f}s, "
+          f"up to {scenario.max_users} users ({args.driver})")
+
+    results = {'scenario': scenario.describe(), 'driver': args.driver}
+    if args.driver == 'locust' and not args.body_cache:
+        print("Error: --driver locust replays requests from a body cache; pass --body-cache")
+        sys.exit(2)
+    if args.body_cache:
+        from body_cache import BodyCache
+        cache = BodyCache(args.body_cache)
+        bodies, headers = cache.bodies, cache.headers
+        input_mode = cache.input_mode
+    else:
+        from synthetic_pool import SyntheticInputPool
+        pool = SyntheticInputPool(args.pool_size, distribution='imagenet', encoding=args.encoding,
+                                  input_mode=args.input_mode)
+        bodies, headers = pool.bodies, pool.headers
+        input_mode = args.input_mode
+    model_name = input_model_name(args.model_name, input_mode)
+    if args.driver == 'locust':
+        run = run_locust(args, scenario, model_name)
+    else:
+        metrics = serve_metrics(args.metrics_port, model_name)
+        run = run_users(args.url, model_name, bodies, scenario, headers, args.lb_policy,
+                        dict(request_options(args), metrics=metrics))
+    succeeded = run['ok'] == 1
+    results.update({
+        'input_mode': input_mode,
+        'duration_s': scenario.duration_s,
+        'successful_count': int(succeeded.sum()),
+        'error_count': int((~succeeded).sum()),
+        'requests_per_second': int(succeeded.sum()) / scenario.duration_s,
+        **latency_summary(run['latency_ms'][succeeded]),
+        'phases': phase_summaries(run, scenario),
+        'series': window_series(run, scenario, args.window),
+        # Client-side endpoint and request counters exist only for the generator
+        'endpoints': run.get('endpoints'),
+        'request_stats': run.get('request_stats'),
+        # Per-request samples for compare_runs.py
+        'latency_samples_ms': run['latency_ms'][succeeded].tolist(),
+        'completion_times_s': run['completion_s'][succeeded].tolist(),
+    })
+    save_run(args, 'run_scenario', {
+        'latency_ms': run['latency_ms'], 'ok': run['ok'], 'completion_s': run['completion_s'],
+    }, results, model=model_name, input_mode=input_mode, load_pattern=scenario.name,
+        concurrency=scenario.max_users, driver=args.driver)
+
+    for phase in results['phases']:
+        print(f"{phase['phase']:<12} {phase['requests_per_second']:>8.1f} req/s  "
+              f"P50 {phase['p50_latency_ms']:>7.1f}  P95 {phase['p95_latency_ms']:>7.1f}  "
+              f"P99 {phase['p99_latency_ms']:>7.1f} ms  errors {phase['error_rate']:.2%}")
+
+    output_file = os.path.join(args.output_dir, 'scenario_results.json')
+    with open(output_file, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {output_file}")
+
+if __name__ == "__main__":
+    main()
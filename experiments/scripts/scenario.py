@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Declarative load scenarios: a sequence of phases, each holding or ramping a number of users.
+
+A scenario is a JSON file (see experiments/scenarios/):
+
+    {
+      "name": "step_10_20_50",
+      "think_time_s": [1, 2],
+      "phases": [
+        {"name": "10_users", "duration_s": 120, "users": 10},
+        {"name": "ramp", "duration_s": 300, "users_from": 1, "users_to": 50}
+      ]
+    }
+
+Each user sends one request, waits a uniformly drawn think time and repeats, like the
+Locust users (`between(1, 2)`); `[0, 0]` makes every user closed-loop. A phase either
+holds `users` or ramps linearly from `users_from` to `users_to`. run_scenario.py drives a
+scenario with the project's load generator, or with Locust through ScenarioShape in
+locustfile.py.
+"""
+
+import os
+import json
+
+class Scenario:
+    """Phases of a load scenario with the user count at any time."""
+
+    def __init__(self, spec, name=None):
+        self.name = spec.get('name', name or 'scenario')
+        self.description = spec.get('description', '')
+        self.think_time_s = tuple(spec.get('think_time_s', (1.0, 2.0)))
+        if len(self.think_time_s) != 2 or not 0 <= self.think_time_s[0] <= self.think_time_s[1]:
+            raise ValueError(f"think_time_s must be [min, max], got {list(self.think_time_s)}")
+        self.phases = []
+        start = 0.0
+        for i, phase in enumerate(spec.get('phases', [])):
+            duration = float(phase['duration_s'])
+            if duration <= 0:
+                raise ValueError(f"Phase {i} has a non-positive duration")
+            if 'users' in phase:
+                users_from = users_to = int(phase['users'])
+            elif 'users_from' in phase and 'users_to' in phase:
+                users_from, users_to = int(phase['users_from']), int(phase['users_to'])
+            else:
+                raise ValueError(f"Phase {i} needs users, or users_from and users_to")
+            if min(users_from, users_to) < 0:
+                raise ValueError(f"Phase {i} has a negative user count")
+            self.phases.append({
+                'name': phase.get('name', f"phase_{i}"),
+                'start_s': start,
+                'duration_s': duration,
+                'users_from': users_from,
+                'users_to': users_to,
+            })
+            start += duration
+        if not self.phases:
+            raise ValueError("A scenario needs at least one phase")
+
+    @property
+    def duration_s(self):
+        last = self.phases[-1]
+        return last['start_s'] + last['duration_s']
+
+    @property
+    def max_users(self):
+        return max(max(p['users_from'], p['users_to']) for p in self.phases)
+
+    def phase_at(self, t):
+        """The phase running at `t` seconds, or None once the scenario is over."""
+        for phase in self.phases:
+            if t < phase['start_s'] + phase['duration_s']:
+                return phase if t >= phase['start_s'] else None
+        return None
+
+    def users_at(self, t):
+        """Target number of users at `t` seconds, or None once the scenario is over."""
+        phase = self.phase_at(t)
+        if phase is None:
+            return None
+        frac = (t - phase['start_s']) / phase['duration_s']
+        return int(round(phase['users_from'] + (phase['users_to'] - phase['users_from']) * frac))
+
+    def describe(self):
+        return {'name': self.name, 'description': self.description,
+                'think_time_s': list(self.think_time_s), 'duration_s': self.duration_s,
+                'max_users': self.max_users, 'phases': self.phases}
+
+def load_scenario(path):
+    """Read and validate a scenario file."""
+    with open(path, 'r') as f:
+        spec = json.load(f)
+    return Scenario(spec, name=os.path.splitext(os.path.basename(path))[0])
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Recompute evaluation metrics offline from a persisted logits store.
+
+Every scorer works on the whole `[N, 1000]` logits array at once, so top-1, mapped top-1,
+top-5 and the prediction distribution of a 10k-image run are recomputed in seconds
+without touching the inference server.
+"""
+
+import os
+import sys
+import json
+import argparse
+import numpy as np
+
+from logits_store import LogitsStore, find_stores
+
+SCORERS = ('top1', 'top5', 'mapped_top1', 'mapped_top5', 'distribution')
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Score persisted logits without re-running inference')
+    parser.add_argument('--store', type=str, required=True,
+                        help='Logits store directory, or a root holding several (the newest is used)')
+    parser.add_argument('--scorers', type=str, default=','.join(SCORERS),
+                        help=f"Comma-separated scorers: {', '.join(SCORERS)}")
+    parser.add_argument('--dataset-path', type=str,
+                        default='/home/guilin/allProjects/ecrl/data/tiny-imagenet/tiny-imagenet-200',
+                        help='Path to Tiny ImageNet dataset (for the wnids.txt class order)')
+    parser.add_argument('--mapping-file', type=str,
+                        default='/home/guilin/allProjects/ecrl/data/tiny-imagenet/class_mapping.json',
+                        help='Path to class mapping file (for mapped scorers)')
+    parser.add_argument('--num-samples', type=int, default=None,
+                        help='Score only the first N images of the manifest')
+    parser.add_argument('--output-file', type=str, default=None,
+                        help='Path to save the scores as JSON')
+    return parser.parse_args()
+
+def resolve_store(path):
+    """Accept either a store directory or a root of stores."""
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        return path
+    stores = find_stores(path)
+    if not stores:
+        return None
+    if len(stores) > 1:
+        print(f"Found {len(stores)} logits stores under {path}, using the newest: {stores[0]}")
+    return stores[0]
+
+def class_indices(labels, dataset_path):
+    """Numeric Tiny ImageNet class index per label, in wnids.txt order when available."""
+    wnids_file = os.path.join(dataset_path, 'wnids.txt')
+    if os.path.exists(wnids_file):
+        with open(wnids_file, 'r') as f:
+            wnids = [line.strip() for line in f.readlines()]
+    else:
+        wnids = sorted(set(labels))
+    class_to_idx = {wnid: i for i, wnid in enumerate(wnids)}
+    return np.array([class_to_idx.get(label, -1) for label in labels])
+
+def load_mapping(mapping_file, num_tiny_classes):
+    """Lookup array from Tiny ImageNet class index to ImageNet class index (-1 if unmapped)."""
+    with open(mapping_file, 'r') as f:
+        mapping = json.load(f).get('tiny_imagenet_to_imagenet', {})
+    lookup = np.full(num_tiny_classes, -1, dtype=np.int64)
+    for tiny_idx, imagenet_idx in mapping.items():
+        if int(tiny_idx) < num_tiny_classes:
+            lookup[int(tiny_idx)] = int(imagenet_idx)
+    return lookup
+
+def topk(logits, k):
+    """Indices of the k largest logits per row, best first."""
+    part = np.argpartition(logits, -k, axis=1)[:, -k:]
+    order = np.argsort(np.take_along_axis(logits, part, axis=1), axis=1)[:, ::-1]
+    return np.take_along_axis(part, order, axis=1)
+
+def accuracy(hits, labels):
+    """Overall and per-class accuracy of a boolean hit vector."""
+    per_class = {}
+    labels = np.asarray(labels)
+    for label in np.unique(labels):
+        mask = labels == label
+        per_class[str(label)] = float(hits[mask].mean())
+    return {
+        'accuracy': float(hits.mean()) if len(hits) else 0.0,
+        'correct_count': int(hits.sum()),
+        'total_count': int(len(hits)),
+        'per_class_accuracy': per_class,
+    }
+
+def score_distribution(logits, top_n=10):
+    """Top-1 class histogram and softmax confidence/entropy of the predictions."""
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    probs = np.exp(shifted)
+    probs /= probs.sum(axis=1, keepdims=True)
+    entropy = -(probs * np.log(np.clip(probs, 1e-12, None))).sum(axis=1)
+    counts = np.bincount(logits.argmax(axis=1), minlength=logits.shape[1])
+    top = np.argsort(counts)[::-1][:top_n]
+    return {
+        'distinct_top1_classes': int(np.count_nonzero(counts)),
+        'top_classes': [[int(c), int(counts[c])] for c in top if counts[c] > 0],
+        'mean_max_probability': float(probs.max(axis=1).mean()),
+        'mean_entropy': float(entropy.mean()),
+        'max_entropy': float(np.log(logits.shape[1])),
+    }
+
+def score(store, scorers, dataset_path, mapping_file, num_samples=None):
+    """Run the requested scorers over the filled rows of a store."""
+    rows = np.flatnonzero(np.asarray(store.filled))
+    if num_samples is not None:
+        rows = rows[rows < num_samples]
+    logits = np.asarray(store.logits[rows])
+    labels = [store.labels[i] for i in rows]
+    scores = {'logits_store': store.describe(), 'scored_count': int(len(rows))}
+    if len(rows) == 0:
+        return scores
+
+    true_idx = class_indices(labels, dataset_path)
+    need_top5 = any(s in scorers for s in ('top5', 'mapped_top5'))
+    top5 = topk(logits, 5) if need_top5 else None
+    top1 = logits.argmax(axis=1)
+
+    if 'top1' in scorers:
+        scores['top1'] = accuracy(top1 == true_idx, labels)
+    if 'top5' in scorers:
+        scores['top5'] = accuracy((top5 == true_idx[:, None]).any(axis=1), labels)
+    if 'mapped_top1' in scorers or 'mapped_top5' in scorers:
+        lookup = load_mapping(mapping_file, int(true_idx.max()) + 1)
+        true_imagenet = np.where(true_idx >= 0, lookup[true_idx], -1)
+        if 'mapped_top1' in scorers:
+            scores['mapped_top1'] = accuracy(top1 == true_imagenet, labels)
+        if 'mapped_top5' in scorers:
+            scores['mapped_top5'] = accuracy((top5 == true_imagenet[:, None]).any(axis=1), labels)
+    if 'distribution' in scorers:
+        scores['distribution'] = score_distribution(logits)
+    return scores
+
+def main():
+    """Main function."""
+    args = parse_args()
+    scorers = [s.strip() for s in args.scorers.split(',') if s.strip()]
+    unknown = [s for s in scorers if s not in SCORERS]
+    if unknown:
+        print(f"Error: unknown scorers: {', '.join(unknown)}")
+        sys.exit(1)
+
+    store_dir = resolve_store(args.store)
+    if store_dir is None:
+        print(f"Error: no logits store found in {args.store}")
+        sys.exit(1)
+    store = LogitsStore(store_dir, mode='r')
+    scores = score(store, scorers, args.dataset_path, args.mapping_file, args.num_samples)
+
+    print(f"Scored {scores['scored_count']}/{len(store)} images from {store_dir} "
+          f"(model {store.meta['model_version']})")
+    for name in scorers:
+        if name == 'distribution' and 'distribution' in scores:
+            dist = scores['distribution']
+            print(f"distribution: {dist['distinct_top1_classes']} distinct top-1 classes, "
+                  f"mean max prob {dist['mean_max_probability']:.4f}, "
+                  f"mean entropy {dist['mean_entropy']:.3f}/{dist['max_entropy']:.3f}")
+        elif name in scores:
+            s = scores[name]
+            print(f"{name}: {s['accuracy']:.4f} ({s['correct_count']}/{s['total_count']})")
+
+    if args.output_file:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output_file)), exist_ok=True)
+        with open(args.output_file, 'w') as f:
+            json.dump(scores, f, indent=2)
+        print(f"Scores saved to {args.output_file}")
+
+if __name__ == "__main__":
+    main()
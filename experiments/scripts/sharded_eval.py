@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Multi-process sharded evaluation for the dataset evaluators.
+
+With `--workers N`, an evaluator re-runs itself as N subprocesses with `--shard-index i
+--num-shards N`. Images are assigned to shards by a CRC32 of their file name, so the split
+depends only on the evaluated image set and N. Each shard process has its own connection
+pool, preprocessing and logits store handle, and writes complete results (every
+per-request record, raw stage histograms, request counters and latency samples) to
+`<output-file>.shards/shard-<i>-of-<N>.json`, with its output in `shard-<i>.log`.
+
+The coordinator merges the shards exactly: counts, accuracies, per-class accuracy,
+confusion counts, latency statistics and the stage breakdown come out as one process
+evaluating the same images would compute them. A shard file is reused only if it was
+produced with the same options, so rerunning an interrupted evaluation only runs the
+shards that did not finish.
+"""
+
+import os
+import sys
+import json
+import zlib
+import hashlib
+import argparse
+import subprocess
+import numpy as np
+
+from inference_client import RequestStats, input_model_name
+from results_store import save_run
+from stage_timer import StageTimer
+
+# Options that differ between the coordinator and its shards (all take a value)
+SHARD_OPTIONS = ('--workers', '--shard-index', '--num-shards', '--output-file', '--metrics-port',
+                 '--results-store', '--run-label')
+
+# Accuracy fields recomputed from summed counts: field -> (correct count, total count)
+ACCURACY_FIELDS = {
+    'overall_accuracy': ('correct_count', 'total_count'),
+    'top1_accuracy': ('top1_correct_count', 'total_count'),
+    'top5_accuracy': ('top5_correct_count', 'total_count'),
+}
+
+# Per-request record fields holding the top-1 prediction and its correctness
+PREDICTION_KEYS = ('predicted_imagenet_idx', 'predicted_class_idx', 'top1_index')
+CORRECT_KEYS = ('correct', 'top1_correct')
+
+# Fields only present in shard results
+SHARD_FIELDS = ('shard', 'shard_records', 'stage_state', 'request_state')
+
+def add_shard_args(parser):
+    """Add --workers plus the internal options a shard process is started with."""
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Evaluate in this many processes, each on a deterministic shard of the images')
+    parser.add_argument('--shard-index', type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--num-shards', type=int, default=1, help=argparse.SUPPRESS)
+
+def shard_of(key, num_shards):
+    """Shard of an image, from a stable hash of its file name."""
+    return zlib.crc32(key.encode('utf-8')) % num_shards
+
+def select_shard(items, args, key):
+    """The items of this process's shard (all of them outside sharded runs)."""
+    if args.shard_index is None:
+        return items
+    selected = [item for item in items if shard_of(key(item), args.num_shards) == args.shard_index]
+    print(f"Shard {args.shard_index + 1}/{args.num_shards}: {len(selected)} of {len(items)} images")
+    return selected
+
+def fingerprint(args):
+    """Hash of the options that determine a shard's results."""
+    skip = {opt[2:].replace('-', '_') for opt in SHARD_OPTIONS}
+    config = {k: v for k, v in sorted(vars(args).items()) if k not in skip}
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def shard_fields(args, client, timer, started_at, records):
+    """Extra results a shard process writes for the merge; empty outside sharded runs."""
+    if args.shard_index is None:
+        return {}
+    return {
+        'shard': {'index': args.shard_index, 'count': args.num_shards,
+                  'fingerprint': fingerprint(args), 'started_at': started_at},
+        'shard_records': records,
+        'stage_state': timer.state(),
+        'request_state': {'counts': client.stats.counts, 'samples': client.stats.samples,
+                          'compression': list(client.stats.compression)},
+    }
+
+def _strip_options(argv, options):
+    """argv without the given value-taking options, in `--opt value` or `--opt=value` form."""
+    kept, skip = [], False
+    for arg in argv:
+        if skip:
+            skip = False
+            continue
+        name = arg.split('=', 1)[0]
+        if name in options:
+            skip = '=' not in arg
+            continue
+        kept.append(arg)
+    return kept
+
+def _load_shard(path, key):
+    try:
+        with open(path, 'r') as f:
+            results = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return results if results.get('shard', {}).get('fingerprint') == key else None
+
+def _accuracy_by_class(records):
+    totals, correct = {}, {}
+    for r in records:
+        class_id = r.get('true_class_id')
+        hit = next((r[k] for k in CORRECT_KEYS if k in r), None)
+        if class_id is None or hit is None:
+            return None
+        totals[class_id] = totals.get(class_id, 0) + 1
+        correct[class_id] = correct.get(class_id, 0) + int(bool(hit))
+    return {c: correct[c] / totals[c] for c in totals}
+
+def confusion_counts(records):
+    """Sparse confusion counts {true class id: {predicted index: count}} of per-request records."""
+    confusion = {}
+    for r in records:
+        predicted = next((r[k] for k in PREDICTION_KEYS if k in r), None)
+        if predicted is None or 'true_class_id' not in r:
+            continue
+        row = confusion.setdefault(r['true_class_id'], {})
+        row[str(predicted)] = row.get(str(predicted), 0) + 1
+    return confusion
+
+def merge_results(shards):
+    """Combine the results of all shards of one evaluation."""
+    first = shards[0]
+    merged = {k: v for k, v in first.items() if k not in SHARD_FIELDS}
+    for key, value in first.items():
+        if key.endswith('_count') and isinstance(value, int):
+            merged[key] = sum(s[key] for s in shards)
+    total = merged.get('total_count', 0)
+    for field, (hits, count) in ACCURACY_FIELDS.items():
+        if field in first:
+            merged[field] = float(merged[hits] / merged[count]) if merged[count] > 0 else 0.0
+
+    records = [r for s in shards for r in s['shard_records']]
+    succeeded = [r for r in records if r.get('ok')]
+    if 'per_class_accuracy' in first:
+        per_class = _accuracy_by_class(succeeded)
+        if per_class is not None:
+            merged['per_class_accuracy'] = {k: float(v) for k, v in per_class.items()}
+    if 'confusion' in first:
+        merged['confusion'] = confusion_counts(succeeded)
+
+    # Timing: shards run concurrently, so the evaluation spans the earliest start to the latest end
+    origin = min(s['shard']['started_at'] for s in shards)
+    latencies = [l for s in shards for l in s['latency_samples_ms']]
+    merged['latency_samples_ms'] = latencies
+    merged['completion_times_s'] = sorted(t + s['shard']['started_at'] - origin
+                                          for s in shards for t in s['completion_times_s'])
+    merged['avg_latency_ms'] = float(np.mean(latencies)) if latencies else None
+    merged['p95_latency_ms'] = float(np.percentile(latencies, 95)) if latencies else None
+    merged['p99_latency_ms'] = float(np.percentile(latencies, 99)) if latencies else None
+    elapsed = max(s['shard']['started_at'] + s['elapsed_time'] for s in shards) - origin
+    merged['elapsed_time'] = float(elapsed)
+    # Throughput of the images actually inferred; logits store hits are not requests
+    rate_key = 'images_per_second' if 'images_per_second' in first else 'samples_per_second'
+    merged[rate_key] = float(merged.get('inferred_count', total) / elapsed) if elapsed > 0 else 0
+
+    timer = StageTimer()
+    for s in shards:
+        timer.merge_state(s['stage_state'])
+    merged['stage_breakdown'] = timer.breakdown()
+
+    stats = RequestStats()
+    for s in shards:
+        state = s['request_state']
+        for name, n in state['counts'].items():
+            stats.counts[name] += n
+        for name, values in state['samples'].items():
+            stats.samples[name].extend(values)
+    stats.compression = tuple(first['request_state']['compression'])
+    merged['request_stats'] = stats.summary()
+
+    endpoints = {}
+    for s in shards:
+        for url, e in s['endpoints']['endpoints'].items():
+            entry = endpoints.setdefault(url, {'requests': 0, 'errors': 0})
+            entry['requests'] += e['requests']
+            entry['errors'] += e['errors']
+    for entry in endpoints.values():
+        entry['error_rate'] = entry['errors'] / entry['requests'] if entry['requests'] else 0.0
+    merged['endpoints'] = {'policy': first['endpoints']['policy'], 'endpoints': endpoints}
+
+    if first.get('logits_store'):
+        merged['logits_store'] = max((s['logits_store'] for s in shards), key=lambda d: d['filled'])
+    detailed = sorted((r for s in shards for r in s.get('detailed_results', [])),
+                      key=lambda r: str(r.get('image', r.get('sample_id'))))
+    merged['detailed_results'] = detailed[:100]
+    merged['workers'] = len(shards)
+    merged['shards'] = [{'index': s['shard']['index'], 'total_count': s.get('total_count'),
+                         'inferred_count': s.get('inferred_count'), 'elapsed_time': s['elapsed_time'],
+                         'reused': s.get('reused', False)}
+                        for s in shards]
+    return merged, records
+
+def run_sharded(args, script, tool):
+    """Evaluate in `args.workers` shard processes and return the merged results."""
+    num_shards = args.workers
+    shard_dir = os.path.abspath(args.output_file) + '.shards'
+    os.makedirs(shard_dir, exist_ok=True)
+    key = fingerprint(args)
+    base_argv = _strip_options(sys.argv[1:], SHARD_OPTIONS)
+
+    shards, running = [None] * num_shards, {}
+    for i in range(num_shards):
+        path = os.path.join(shard_dir, f"shard-{i:03d}-of-{num_shards:03d}.json")
+        shards[i] = _load_shard(path, key)
+        if shards[i] is not None:
+            shards[i]['reused'] = True
+            print(f"Shard {i + 1}/{num_shards}: reusing {path}")
+            continue
+        argv = [sys.executable, os.path.abspath(script)] + base_argv + [
+            '--shard-index', str(i), '--num-shards', str(num_shards), '--output-file', path]
+        if args.metrics_port is not None:
+            argv += ['--metrics-port', str(args.metrics_port + i)]
+        log = open(os.path.join(shard_dir, f"shard-{i:03d}.log"), 'w')
+        running[i] = (subprocess.Popen(argv, stdout=log, stderr=subprocess.STDOUT), log, path)
+    if running:
+        print(f"Running {len(running)} shard processes (logs in {shard_dir})")
+
+    for i, (process, log, path) in running.items():
+        process.wait()
+        log.close()
+        shards[i] = _load_shard(path, key)
+        if process.returncode != 0 or shards[i] is None:
+            print(f"Error: shard {i + 1}/{num_shards} failed (exit code {process.returncode}), "
+                  f"see {os.path.join(shard_dir, f'shard-{i:03d}.log')}")
+            return None
+
+    results, records = merge_results(shards)
+    save_run(args, tool, records, results, model=input_model_name(args.model_name, args.input_mode),
+             input_mode=args.input_mode, load_pattern='sequential', concurrency=num_shards)
+    for field in ACCURACY_FIELDS:
+        if field in results:
+            print(f"{field}: {results[field]:.4f}")
+    print(f"{results['total_count']} images in {results['elapsed_time']:.2f} seconds with {num_shards} "
+          f"workers ({results['images_per_second']:.2f} images/sec)")
+    if 'inferred_count' in results:
+        print(f"{results['inferred_count']} images inferred, {results['reused_count']} reused from the logits store")
+    if results['latency_samples_ms']:
+        print(f"Average latency: {results['avg_latency_ms']:.2f} ms, P99 latency: {results['p99_latency_ms']:.2f} ms")
+    return results
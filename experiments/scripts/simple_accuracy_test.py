@@ -4,12 +4,12 @@ Simple accuracy test for MobileNetV4 model using synthetic data.
 """
 
 import os
-import sys
 import json
-import time
 import argparse
 import numpy as np
-import requests
+
+from inference_client import InferenceClient, ENCODINGS
+from synthetic_pool import SyntheticInputPool, DISTRIBUTIONS
 
 def parse_args():
     """Parse command line arguments."""
@@ -23,6 +23,15 @@ def parse_args():
                         help='Number of tests to run')
     parser.add_argument('--output-file', type=str, default='accuracy_results.json',
                         help='Path to save results')
+    parser.add_argument('--pool-size', type=int, default=32,
+                        help='Number of distinct synthetic inputs generated up front and cycled')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed for the synthetic input pool')
+    parser.add_argument('--input-distribution', type=str, default='raw',
+                        choices=DISTRIBUTIONS,
+                        help='Statistics of the synthetic inputs')
+    parser.add_argument('--encoding', type=str, default='json', choices=ENCODINGS,
+                        help='Request wire encoding')
     return parser.parse_args()
 
 def main():
@@ -31,8 +40,12 @@ def main():
     
     print(f"Testing {args.model_name} accuracy with synthetic data...")
     
-    # Construct the inference URL
-    infer_url = f"{args.url}/v2/models/{args.model_name}/infer"
+    # Create inference client
+    client = InferenceClient(args.url, args.model_name)
+    
+    # Generate and encode the synthetic inputs once; tests cycle through them
+    pool = SyntheticInputPool(args.pool_size, args.seed, distribution=args.input_distribution,
+                              encoding=args.encoding)
     
     # Initialize counters
     correct = 0
@@ -40,35 +53,21 @@ def main():
     
     # Run tests
     for i in range(args.num_tests):
-        # Generate random image data
-        input_data = np.random.rand(1, 3, 224, 224).astype(np.float32)
-        
-        # Create request payload
-        payload = {
-            "inputs": [
-                {
-                    "name": "pixel_values",
-                    "shape": [1, 3, 224, 224],
-                    "datatype": "FP32",
-                    "data": input_data.flatten().tolist()
-                }
-            ]
-        }
+        # Take the next pre-encoded synthetic input
+        _, _, body, headers = pool.next()
         
         # Send request
-        start_time = time.time()
         try:
-            response = requests.post(infer_url, json=payload)
-            latency = time.time() - start_time
-            latencies.append(latency * 1000)  # Convert to milliseconds
+            result = client.send(body, headers, parse_output=False)
+            latencies.append(result.latency_ms)
             
-            if response.status_code == 200:
+            if result.error is None:
                 # For synthetic data, we just count successful responses as "correct"
                 correct += 1
                 if i % 10 == 0:
-                    print(f"Test {i+1}/{args.num_tests}: Success (latency: {latency*1000:.2f} ms)")
+                    print(f"Test {i+1}/{args.num_tests}: Success (latency: {result.latency_ms:.2f} ms)")
             else:
-                print(f"Test {i+1}/{args.num_tests}: Error: {response.status_code} - {response.text}")
+                print(f"Test {i+1}/{args.num_tests}: Error: {result.error}")
         except Exception as e:
             print(f"Test {i+1}/{args.num_tests}: Exception: {e}")
     
@@ -85,7 +84,8 @@ def main():
         "total_count": args.num_tests,
         "avg_latency_ms": float(avg_latency),
         "p95_latency_ms": float(p95_latency),
-        "p99_latency_ms": float(p99_latency)
+        "p99_latency_ms": float(p99_latency),
+        "input_pool": pool.describe()
     }
     
     # Save results
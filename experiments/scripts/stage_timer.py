@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Lightweight per-stage timing for the evaluation pipeline.
+
+Each stage (decode, resize, normalize, serialize, compress, network, deserialize, score)
+is timed with `time.perf_counter_ns` and recorded into a fixed log-scale histogram, so
+recording costs a few hundred nanoseconds and memory stays constant however long the run is.
+`breakdown()` turns the histograms into a per-stage table for the results JSON.
+"""
+
+import math
+import time
+import numpy as np
+
+# Pipeline stages in the order a request goes through them
+STAGES = ('decode', 'resize', 'normalize', 'serialize', 'compress', 'network', 'deserialize', 'score')
+
+# Histogram buckets: 4 per power of two of nanoseconds (~19% wide), up to 2^40 ns (~18 min)
+BUCKETS_PER_OCTAVE = 4
+NUM_BUCKETS = 40 * BUCKETS_PER_OCTAVE + 1
+
+class StageHistogram:
+    """Log-scale histogram of durations in nanoseconds."""
+
+    def __init__(self):
+        self.counts = np.zeros(NUM_BUCKETS, dtype=np.int64)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def add(self, ns):
+        index = min(int(math.log2(ns) * BUCKETS_PER_OCTAVE), NUM_BUCKETS - 1) if ns > 1 else 0
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentiles_ms(self, qs):
+        """Approximate percentiles (bucket geometric midpoints) in milliseconds."""
+        if self.count == 0:
+            return [0.0] * len(qs)
+        cumulative = np.cumsum(self.counts)
+        results = []
+        for q in qs:
+            index = int(np.searchsorted(cumulative, q / 100 * self.count))
+            midpoint_ns = 2 ** ((index + 0.5) / BUCKETS_PER_OCTAVE)
+            results.append(min(midpoint_ns, self.max_ns) / 1e6)
+        return results
+
+class _Stage:
+    """Context manager timing one stage occurrence."""
+
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.add(time.perf_counter_ns() - self.start)
+        return False
+
+class StageTimer:
+    """
+    Histograms of per-stage durations.
+
+    Use `with timer.stage('decode'): ...` around a stage, or `add_ms` for a duration that
+    was already measured. One timer can be shared by the evaluator and its client.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+
+    def _histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms.setdefault(name, StageHistogram())
+        return histogram
+
+    def stage(self, name):
+        return _Stage(self._histogram(name))
+
+    def add_ns(self, name, ns):
+        self._histogram(name).add(ns)
+
+    def add_ms(self, name, ms):
+        self._histogram(name).add(int(ms * 1e6))
+
+    def state(self):
+        """Raw histograms as JSON-friendly data, for merging timers of separate processes."""
+        return {name: {'counts': {str(i): int(h.counts[i]) for i in np.flatnonzero(h.counts)},
+                       'count': h.count, 'total_ns': h.total_ns, 'max_ns': h.max_ns}
+                for name, h in self.histograms.items()}
+
+    def merge_state(self, state):
+        """Add histograms produced by state(); the merged breakdown is exact."""
+        for name, s in state.items():
+            h = self._histogram(name)
+            for i, n in s['counts'].items():
+                h.counts[int(i)] += n
+            h.count += s['count']
+            h.total_ns += s['total_ns']
+            h.max_ns = max(h.max_ns, s['max_ns'])
+
+    def breakdown(self):
+        """Per-stage count, total, mean and percentiles (ms) with each stage's share of the total."""
+        total_ns = sum(h.total_ns for h in self.histograms.values())
+        ordered = [s for s in STAGES if s in self.histograms]
+        ordered += sorted(s for s in self.histograms if s not in STAGES)
+        table = {}
+        for name in ordered:
+            h = self.histograms[name]
+            p50, p95, p99 = h.percentiles_ms([50, 95, 99])
+            table[name] = {
+                'count': h.count,
+                'total_ms': h.total_ns / 1e6,
+                'mean_ms': h.total_ns / h.count / 1e6 if h.count else 0.0,
+                'p50_ms': p50,
+                'p95_ms': p95,
+                'p99_ms': p99,
+                'max_ms': h.max_ns / 1e6,
+                'share': h.total_ns / total_ns if total_ns else 0.0,
+            }
+        return table
+
+    def print_breakdown(self):
+        table = self.breakdown()
+        if not table:
+            return
+        print(f"{'Stage':<12} {'count':>7} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'share':>7}")
+        for name, row in table.items():
+            print(f"{name:<12} {row['count']:>7} {row['mean_ms']:>9.3f} {row['p50_ms']:>9.3f} "
+                  f"{row['p95_ms']:>9.3f} {row['p99_ms']:>9.3f} {row['share'] * 100:>6.1f}%")
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+class NullTimer:
+    """Drop-in StageTimer that records nothing."""
+
+    _stage = _NullStage()
+
+    def stage(self, name):
+        return self._stage
+
+    def add_ns(self, name, ns):
+        pass
+
+    def add_ms(self, name, ms):
+        pass
+
+    def breakdown(self):
+        return {}
+
+    def print_breakdown(self):
+        pass
+
+NULL_TIMER = NullTimer()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Pre-generated pool of synthetic MobileNetV4 inputs, encoded once into wire format.
+
+Generating a fresh 3x224x224 tensor per request (and serializing it) costs the client
+more CPU than the inference itself, so responsiveness tests end up measuring NumPy.
+The pool draws a fixed number of float32 tensors from a seeded generator, encodes each
+one once, and requests then cycle through the ready-made bodies. For the uint8 and jpeg
+input modes it draws small uint8 images instead, for the server-side preprocessing ensembles.
+"""
+
+import itertools
+import numpy as np
+
+from inference_client import encode_body, INPUT_MODE_TENSORS
+
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32).reshape((3, 1, 1))
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32).reshape((3, 1, 1))
+
+# uniform:  uniform pixel intensities in [0, 1), normalized with ImageNet mean/std
+# imagenet: smooth images whose pixels follow ImageNet per-channel statistics, normalized
+# raw:      uniform [0, 1) values sent without normalization
+DISTRIBUTIONS = ('uniform', 'imagenet', 'raw')
+
+def generate_inputs(count, shape=(1, 3, 224, 224), distribution='uniform', seed=0):
+    """Generate `count` float32 input tensors of the given NCHW shape."""
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution: {distribution}")
+    rng = np.random.default_rng(seed)
+    full_shape = (count,) + tuple(shape)
+
+    if distribution == 'raw':
+        return rng.random(full_shape, dtype=np.float32)
+    if distribution == 'uniform':
+        pixels = rng.random(full_shape, dtype=np.float32)
+    else:
+        # Draw at 1/8 resolution and upsample so images have spatial structure instead of
+        # pixel noise, then add a little fine-grained texture
+        n, c, h, w = count * shape[0], shape[1], shape[2], shape[3]
+        coarse = rng.standard_normal((n, c, -(-h // 8), -(-w // 8)), dtype=np.float32)
+        pixels = coarse.repeat(8, axis=2).repeat(8, axis=3)[:, :, :h, :w]
+        pixels += 0.25 * rng.standard_normal(pixels.shape, dtype=np.float32)
+        pixels = np.clip(pixels * IMAGENET_STD + IMAGENET_MEAN, 0.0, 1.0).reshape(full_shape)
+    return (pixels - IMAGENET_MEAN) / IMAGENET_STD
+
+def generate_images(count, size=(64, 64), seed=0):
+    """Generate `count` uint8 RGB [H, W, 3] images following ImageNet statistics."""
+    h, w = size
+    normalized = generate_inputs(count, (1, 3, h, w), 'imagenet', seed)[:, 0]
+    pixels = np.clip(np.rint((normalized * IMAGENET_STD + IMAGENET_MEAN) * 255), 0, 255)
+    return pixels.astype(np.uint8).transpose(0, 2, 3, 1)
+
+def input_for_mode(image, input_mode):
+    """Client input for a uint8 [H, W, 3] image in the uint8 or jpeg input mode."""
+    if input_mode == 'jpeg':
+        from image_decode import encode_jpeg
+        return np.array([encode_jpeg(image)], dtype=np.object_)
+    return np.ascontiguousarray(image)
+
+class SyntheticInputPool:
+    """
+    A fixed set of synthetic inputs, each pre-encoded into a request body.
+
+    With `input_mode` fp16, the tensors are sent as binary float16. With uint8 or jpeg,
+    inputs are `image_size` uint8 images (or their JPEG encoding), always binary-encoded,
+    and `shape`, `distribution`, `input_name` and `datatype` do not apply.
+    """
+
+    def __init__(self, size=32, seed=0, shape=(1, 3, 224, 224), distribution='uniform',
+                 encoding='json', input_name='pixel_values', datatype='FP32', input_mode='fp32',
+                 image_size=(64, 64)):
+        self.size = size
+        self.seed = seed
+        self.distribution = distribution
+        self.input_mode = input_mode
+        if input_mode == 'fp32':
+            self.inputs = generate_inputs(size, shape, distribution, seed)
+        elif input_mode == 'fp16':
+            self.inputs = generate_inputs(size, shape, distribution, seed)
+            input_name, datatype, _ = INPUT_MODE_TENSORS[input_mode]
+            encoding = 'binary'
+        else:
+            self.distribution = 'imagenet'
+            self.inputs = [input_for_mode(image, input_mode)
+                           for image in generate_images(size, image_size, seed)]
+            input_name, datatype, _ = INPUT_MODE_TENSORS[input_mode]
+            encoding = 'binary'
+        self.encoding = encoding
+        self.bodies = []
+        self.headers = []
+        for input_data in self.inputs:
+            body, headers = encode_body(input_data, encoding, input_name, datatype)
+            self.bodies.append(body)
+            self.headers.append(headers)
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return self.size
+
+    def next(self):
+        """Return (pool_index, input_tensor, body, headers) for the next request, cycling."""
+        # itertools.count is atomic under the GIL, so threads can share one pool
+        i = next(self._counter) % self.size
+        return i, self.inputs[i], self.bodies[i], self.headers[i]
+
+    def describe(self):
+        """Pool settings for inclusion in a results file."""
+        return {
+            'pool_size': self.size,
+            'seed': self.seed,
+            'distribution': self.distribution,
+            'encoding': self.encoding,
+            'input_mode': self.input_mode,
+            'body_bytes': int(np.mean([len(b) for b in self.bodies])),
+        }
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Scrape Triton's Prometheus metrics endpoint into fixed-size time-series ring buffers.
+
+The scraper polls the metrics endpoint (port 8002) at a fixed interval, parses only
+the series we care about and appends one row per scrape to a NumPy ring buffer.
+Reads of the current state and windowed rates never touch the network, so the
+buffer can be used directly as the state source of a control loop.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import numpy as np
+import requests
+
+# Series kept in the ring buffer: (column name, Triton metric name, kind, aggregation)
+# Counters are cumulative and are turned into rates; gauges are read as-is.
+TRITON_SERIES = [
+    ('inference_count', 'nv_inference_count', 'counter', 'sum'),
+    ('request_success', 'nv_inference_request_success', 'counter', 'sum'),
+    ('request_failure', 'nv_inference_request_failure', 'counter', 'sum'),
+    ('exec_count', 'nv_inference_exec_count', 'counter', 'sum'),
+    ('request_duration_us', 'nv_inference_request_duration_us', 'counter', 'sum'),
+    ('queue_duration_us', 'nv_inference_queue_duration_us', 'counter', 'sum'),
+    ('compute_infer_duration_us', 'nv_inference_compute_infer_duration_us', 'counter', 'sum'),
+    ('gpu_utilization', 'nv_gpu_utilization', 'gauge', 'mean'),
+    ('gpu_memory_used_bytes', 'nv_gpu_memory_used_bytes', 'gauge', 'sum'),
+    ('gpu_memory_total_bytes', 'nv_gpu_memory_total_bytes', 'gauge', 'sum'),
+]
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Scrape Triton metrics into a ring buffer')
+    parser.add_argument('--url', type=str, default='http://localhost:8002/metrics',
+                        help='Triton metrics endpoint URL')
+    parser.add_argument('--model-name', type=str, default=None,
+                        help='Only keep per-model series for this model (default: all models)')
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='Polling interval in seconds')
+    parser.add_argument('--duration', type=float, default=60.0,
+                        help='How long to scrape for, in seconds')
+    parser.add_argument('--capacity', type=int, default=3600,
+                        help='Number of samples kept in the ring buffer')
+    parser.add_argument('--window', type=float, default=10.0,
+                        help='Window in seconds used for rate summaries')
+    parser.add_argument('--output-file', type=str, default='triton_metrics.json',
+                        help='Path to save the scraped time series')
+    return parser.parse_args()
+
+def _split_sample(line):
+    """Split an exposition line into (name, labels, value)."""
+    brace = line.find('{')
+    if brace == -1:
+        parts = line.split()
+        return parts[0], '', parts[1]
+    close = line.rfind('}')
+    # Anything after the labels is "value [timestamp]"
+    return line[:brace], line[brace + 1:close], line[close + 1:].split()[0]
+
+def parse_metrics(lines, series=TRITON_SERIES, model_name=None):
+    """
+    Parse Prometheus text exposition lines into one row of aggregated values.
+
+    Lines are consumed one at a time and only the selected metric names are parsed,
+    so the cost is dominated by the name lookup rather than the full payload.
+    Missing series come back as NaN.
+    """
+    columns = {metric: i for i, (_, metric, _, _) in enumerate(series)}
+    sums = np.zeros(len(series))
+    counts = np.zeros(len(series))
+    model_label = f'model="{model_name}"' if model_name else None
+
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', 'replace')
+        if not line or line[0] == '#':
+            continue
+        end = len(line)
+        for sep in ('{', ' '):
+            pos = line.find(sep)
+            if pos != -1 and pos < end:
+                end = pos
+        col = columns.get(line[:end])
+        if col is None:
+            continue
+
+        _, labels, value = _split_sample(line)
+        # Per-model series carry a model label; GPU series do not
+        if model_label and 'model="' in labels and model_label not in labels:
+            continue
+        try:
+            sums[col] += float(value)
+            counts[col] += 1
+        except ValueError:
+            continue
+
+    row = np.full(len(series), np.nan)
+    for i, (_, _, _, agg) in enumerate(series):
+        if counts[i] > 0:
+            row[i] = sums[i] / counts[i] if agg == 'mean' else sums[i]
+    return row
+
+class TimeSeriesRing:
+    """Fixed-capacity ring buffer of timestamped rows, one column per series."""
+
+    def __init__(self, names, capacity=3600):
+        self.names = list(names)
+        self.columns = {name: i for i, name in enumerate(self.names)}
+        self.capacity = capacity
+        self.times = np.zeros(capacity)
+        self.values = np.full((capacity, len(self.names)), np.nan)
+        # Total number of rows ever appended; the newest row is at (count - 1) % capacity
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, timestamp, row):
+        """Append one row, overwriting the oldest when full."""
+        pos = self.count % self.capacity
+        self.values[pos] = row
+        self.times[pos] = timestamp
+        # Publish the row only after it is fully written
+        self.count += 1
+
+    def latest(self, name=None):
+        """Return (timestamp, value) of the newest row, or the whole row if name is None."""
+        if self.count == 0:
+            return None, np.nan
+        pos = (self.count - 1) % self.capacity
+        if name is None:
+            return self.times[pos], self.values[pos].copy()
+        return self.times[pos], self.values[pos, self.columns[name]]
+
+    def _first_since(self, start_time, newest):
+        """Binary search the oldest logical index whose timestamp is >= start_time."""
+        lo = max(0, newest + 1 - self.capacity)
+        hi = newest
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.times[mid % self.capacity] < start_time:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _window_bounds(self, window):
+        newest = self.count - 1
+        if newest < 1:
+            return None
+        oldest = self._first_since(self.times[newest % self.capacity] - window, newest)
+        if oldest == newest:
+            # Fall back to the previous sample so a rate is always defined
+            oldest = newest - 1
+        return oldest % self.capacity, newest % self.capacity
+
+    def delta(self, name, window):
+        """Return (value change, time change) of a series over the last `window` seconds."""
+        bounds = self._window_bounds(window)
+        if bounds is None:
+            return np.nan, np.nan
+        old, new = bounds
+        col = self.columns[name]
+        return self.values[new, col] - self.values[old, col], self.times[new] - self.times[old]
+
+    def rate(self, name, window):
+        """Per-second rate of a counter over the last `window` seconds (NaN on reset)."""
+        dv, dt = self.delta(name, window)
+        if not dt > 0 or dv < 0:
+            return np.nan
+        return dv / dt
+
+    def ratio(self, numerator, denominator, window):
+        """Ratio of two counter deltas over a window, e.g. queue time per request."""
+        num, _ = self.delta(numerator, window)
+        den, _ = self.delta(denominator, window)
+        if not den > 0 or num < 0:
+            return np.nan
+        return num / den
+
+    def mean(self, name, window):
+        """Mean of a gauge over the last `window` seconds."""
+        newest = self.count - 1
+        if newest < 0:
+            return np.nan
+        oldest = self._first_since(self.times[newest % self.capacity] - window, newest)
+        idx = np.arange(oldest, newest + 1) % self.capacity
+        return float(np.nanmean(self.values[idx, self.columns[name]]))
+
+    def to_arrays(self):
+        """Return (times, values) in chronological order."""
+        n = len(self)
+        idx = np.arange(self.count - n, self.count) % self.capacity
+        return self.times[idx], self.values[idx]
+
+class TritonMetricsScraper:
+    """Poll a Triton metrics endpoint in a background thread into a TimeSeriesRing."""
+
+    def __init__(self, url, interval=1.0, capacity=3600, model_name=None, timeout=2.0,
+                 series=TRITON_SERIES):
+        self.url = url
+        self.interval = interval
+        self.model_name = model_name
+        self.timeout = timeout
+        self.series = series
+        self.ring = TimeSeriesRing([s[0] for s in series], capacity)
+        self.session = requests.Session()
+        self.errors = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def scrape_once(self):
+        """Fetch and parse one sample; returns False if the endpoint could not be read."""
+        try:
+            response = self.session.get(self.url, timeout=self.timeout, stream=True)
+            if response.status_code != 200:
+                self.errors += 1
+                return False
+            timestamp = time.time()
+            row = parse_metrics(response.iter_lines(), self.series, self.model_name)
+            response.close()
+        except requests.RequestException:
+            self.errors += 1
+            return False
+        self.ring.append(timestamp, row)
+        return True
+
+    def _run(self):
+        next_tick = time.monotonic()
+        while not self._stop.is_set():
+            self.scrape_once()
+            # Schedule against absolute ticks so slow scrapes do not accumulate drift
+            next_tick += self.interval
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                next_tick = time.monotonic()
+                delay = 0
+            self._stop.wait(delay)
+
+    def start(self):
+        """Start polling in a daemon thread."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='triton-metrics', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the polling thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def state(self, window=10.0):
+        """Current serving state derived from the ring buffer, without any I/O."""
+        ring = self.ring
+        _, gpu_util = ring.latest('gpu_utilization')
+        _, gpu_mem = ring.latest('gpu_memory_used_bytes')
+        return {
+            'inference_rate': ring.rate('inference_count', window),
+            'success_rate': ring.rate('request_success', window),
+            'failure_rate': ring.rate('request_failure', window),
+            'avg_queue_ms': ring.ratio('queue_duration_us', 'request_success', window) / 1000.0,
+            'avg_compute_ms': ring.ratio('compute_infer_duration_us', 'request_success', window) / 1000.0,
+            'avg_request_ms': ring.ratio('request_duration_us', 'request_success', window) / 1000.0,
+            'avg_batch_size': ring.ratio('inference_count', 'exec_count', window),
+            'gpu_utilization': gpu_util,
+            'gpu_memory_used_bytes': gpu_mem,
+        }
+
+def _json_float(value):
+    value = float(value)
+    return None if np.isnan(value) else value
+
+def main():
+    """Main function."""
+    args = parse_args()
+
+    scraper = TritonMetricsScraper(args.url, interval=args.interval, capacity=args.capacity,
+                                   model_name=args.model_name)
+    print(f"Scraping {args.url} every {args.interval}s for {args.duration}s...")
+    scraper.start()
+    try:
+        deadline = time.monotonic() + args.duration
+        while time.monotonic() < deadline:
+            time.sleep(min(10.0, max(0.0, deadline - time.monotonic())))
+            state = scraper.state(args.window)
+            print(f"{len(scraper.ring)} samples: "
+                  f"{state['inference_rate']:.2f} inf/s, "
+                  f"queue {state['avg_queue_ms']:.2f} ms, "
+                  f"compute {state['avg_compute_ms']:.2f} ms, "
+                  f"GPU {state['gpu_utilization']:.2f}")
+    except KeyboardInterrupt:
+        print("Interrupted, saving collected samples")
+    finally:
+        scraper.stop()
+
+    if len(scraper.ring) == 0:
+        print(f"Error: no samples collected from {args.url} ({scraper.errors} errors)")
+        sys.exit(1)
+
+    times, values = scraper.ring.to_arrays()
+    results = {
+        'url': args.url,
+        'model_name': args.model_name,
+        'interval': args.interval,
+        'num_samples': len(times),
+        'scrape_errors': scraper.errors,
+        'summary': {k: _json_float(v) for k, v in scraper.state(args.duration).items()},
+        'timestamps': times.tolist(),
+        'series': {name: [_json_float(v) for v in values[:, i]]
+                   for i, name in enumerate(scraper.ring.names)},
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output_file)), exist_ok=True)
+    with open(args.output_file, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved {len(times)} samples to {args.output_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Triton Python-backend model that turns uint8 images or encoded JPEGs into `pixel_values`.
+
+build_model_repository.py installs this file as `<preprocess model>/1/model.py`, next to
+copies of image_decode.py and stage_timer.py, and puts it in front of the ONNX model in an
+ensemble. Decoding, resizing and normalization use the same code as the clients' fp32
+path. JPEG decoding still depends on the Pillow build (the server's is pinned in
+Dockerfile.triton), so jpeg requests can give slightly different tensors than a client with
+another Pillow version would compute.
+
+The input tensor name selects the mode: `image_bytes` (TYPE_STRING, one encoded image per
+element) or `image_uint8` (TYPE_UINT8, [H, W, 3]). The `interpolation` config parameter
+selects the resampling filter.
+"""
+
+import os
+import io
+import sys
+import json
+import numpy as np
+
+# image_decode.py is copied next to this file in the model repository
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import triton_python_backend_utils as pb_utils
+from image_decode import decode_image, preprocess_decoded, DEFAULT_INTERPOLATION
+
+class TritonPythonModel:
+    """Preprocess every request of an execute() call in one resize/normalize pass."""
+
+    def initialize(self, args):
+        config = json.loads(args['model_config'])
+        self.input_name = config['input'][0]['name']
+        self.output_name = config['output'][0]['name']
+        parameters = config.get('parameters', {})
+        self.interpolation = parameters.get('interpolation', {}).get('string_value', DEFAULT_INTERPOLATION)
+
+    def _decode(self, request):
+        """Decoded [H, W, 3] uint8 images of one request."""
+        data = pb_utils.get_input_tensor_by_name(request, self.input_name).as_numpy()
+        if data.dtype == np.object_:
+            return [decode_image(io.BytesIO(item)) for item in data.reshape(-1)]
+        return [data] if data.ndim == 3 else list(data)
+
+    def execute(self, requests):
+        images, counts, responses = [], [], [None] * len(requests)
+        for r, request in enumerate(requests):
+            try:
+                decoded = self._decode(request)
+            except Exception as e:
+                responses[r] = pb_utils.InferenceResponse(
+                    output_tensors=[], error=pb_utils.TritonError(f"Could not decode image: {e}"))
+                decoded = []
+            images.extend(decoded)
+            counts.append(len(decoded))
+
+        # Images from all requests are normalized together in one batch
+        outputs = preprocess_decoded(images, self.interpolation)
+        start = 0
+        for r, count in enumerate(counts):
+            if responses[r] is None:
+                pixel_values = np.concatenate(outputs[start:start + count])
+                responses[r] = pb_utils.InferenceResponse(
+                    output_tensors=[pb_utils.Tensor(self.output_name, pixel_values)])
+            start += count
+        return responses
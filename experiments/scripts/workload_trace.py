@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Workload traces: the arrival schedule of a run, so other runs can replay exactly the same load.
+
+A trace is an `.npz` file with one row per request:
+  offset_s    float64  seconds since the start of the trace (sorted)
+  payload_id  int64    index of the request body (synthetic pool or body cache, modulo its size)
+  client_id   int32    issuing user/worker, -1 if unknown
+plus a JSON `meta` entry (start time as Unix seconds, source, anything the recorder adds).
+
+TraceRecorder captures a trace from a live run (load_generator.py `--record-trace`, or
+the Locust file with TRACE_FILE set). This CLI can also generate Poisson or constant-rate
+traces, merge the per-worker traces of a distributed run, and describe a trace.
+replay_trace.py re-issues a trace at its original pace or time-scaled.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import numpy as np
+
+class Trace:
+    """Arrival offsets, payload ids and client ids of one workload, sorted by offset."""
+
+    def __init__(self, offset_s, payload_id, client_id=None, meta=None):
+        order = np.argsort(offset_s, kind='stable')
+        self.offset_s = np.asarray(offset_s, dtype=np.float64)[order]
+        self.payload_id = np.asarray(payload_id, dtype=np.int64)[order]
+        if client_id is None:
+            client_id = np.full(len(self.offset_s), -1)
+        self.client_id = np.asarray(client_id, dtype=np.int32)[order]
+        self.meta = dict(meta or {})
+
+    def __len__(self):
+        return len(self.offset_s)
+
+    @property
+    def duration_s(self):
+        return float(self.offset_s[-1]) if len(self) else 0.0
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Through a file object, so np.savez keeps the name as given
+        with open(path, 'wb') as f:
+            np.savez(f, offset_s=self.offset_s, payload_id=self.payload_id, client_id=self.client_id,
+                     meta=np.array(json.dumps(self.meta, default=str)))
+
+    def describe(self):
+        """Request count, duration, mean rate and inter-arrival statistics."""
+        gaps = np.diff(self.offset_s)
+        return {
+            'requests': len(self),
+            'duration_s': self.duration_s,
+            'mean_rate': len(self) / self.duration_s if self.duration_s > 0 else 0.0,
+            'clients': int(len(np.unique(self.client_id[self.client_id >= 0]))),
+            'payloads': int(len(np.unique(self.payload_id))),
+            'interarrival_p50_ms': float(np.percentile(gaps, 50) * 1000) if len(gaps) else 0.0,
+            'interarrival_p99_ms': float(np.percentile(gaps, 99) * 1000) if len(gaps) else 0.0,
+            'interarrival_cv': float(gaps.std() / gaps.mean()) if len(gaps) and gaps.mean() > 0 else 0.0,
+            'meta': self.meta,
+        }
+
+def load_trace(path):
+    """Read a trace written by Trace.save."""
+    with np.load(path) as data:
+        meta = json.loads(str(data['meta'])) if 'meta' in data else {}
+        return Trace(data['offset_s'], data['payload_id'], data['client_id'], meta)
+
+class TraceRecorder:
+    """
+    Record request arrivals from any number of threads (or Locust greenlets).
+
+    Arrival times use `time.perf_counter` relative to the recorder's start; the start's
+    Unix time is kept in the metadata so traces recorded on several machines can be merged.
+    """
+
+    def __init__(self, **meta):
+        self.start = time.perf_counter()
+        self.meta = dict(meta, start_unix=time.time())
+        self._rows = []
+        self._lock = threading.Lock()
+
+    def record(self, payload_id, client_id=-1):
+        row = (time.perf_counter() - self.start, payload_id, client_id)
+        with self._lock:
+            self._rows.append(row)
+
+    def trace(self):
+        with self._lock:
+            rows = list(self._rows)
+        if not rows:
+            return Trace([], [], [], self.meta)
+        offsets, payloads, clients = zip(*rows)
+        return Trace(offsets, payloads, clients, self.meta)
+
+    def save(self, path):
+        trace = self.trace()
+        trace.save(path)
+        return trace
+
+def generate_trace(rate, duration, num_payloads, process='poisson', num_clients=0, seed=0):
+    """Synthetic trace of `rate` requests per second for `duration` seconds."""
+    rng = np.random.default_rng(seed)
+    count = int(rate * duration)
+    if process == 'poisson':
+        # Arrivals of a Poisson process are uniform given their number
+        offsets = np.sort(rng.uniform(0, duration, count))
+    else:
+        offsets = np.arange(count) / rate
+    payloads = np.arange(count) % max(num_payloads, 1)
+    clients = rng.integers(0, num_clients, count) if num_clients > 0 else None
+    meta = {'source': f'generated_{process}', 'rate': rate, 'seed': seed}
+    return Trace(offsets, payloads, clients, meta)
+
+def merge_traces(traces):
+    """Interleave traces recorded in parallel (e.g. one per Locust worker) on their Unix start times."""
+    starts = [t.meta.get('start_unix', 0.0) for t in traces]
+    origin = min(starts)
+    offsets = np.concatenate([t.offset_s + (s - origin) for t, s in zip(traces, starts)])
+    payloads = np.concatenate([t.payload_id for t in traces])
+    clients = np.concatenate([t.client_id for t in traces])
+    offsets -= offsets.min() if len(offsets) else 0.0
+    return Trace(offsets, payloads, clients, {'source': 'merged', 'start_unix': origin, 'parts': len(traces)})
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Generate, merge or describe workload traces')
+    parser.add_argument('traces', nargs='*',
+                        help='Trace files to describe, or to merge with --output')
+    parser.add_argument('--generate', type=str, default=None, choices=['poisson', 'constant'],
+                        help='Generate a synthetic trace instead of reading one')
+    parser.add_argument('--rate', type=float, default=100.0,
+                        help='Requests per second of a generated trace')
+    parser.add_argument('--duration', type=float, default=60.0,
+                        help='Duration in seconds of a generated trace')
+    parser.add_argument('--num-payloads', type=int, default=32,
+                        help='Number of distinct payload ids in a generated trace')
+    parser.add_argument('--num-clients', type=int, default=0,
+                        help='Number of client ids in a generated trace (0 for none)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Random seed of a generated trace')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Where to write the generated or merged trace')
+    return parser.parse_args()
+
+def main():
+    """Main function."""
+    args = parse_args()
+    if args.generate:
+        trace = generate_trace(args.rate, args.duration, args.num_payloads, args.generate,
+                               args.num_clients, args.seed)
+    elif args.traces:
+        traces = [load_trace(path) for path in args.traces]
+        trace = merge_traces(traces) if len(traces) > 1 else traces[0]
+    else:
+        print("Error: give trace files or --generate")
+        sys.exit(2)
+
+    print(json.dumps(trace.describe(), indent=2))
+    if args.output:
+        trace.save(args.output)
+        print(f"Trace saved to {args.output}")
+
+if __name__ == "__main__":
+    main()